@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import Case, When, F, Value, DecimalField
 from django.conf import settings
+from django.utils import timezone
 
 # ============================================================
 # AGENCY MODEL - Thông tin đại lý
@@ -110,3 +112,19 @@ class Agency(models.Model):
     def can_order(self):
         """Kiểm tra có thể đặt hàng không (công nợ chưa vượt quá)"""
         return self.current_debt < self.agency_type.max_debt
+    
+    @classmethod
+    def adjust_debt(cls, deltas):
+        """Cộng công nợ cho {agency_id: số tiền} bằng 1 câu UPDATE (số âm để trừ)"""
+        deltas = {agency_id: amount for agency_id, amount in deltas.items() if amount}
+        if not deltas:
+            return 0
+        return cls.objects.filter(pk__in=deltas).update(
+            current_debt=Case(
+                *[When(pk=agency_id, then=F('current_debt') + Value(amount))
+                  for agency_id, amount in deltas.items()],
+                default=F('current_debt'),
+                output_field=DecimalField(max_digits=15, decimal_places=0),
+            ),
+            updated_at=timezone.now(),
+        )
@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 
 from accounts.views import IsAdmin, IsStaff
+from search import index as search_index
 from .models import District, AgencyType, Agency
 from .serializers import (
     DistrictSerializer, AgencyTypeSerializer, 
@@ -73,6 +74,11 @@ class AgencyViewSet(viewsets.ModelViewSet):
         if search:
             queryset = queryset.filter(name__icontains=search)
         
+        # Tìm kiếm toàn văn (không phân biệt dấu), xếp theo độ liên quan
+        q = self.request.query_params.get('q')
+        if q:
+            queryset = search_index.filter_queryset(queryset, 'agency', q)
+        
         # Filter theo công nợ
         debt_status = self.request.query_params.get('debt_status')
         if debt_status == 'overdue':
@@ -125,6 +131,8 @@ class AgencyViewSet(viewsets.ModelViewSet):
         orders = ExportOrder.objects.filter(
             agency=agency,
             status__in=['confirmed', 'shipping', 'completed']
+        ).select_related('agency', 'created_by').prefetch_related(
+            'items__product__unit'
         ).order_by('-order_date')
         
         # Lấy danh sách thanh toán
@@ -0,0 +1,82 @@
+"""
+Tiện ích dùng chung cho các lệnh benchmark / kiểm thử tải (management commands)
+
+- Chạy trên một database tạm đã migrate, không đụng tới dữ liệu thật
+- Với SQLite database tạm là file (không phải :memory:) để nhiều thread
+  cùng kết nối được
+- File phân tích (ANALYTICS_DIR) của database tạm nằm trong thư mục tạm
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+from django.db import connection
+from django.test.utils import override_settings
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Tạo database tạm, migrate và xóa đi khi kết thúc"""
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+
+    path = None
+    if connection.vendor == 'sqlite':
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        test_settings['NAME'] = path
+
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    try:
+        with tempfile.TemporaryDirectory() as folder, override_settings(ANALYTICS_DIR=folder):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = old_test_name
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def seed_data(agencies=1, products=1, stock=0, price=10000, max_debt=10**12):
+    """
+    Tạo dữ liệu nền tối thiểu: 1 user staff, 1 quận, 1 loại đại lý, 1 đơn vị,
+    `agencies` đại lý và `products` sản phẩm
+    """
+    from django.contrib.auth import get_user_model
+    from agencies.models import District, AgencyType, Agency
+    from products.alerts import refresh_alerts
+    from products.models import Unit, Product, StockMovement
+
+    user = get_user_model().objects.create_user(
+        username='bench', password='bench', role='staff'
+    )
+    district = District.objects.create(name='Quận bench')
+    agency_type = AgencyType.objects.create(name='Loại bench', max_debt=max_debt)
+    unit = Unit.objects.create(name='cái')
+
+    Agency.objects.bulk_create([
+        Agency(
+            name=f'Đại lý {i}', agency_type=agency_type, district=district,
+            phone='0900000000', address='bench', reception_date=date.today()
+        )
+        for i in range(agencies)
+    ])
+    Product.objects.bulk_create([
+        Product(name=f'Sản phẩm {i}', unit=unit, price=price, stock_quantity=stock)
+        for i in range(products)
+    ])
+
+    products = list(Product.objects.order_by('id'))
+    StockMovement.record(StockMovement.ADJUSTMENT, [(product.pk, stock, '') for product in products])
+    if not stock:
+        # Không có dòng sổ kho nào -> tự đồng bộ danh sách hết hàng
+        refresh_alerts([product.pk for product in products])
+
+    return {
+        'user': user,
+        'agencies': list(Agency.objects.order_by('id')),
+        'products': products,
+    }
@@ -0,0 +1,87 @@
+"""
+Cache ngắn hạn cho các API thống kê được gọi liên tục (dashboard)
+
+- Mỗi nhóm dữ liệu (group) có 1 số phiên bản trong cache, invalidate(group)
+  tăng phiên bản -> mọi key cũ của nhóm tự hết hiệu lực, không cần xóa từng key
+- Chống dồn request (stampede): khi cache trống chỉ 1 request được tính lại
+  (giữ khóa bằng cache.add), các request khác chờ kết quả đó
+- Trả về kèm tuổi của dữ liệu để API gắn header X-Cache / Age
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def _version(group):
+    version = cache.get(f'{group}:version')
+    if version is None:
+        cache.add(f'{group}:version', 1, timeout=None)
+        version = cache.get(f'{group}:version', 1)
+    return version
+
+
+def make_key(group, params=None):
+    """Key cache theo nhóm, phiên bản hiện tại của nhóm và bộ tham số"""
+    digest = ''
+    if params:
+        payload = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+        digest = ':' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    return f'{group}:v{_version(group)}{digest}'
+
+
+def get_or_compute(group, compute, params=None, ttl=None):
+    """
+    Lấy giá trị từ cache hoặc tính lại bằng compute().
+    Trả về (giá trị, hit?, tuổi tính bằng giây).
+    """
+    if ttl is None:
+        ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 30)
+    key = make_key(group, params)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return entry['value'], True, time.time() - entry['computed_at']
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        # Request khác đang tính -> chờ kết quả của request đó
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['value'], True, time.time() - entry['computed_at']
+        # Chờ quá lâu -> tự tính (không giữ khóa)
+        return compute(), False, 0
+
+    try:
+        value = compute()
+        cache.set(key, {'value': value, 'computed_at': time.time()}, timeout=ttl)
+    finally:
+        cache.delete(lock_key)
+    return value, False, 0
+
+
+def invalidate(group):
+    """Bỏ cache của nhóm (sau khi transaction hiện tại commit)"""
+    def bump():
+        try:
+            cache.incr(f'{group}:version')
+        except ValueError:
+            cache.add(f'{group}:version', 2, timeout=None)
+    transaction.on_commit(bump)
+
+
+def cache_headers(response, hit, age):
+    """Gắn header X-Cache (HIT/MISS) và Age (giây)"""
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    response['Age'] = str(int(age))
+    return response
@@ -0,0 +1,286 @@
+"""
+Xuất dữ liệu danh sách ra file CSV / Excel (XLSX) dạng stream
+
+- Đọc bằng values_list().iterator(chunk_size) -> bộ nhớ không tăng theo số dòng,
+  header của file được gửi ngay trước khi database trả dòng đầu tiên
+- XLSX được ghi trực tiếp (zip + XML, chuỗi inline) nên không cần thư viện ngoài
+- ViewSet dùng ExportMixin + khai báo export_columns để có action
+  GET .../export/?format=csv|xlsx (nhận cùng bộ lọc với danh sách)
+- File lớn: thêm &background=true -> ghi file trong tác vụ nền (reports.jobs)
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import HttpRequest, QueryDict, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+CHUNK_SIZE = 2000
+
+
+class CSVRenderer(BaseRenderer):
+    """Chỉ dùng để DRF nhận ?format=csv (dữ liệu đi qua StreamingHttpResponse)"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+
+class XLSXRenderer(BaseRenderer):
+    """Chỉ dùng để DRF nhận ?format=xlsx"""
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+
+RENDERERS = {'csv': CSVRenderer, 'xlsx': XLSXRenderer}
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _rows(queryset, columns):
+    """Các dòng đã chuyển đổi theo export_columns, đọc từng lô từ database"""
+    fields = [column[1] for column in columns]
+    converters = [column[2] if len(column) > 2 else None for column in columns]
+    for row in queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            _cell(convert(value) if convert else value)
+            for value, convert in zip(row, converters)
+        ]
+
+
+# ============================================================
+# CSV
+# ============================================================
+
+
+def stream_csv(queryset, columns):
+    """Sinh các đoạn bytes của file CSV (UTF-8 có BOM để Excel đọc đúng tiếng Việt)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column[0] for column in columns])
+    yield ('\ufeff' + buffer.getvalue()).encode('utf-8')
+
+    count = 0
+    for row in _rows(queryset, columns):
+        if count == 0:
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow(row)
+        count += 1
+        if count == CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            count = 0
+    if count:
+        yield buffer.getvalue().encode('utf-8')
+
+
+# ============================================================
+# XLSX
+# ============================================================
+
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+# Ký tự điều khiển không hợp lệ trong XML
+_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _static_parts(sheet_name):
+    return {
+        '[Content_Types].xml': (
+            f'{_XML}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            f'{_XML}<Relationships xmlns="{_PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            f'{_XML}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            f'{_XML}<Relationships xmlns="{_PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        ),
+    }
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, bool):
+            cells.append(f'<c t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float, Decimal)):
+            cells.append(f'<c><v>{value}</v></c>')
+        elif value == '':
+            cells.append('<c/>')
+        else:
+            text = escape(_ILLEGAL.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+class _Sink(io.RawIOBase):
+    """File chỉ ghi, không seek được: zipfile ghi vào, stream lấy ra từng đoạn"""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def stream_xlsx(queryset, columns, sheet_name='Sheet1'):
+    """Sinh các đoạn bytes của file XLSX 1 sheet"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _static_parts(sheet_name[:31]).items():
+            archive.writestr(name, content)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(f'{_XML}<worksheet xmlns="{_MAIN_NS}"><sheetData>'.encode('utf-8'))
+            sheet.write(_xlsx_row([column[0] for column in columns]).encode('utf-8'))
+            yield sink.drain()
+
+            batch = []
+            for row in _rows(queryset, columns):
+                batch.append(_xlsx_row(row))
+                if len(batch) == CHUNK_SIZE:
+                    sheet.write(''.join(batch).encode('utf-8'))
+                    batch.clear()
+                    yield sink.drain()
+            sheet.write((''.join(batch) + '</sheetData></worksheet>').encode('utf-8'))
+    yield sink.drain()
+
+
+# ============================================================
+# RESPONSE / MIXIN
+# ============================================================
+
+
+def export_response(queryset, columns, file_format, name):
+    """StreamingHttpResponse tải file `name`-<ngày>.csv|xlsx"""
+    if file_format == 'xlsx':
+        content = stream_xlsx(queryset, columns, sheet_name=name)
+    else:
+        file_format = 'csv'
+        content = stream_csv(queryset, columns)
+
+    renderer = RENDERERS[file_format]
+    content_type = renderer.media_type + (f'; charset={renderer.charset}' if renderer.charset else '')
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}-{date.today().isoformat()}.{file_format}"'
+    return response
+
+
+def write_export(path, queryset, columns, file_format, name, progress=None):
+    """
+    Ghi file export ra đĩa (dùng cho tác vụ nền), trả về số byte.
+    `progress(%)` (nếu có) được gọi sau mỗi lô CHUNK_SIZE dòng.
+    """
+    total = queryset.count() if progress else 0
+    if file_format == 'xlsx':
+        content = stream_xlsx(queryset, columns, sheet_name=name)
+    else:
+        content = stream_csv(queryset, columns)
+
+    size = 0
+    with open(path, 'wb') as output:
+        # Đoạn đầu tiên là header, mỗi đoạn sau là 1 lô CHUNK_SIZE dòng
+        for index, chunk in enumerate(content):
+            output.write(chunk)
+            size += len(chunk)
+            if progress and total and index:
+                progress(min(99, index * CHUNK_SIZE * 100 / total))
+    return size
+
+
+class ExportMixin:
+    """
+    Thêm action GET export/?format=csv|xlsx cho ViewSet (mặc định csv)
+    - export_columns: [(tiêu đề cột, field trong values_list, hàm chuyển đổi - tùy chọn)]
+    - export_name: tên file / tên sheet
+    - &background=true (Admin/Staff): chạy thành tác vụ nền (reports.jobs), trả về 202
+      kèm tác vụ; tải file qua /api/reports/jobs/<id>/download/
+    """
+    export_columns = []
+    export_name = 'export'
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, XLSXRenderer])
+    def export(self, request):
+        if request.query_params.get('background', '').lower() in ('1', 'true'):
+            return self.export_in_background(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, self.export_columns, request.accepted_renderer.format, self.export_name)
+
+    def export_in_background(self, request):
+        from accounts.views import IsStaff
+        from reports import jobs
+        from reports.views import job_response
+
+        if not IsStaff().has_permission(request, self):
+            return Response({'error': 'Chỉ Admin/Staff được xuất file chạy nền'}, status=status.HTTP_403_FORBIDDEN)
+
+        query = request.query_params.copy()
+        for param in ('background', 'format'):
+            query.pop(param, None)
+        job, created = jobs.submit('export', {
+            'view': f'{type(self).__module__}.{type(self).__name__}',
+            'query': query.urlencode(),
+            'format': request.accepted_renderer.format,
+            'user': request.user.pk,
+        }, request.user)
+        return job_response(job, created, f'Đang xuất file {self.export_name}')
+
+    @classmethod
+    def export_queryset(cls, query, user):
+        """Dựng lại queryset export từ query string + user (trong tác vụ nền, không có request thật)"""
+        http_request = HttpRequest()
+        http_request.method = 'GET'
+        http_request.GET = QueryDict(query)
+        request = Request(http_request)
+        request.user = user
+        view = cls(request=request, action='export', format_kwarg=None, args=(), kwargs={})
+        return view.filter_queryset(view.get_queryset())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Lỗi (400/401/403...) của action export vẫn trả về dạng JSON
+        if isinstance(response, Response) and isinstance(response.accepted_renderer, tuple(RENDERERS.values())):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
+        return response
@@ -0,0 +1,188 @@
+"""
+Phân trang dạng keyset (cursor) cho toàn bộ API
+
+- Thứ tự sắp xếp lấy từ queryset (order_by) hoặc Meta.ordering của model,
+  luôn thêm id vào cuối để thứ tự là duy nhất
+- Cursor lưu giá trị các cột sắp xếp của dòng cuối trang, trang sau lọc bằng
+  điều kiện (a, b, id) < (va, vb, vid) nên không phải bỏ qua (OFFSET) các dòng
+  trước đó -> tốc độ trang thứ N không phụ thuộc N
+- Các cột dùng để sắp xếp phải NOT NULL
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Phân trang keyset: ?cursor=...&page_size=..."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor không hợp lệ'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ----- Kích thước trang -----
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                page_size = int(value)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    # ----- Thứ tự sắp xếp -----
+
+    def get_ordering(self, queryset):
+        """Danh sách (tên cột, giảm dần?) - luôn kết thúc bằng pk"""
+        fields = queryset.query.order_by or queryset.model._meta.ordering or []
+        ordering = []
+        for field in fields:
+            if not isinstance(field, str):
+                continue
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if name == 'id':
+                name = 'pk'
+            ordering.append((name, descending))
+
+        if not any(name == 'pk' for name, _ in ordering):
+            ordering.append(('pk', ordering[0][1] if ordering else False))
+        return ordering
+
+    def _order_by(self, reverse):
+        return [
+            ('-' if descending != reverse else '') + name
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, position, reverse):
+        """Điều kiện lấy các dòng đứng sau vị trí cursor theo thứ tự hiện tại"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    # ----- Cursor -----
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['p']
+            reverse = bool(payload.get('r'))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self._to_python(name, value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError,
+                binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, instance, reverse):
+        values = [self._to_json(self._value(instance, name)) for name, _ in self.ordering]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def _value(self, instance, name):
+        if isinstance(instance, dict):
+            return instance[name]
+        for part in name.split('__'):
+            instance = getattr(instance, part)
+        return instance
+
+    def _to_python(self, name, value):
+        """Chuyển giá trị trong cursor về kiểu của cột (cột annotate giữ nguyên)"""
+        if '__' in name:
+            return value
+        try:
+            field = self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    @staticmethod
+    def _to_json(value):
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
     'orders',
     'payments',
     'reports',
+    'idempotency',
+    'search',
 ]
 
 # Custom User Model - Quan trọng: Phải khai báo trước khi migrate
@@ -91,8 +93,15 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # Backend SQLite của Django, dùng giới hạn tham số / câu lệnh thật của SQLite
+        'ENGINE': 'config.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Chờ khóa ghi thay vì báo lỗi "database is locked" ngay
+            'timeout': 20,
+            # Transaction lấy khóa ghi ngay từ đầu, tránh lỗi khi nhiều request cùng ghi
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -147,6 +156,12 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cho phép frontend gửi header Idempotency-Key và đọc header Idempotent-Replayed
+from corsheaders.defaults import default_headers
+
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'X-Cache', 'Age']
+
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -155,6 +170,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Phân trang keyset (cursor) theo thứ tự mặc định của từng model
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
 # JWT Settings
@@ -166,3 +184,28 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+
+# Idempotency-Key cho API tạo phiếu xuất / phiếu thu
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_PROCESSING_TIMEOUT = timedelta(minutes=5)
+
+# Tác vụ báo cáo chạy nền: số thread xử lý (0 = chạy luôn trong request),
+# tác vụ chờ/chạy quá REPORT_JOB_TIMEOUT coi như bị treo
+REPORT_JOB_WORKERS = 2
+REPORT_JOB_TIMEOUT = timedelta(hours=1)
+# Thư mục lưu file xuất bởi tác vụ nền (export/?background=true)
+REPORT_EXPORT_DIR = BASE_DIR / 'export_files'
+
+# Cache trong bộ nhớ process (chạy nhiều process thì đổi sang Redis/Memcached
+# để các process dùng chung cache và khóa chống dồn request)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Thời gian cache số liệu dashboard (giây)
+DASHBOARD_CACHE_TTL = 30
+
+# Thư mục lưu dữ liệu phân tích (cột NumPy) của các tháng đã chốt
+ANALYTICS_DIR = BASE_DIR / 'analytics_data'
@@ -0,0 +1,21 @@
+"""
+Backend SQLite của Django + giới hạn tham số thật của kết nối
+
+- Django giả định mỗi câu lệnh SQLite tối đa 999 tham số (giới hạn mặc định
+  trước SQLite 3.32) nên bulk_create luôn tách lô ~999 / số cột, kể cả khi
+  truyền batch_size lớn hơn. SQLite >= 3.32 cho phép 32766 tham số / câu lệnh
+- Đọc giới hạn thật (SQLITE_LIMIT_VARIABLE_NUMBER) khi mở kết nối, để các
+  câu ghi hàng loạt có batch_size tường minh (sổ kho, dòng phiếu xuất)
+  chạy đúng số câu lệnh dự kiến
+"""
+import sqlite3
+
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        self.features.max_query_params = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        return conn
@@ -0,0 +1 @@
+# App chống tạo trùng khi client gửi lại request (Idempotency-Key)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['id', 'endpoint', 'key', 'user', 'status', 'response_status', 'created_at', 'expires_at']
+    list_filter = ['status', 'endpoint']
+    search_fields = ['key']
+    readonly_fields = ['response_body']
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Key')),
+                ('endpoint', models.CharField(max_length=200, verbose_name='Endpoint')),
+                ('request_hash', models.CharField(max_length=64, verbose_name='Mã băm request')),
+                ('status', models.CharField(choices=[('processing', 'Đang xử lý'), ('completed', 'Đã xử lý')], default='processing', max_length=20, verbose_name='Trạng thái')),
+                ('response_status', models.IntegerField(blank=True, null=True, verbose_name='HTTP status')),
+                ('response_body', models.JSONField(blank=True, null=True, verbose_name='Response')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Hết hạn')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL, verbose_name='Người gửi')),
+            ],
+            options={
+                'verbose_name': 'Idempotency key',
+                'verbose_name_plural': 'Danh sách idempotency key',
+                'unique_together': {('user', 'endpoint', 'key')},
+            },
+        ),
+    ]
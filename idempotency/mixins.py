@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+# ============================================================
+# IDEMPOTENT CREATE - Mixin cho ViewSet hỗ trợ header Idempotency-Key
+# ============================================================
+
+
+class IdempotentCreateMixin:
+    """
+    Thêm hỗ trợ header Idempotency-Key cho action create của ViewSet
+    - Gửi lại cùng key + cùng nội dung sau khi đã tạo thành công
+      -> trả response đã lưu (header Idempotent-Replayed)
+    - Cùng key nhưng khác nội dung -> 422
+    - Request đầu còn đang chạy -> 409
+    ViewSet muốn xử lý lỗi riêng khi tạo thì ghi đè create_response().
+    """
+    idempotency_header = 'Idempotency-Key'
+    
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return self.create_response(request, *args, **kwargs)
+        
+        if len(key) > 255:
+            return Response(
+                {'error': f'{self.idempotency_header} dài tối đa 255 ký tự'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        endpoint = f'{request.method} {request.path}'
+        request_hash = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        
+        record, claimed = IdempotencyKey.claim(request.user, endpoint, key, request_hash)
+        if not claimed:
+            return self.replay_response(record, request_hash)
+        
+        try:
+            response = self.create_response(request, *args, **kwargs)
+        except Exception:
+            # Dữ liệu không hợp lệ / lỗi -> nhả key để client sửa và gửi lại
+            record.delete()
+            raise
+        
+        # Chỉ lưu response tạo thành công, các trường hợp khác nhả key
+        if status.is_success(response.status_code):
+            body = json.loads(JSONRenderer().render(response.data) or 'null')
+            record.complete(response.status_code, body)
+        else:
+            record.delete()
+        return response
+    
+    def create_response(self, request, *args, **kwargs):
+        """Tạo bản ghi và trả về Response"""
+        return super().create(request, *args, **kwargs)
+    
+    def replay_response(self, record, request_hash):
+        if record.request_hash != request_hash:
+            return Response(
+                {'error': f'{self.idempotency_header} đã được dùng cho 1 request khác'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if record.status != 'completed':
+            return Response(
+                {'error': 'Request với key này đang được xử lý, vui lòng thử lại sau'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            record.response_body,
+            status=record.response_status,
+            headers={'Idempotent-Replayed': 'true'}
+        )
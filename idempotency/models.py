@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+# ============================================================
+# IDEMPOTENCY KEY - Chống tạo trùng khi client gửi lại request
+# ============================================================
+# Giải thích:
+# - Client gửi header Idempotency-Key khi POST tạo phiếu
+# - Request đầu tiên "giữ chỗ" key (status=processing), xử lý xong thì lưu
+#   lại response (status=completed)
+# - Gửi lại cùng key -> trả về response đã lưu, không xử lý lại
+# - Key hết hạn sau IDEMPOTENCY_KEY_TTL
+# ============================================================
+
+
+class IdempotencyKey(models.Model):
+    """
+    Key chống trùng - Lưu response của request tạo mới
+    """
+    STATUS_CHOICES = (
+        ('processing', 'Đang xử lý'),
+        ('completed', 'Đã xử lý'),
+    )
+    
+    key = models.CharField(max_length=255, verbose_name='Key')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name='Người gửi'
+    )
+    endpoint = models.CharField(max_length=200, verbose_name='Endpoint')
+    request_hash = models.CharField(max_length=64, verbose_name='Mã băm request')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='processing',
+        verbose_name='Trạng thái'
+    )
+    
+    response_status = models.IntegerField(null=True, blank=True, verbose_name='HTTP status')
+    response_body = models.JSONField(null=True, blank=True, verbose_name='Response')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Hết hạn')
+    
+    class Meta:
+        verbose_name = 'Idempotency key'
+        verbose_name_plural = 'Danh sách idempotency key'
+        unique_together = ['user', 'endpoint', 'key']
+    
+    def __str__(self):
+        return f"{self.endpoint} [{self.key}] - {self.get_status_display()}"
+    
+    @property
+    def is_reclaimable(self):
+        """Key đã hết hạn, hoặc request giữ key bị treo quá lâu"""
+        now = timezone.now()
+        if self.expires_at <= now:
+            return True
+        timeout = getattr(settings, 'IDEMPOTENCY_PROCESSING_TIMEOUT', timedelta(minutes=5))
+        return self.status == 'processing' and self.created_at <= now - timeout
+    
+    @classmethod
+    def claim(cls, user, endpoint, key, request_hash):
+        """
+        Giữ chỗ key cho request hiện tại.
+        Trả về (record, True) nếu giữ được, (record đã có, False) nếu key đang/đã dùng.
+        """
+        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+        for _ in range(3):
+            try:
+                with transaction.atomic():
+                    record = cls.objects.create(
+                        user=user, endpoint=endpoint, key=key,
+                        request_hash=request_hash,
+                        expires_at=timezone.now() + ttl,
+                    )
+                return record, True
+            except IntegrityError:
+                pass
+            
+            record = cls.objects.filter(user=user, endpoint=endpoint, key=key).first()
+            if record is None:
+                continue
+            if not record.is_reclaimable:
+                return record, False
+            # Xóa key cũ rồi thử giữ chỗ lại (chỉ 1 request xóa được)
+            cls.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+        return record, False
+    
+    def complete(self, status_code, body):
+        """Lưu response để trả lại cho các lần gửi lại"""
+        self.status = 'completed'
+        self.response_status = status_code
+        self.response_body = body
+        self.save(update_fields=['status', 'response_status', 'response_body'])
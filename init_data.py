@@ -204,6 +204,13 @@ regulations = [
         'value': 'true',
         'description': 'Đại lý có thể đặt hàng khi chưa thanh toán hết công nợ'
     },
+    {
+        'code': 'LOW_STOCK_THRESHOLD',
+        'name': 'Ngưỡng tồn kho thấp',
+        'value': '10',
+        'description': 'Sản phẩm có tồn kho dưới ngưỡng được cảnh báo sắp hết hàng. '
+                       'Ngưỡng riêng: LOW_STOCK_THRESHOLD_UNIT_<id đơn vị>, LOW_STOCK_THRESHOLD_PRODUCT_<id sản phẩm>'
+    },
 ]
 
 for r in regulations:
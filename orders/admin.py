@@ -10,7 +10,13 @@ class ExportOrderItemInline(admin.TabularInline):
 @admin.register(ExportOrder)
 class ExportOrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'agency', 'order_date', 'status', 'total_amount', 'created_by']
+    readonly_fields = ['total_amount', 'total_quantity', 'line_count']
     list_filter = ['status', 'order_date', 'agency']
     search_fields = ['agency__name']
     date_hierarchy = 'order_date'
     inlines = [ExportOrderItemInline]
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Chi tiết có thể đã bị sửa trong inline -> tính lại tổng
+        ExportOrder.refresh_totals([form.instance.pk])
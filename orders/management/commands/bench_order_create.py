@@ -0,0 +1,51 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from config.benchmark import scratch_database, seed_data
+from orders.serializers import ExportOrderCreateSerializer
+
+# ============================================================
+# KIỂM TRA SỐ CÂU TRUY VẤN KHI TẠO PHIẾU XUẤT
+# ============================================================
+# Chạy: python manage.py bench_order_create --lines 1 10 200
+# Số câu truy vấn phải giống nhau với mọi số dòng chi tiết,
+# nếu không lệnh sẽ báo lỗi (dùng được như 1 bài kiểm thử hồi quy).
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Đếm số câu truy vấn khi tạo phiếu xuất với số dòng chi tiết khác nhau'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50, 200])
+    
+    def handle(self, *args, **options):
+        sizes = options['lines']
+        
+        with scratch_database():
+            data = seed_data(products=max(sizes), stock=10**6)
+            agency = data['agencies'][0]
+            
+            counts = {}
+            for size in sizes:
+                payload = {
+                    'agency': agency.pk,
+                    'order_date': str(date.today()),
+                    'items': [
+                        {'product': p.pk, 'quantity': 1, 'unit_price': 10000}
+                        for p in data['products'][:size]
+                    ],
+                }
+                with CaptureQueriesContext(connection) as ctx:
+                    serializer = ExportOrderCreateSerializer(data=payload)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save(created_by=data['user'])
+                counts[size] = len(ctx.captured_queries)
+                self.stdout.write(f'{size:>6} dòng: {counts[size]} câu truy vấn')
+        
+        if len(set(counts.values())) > 1:
+            raise CommandError('Số câu truy vấn thay đổi theo số dòng chi tiết')
+        self.stdout.write(self.style.SUCCESS('OK - số câu truy vấn không đổi'))
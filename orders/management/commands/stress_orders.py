@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from config.benchmark import scratch_database, seed_data
+from agencies.models import Agency
+from products.models import Product
+from orders.models import ExportOrder
+from orders.reservations import StockShortage
+from orders.serializers import ExportOrderCreateSerializer
+
+# ============================================================
+# KIỂM THỬ TẢI - Nhiều đại lý đặt hàng cùng lúc vào vài sản phẩm "nóng"
+# ============================================================
+# Chạy: python manage.py stress_orders --threads 32 --orders 400
+# Kiểm tra: tồn kho cuối = tồn kho đầu - tổng số lượng các phiếu đã tạo,
+# không sản phẩm nào bị âm kho, công nợ khớp với tổng tiền các phiếu.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Bắn nhiều phiếu xuất đồng thời vào cùng sản phẩm và kiểm tra tồn kho'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--orders', type=int, default=400)
+        parser.add_argument('--products', type=int, default=3, help='Số sản phẩm "nóng"')
+        parser.add_argument('--stock', type=int, default=1000, help='Tồn kho ban đầu mỗi sản phẩm')
+        parser.add_argument('--max-quantity', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with scratch_database():
+            data = seed_data(
+                agencies=options['threads'], products=options['products'], stock=options['stock']
+            )
+            user = data['user']
+            agencies = data['agencies']
+            product_ids = [p.pk for p in data['products']]
+
+            payloads = []
+            for i in range(options['orders']):
+                lines = rng.sample(product_ids, rng.randint(1, len(product_ids)))
+                payloads.append({
+                    'agency': agencies[i % len(agencies)].pk,
+                    'order_date': str(date.today()),
+                    'items': [
+                        {'product': pid, 'quantity': rng.randint(1, options['max_quantity']),
+                         'unit_price': 1000}
+                        for pid in lines
+                    ],
+                })
+
+            results = {'committed': [], 'rejected': 0, 'errors': []}
+            lock = threading.Lock()
+            barrier = threading.Barrier(options['threads'])
+
+            def worker(chunk):
+                barrier.wait()
+                try:
+                    for payload in chunk:
+                        serializer = ExportOrderCreateSerializer(data=payload)
+                        try:
+                            if not serializer.is_valid():
+                                outcome = 'rejected'
+                            else:
+                                serializer.save(created_by=user)
+                                outcome = 'committed'
+                        except StockShortage:
+                            outcome = 'rejected'
+                        except Exception as e:
+                            outcome = e
+                        with lock:
+                            if outcome == 'committed':
+                                results['committed'].append(payload)
+                            elif outcome == 'rejected':
+                                results['rejected'] += 1
+                            else:
+                                results['errors'].append(repr(outcome))
+                finally:
+                    connection.close()
+
+            threads = options['threads']
+            chunks = [payloads[i::threads] for i in range(threads)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(worker, chunks))
+            elapsed = time.perf_counter() - started
+
+            committed_qty = {pid: 0 for pid in product_ids}
+            committed_amount = 0
+            for payload in results['committed']:
+                for line in payload['items']:
+                    committed_qty[line['product']] += line['quantity']
+                    committed_amount += line['quantity'] * line['unit_price']
+
+            final_stock = dict(Product.objects.values_list('pk', 'stock_quantity'))
+            total_debt = Agency.objects.aggregate(total=Sum('current_debt'))['total'] or 0
+            order_count = ExportOrder.objects.count()
+
+        self.stdout.write(
+            f"{len(payloads)} phiếu / {threads} thread trong {elapsed:.2f}s: "
+            f"{len(results['committed'])} thành công, {results['rejected']} bị từ chối, "
+            f"{len(results['errors'])} lỗi"
+        )
+
+        problems = list(results['errors'][:5])
+        for pid in product_ids:
+            expected = options['stock'] - committed_qty[pid]
+            self.stdout.write(
+                f"  Sản phẩm {pid}: tồn cuối {final_stock[pid]}, mong đợi {expected} "
+                f"(đã xuất {committed_qty[pid]})"
+            )
+            if final_stock[pid] != expected:
+                problems.append(f'Sản phẩm {pid}: tồn kho {final_stock[pid]} != {expected}')
+            if final_stock[pid] < 0:
+                problems.append(f'Sản phẩm {pid}: tồn kho âm')
+        if order_count != len(results['committed']):
+            problems.append(f"Số phiếu trong DB ({order_count}) != số phiếu thành công")
+        if total_debt != committed_amount:
+            problems.append(f'Tổng công nợ ({total_debt}) != tổng tiền phiếu ({committed_amount})')
+
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('OK - tồn kho và công nợ khớp'))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    """Tính tổng cho các phiếu đã có (1 câu UPDATE)"""
+    ExportOrder = apps.get_model('orders', 'ExportOrder')
+    ExportOrderItem = apps.get_model('orders', 'ExportOrderItem')
+    
+    items = ExportOrderItem.objects.filter(order=OuterRef('pk')).values('order')
+    ExportOrder.objects.update(
+        total_amount=Coalesce(
+            Subquery(items.annotate(
+                total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
+            ).values('total')),
+            Value(0),
+            output_field=DecimalField(),
+        ),
+        total_quantity=Coalesce(
+            Subquery(items.annotate(total=Sum('quantity')).values('total')), Value(0)
+        ),
+        line_count=Coalesce(
+            Subquery(items.annotate(total=Count('id')).values('total')), Value(0)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportorder',
+            name='line_count',
+            field=models.IntegerField(default=0, verbose_name='Số dòng'),
+        ),
+        migrations.AddField(
+            model_name='exportorder',
+            name='total_amount',
+            field=models.DecimalField(db_index=True, decimal_places=0, default=0, max_digits=15, verbose_name='Tổng tiền'),
+        ),
+        migrations.AddField(
+            model_name='exportorder',
+            name='total_quantity',
+            field=models.IntegerField(default=0, verbose_name='Tổng số lượng'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('orders', '0002_exportorder_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exportorder',
+            index=models.Index(fields=['order_date', 'created_at'], name='order_date_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('orders', '0003_list_ordering_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exportorder',
+            index=models.Index(fields=['agency', 'status', 'order_date'], name='order_agency_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exportorder',
+            index=models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+        ),
+    ]
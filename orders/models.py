@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from agencies.models import Agency
 from products.models import Product
@@ -10,6 +12,8 @@ from products.models import Product
 # - ExportOrder: Phiếu xuất hàng (đại lý đặt mua)
 # - ExportOrderItem: Chi tiết sản phẩm trong phiếu
 # - Khi xuất hàng -> Cộng vào công nợ đại lý
+# - Tổng tiền, tổng số lượng, số dòng được lưu sẵn trên phiếu
+#   (tính khi tạo phiếu) để lọc/sắp xếp/báo cáo bằng SQL
 # ============================================================
 
 
@@ -25,6 +29,14 @@ class ExportOrder(models.Model):
         ('cancelled', 'Đã hủy'),
     )
     
+    # Trạng thái đích -> các trạng thái được phép chuyển sang
+    TRANSITIONS = {
+        'confirmed': ['pending'],
+        'shipping': ['confirmed'],
+        'completed': ['confirmed', 'shipping'],
+        'cancelled': ['pending', 'confirmed'],
+    }
+    
     # Đại lý đặt hàng
     agency = models.ForeignKey(
         Agency,
@@ -51,6 +63,17 @@ class ExportOrder(models.Model):
     
     note = models.TextField(blank=True, null=True, verbose_name='Ghi chú')
     
+    # Tổng hợp từ chi tiết phiếu (giữ nguyên khi hủy phiếu)
+    total_amount = models.DecimalField(
+        max_digits=15,
+        decimal_places=0,
+        default=0,
+        db_index=True,
+        verbose_name='Tổng tiền'
+    )
+    total_quantity = models.IntegerField(default=0, verbose_name='Tổng số lượng')
+    line_count = models.IntegerField(default=0, verbose_name='Số dòng')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -58,19 +81,46 @@ class ExportOrder(models.Model):
         verbose_name = 'Phiếu xuất hàng'
         verbose_name_plural = 'Danh sách phiếu xuất hàng'
         ordering = ['-order_date', '-created_at']
+        indexes = [
+            # Phục vụ phân trang keyset theo thứ tự mặc định
+            models.Index(fields=['order_date', 'created_at'], name='order_date_created_idx'),
+            # Lọc theo đại lý + trạng thái + khoảng ngày (danh sách, báo cáo)
+            models.Index(fields=['agency', 'status', 'order_date'], name='order_agency_status_date_idx'),
+            # Lọc theo trạng thái + khoảng ngày (báo cáo tháng, dashboard)
+            models.Index(fields=['status', 'order_date'], name='order_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"PX-{self.id} - {self.agency.name} ({self.order_date})"
     
-    @property
-    def total_amount(self):
-        """Tổng tiền đơn hàng"""
-        return sum(item.total_price for item in self.items.all())
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ngày lập / trạng thái lúc đọc lên: sửa phiếu đã hoàn thành (kể cả đổi
+        # sang ngày khác) thì số liệu tổng hợp của tháng cũ cũng phải bỏ
+        instance._loaded_order_date = instance.__dict__.get('order_date')
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
     
-    @property
-    def total_quantity(self):
-        """Tổng số lượng sản phẩm"""
-        return sum(item.quantity for item in self.items.all())
+    @classmethod
+    def refresh_totals(cls, order_ids):
+        """Tính lại tổng tiền/số lượng/số dòng từ chi tiết (1 câu UPDATE)"""
+        items = ExportOrderItem.objects.filter(order=OuterRef('pk')).values('order')
+        cls.objects.filter(pk__in=order_ids).update(
+            total_amount=Coalesce(
+                Subquery(items.annotate(
+                    total=Sum(F('quantity') * F('unit_price'), output_field=DecimalField())
+                ).values('total')),
+                Value(0),
+                output_field=DecimalField(),
+            ),
+            total_quantity=Coalesce(
+                Subquery(items.annotate(total=Sum('quantity')).values('total')), Value(0)
+            ),
+            line_count=Coalesce(
+                Subquery(items.annotate(total=Count('id')).values('total')), Value(0)
+            ),
+        )
 
 
 class ExportOrderItem(models.Model):
@@ -0,0 +1,109 @@
+from django.db import connection, transaction
+from django.db.models import Case, When, F, Q, Value
+from django.utils import timezone
+
+from products.models import Product, StockMovement
+
+# ============================================================
+# STOCK RESERVATION - Giữ hàng (trừ tồn kho) cho phiếu xuất
+# ============================================================
+# Giải thích:
+# - Tồn kho được trừ trực tiếp trong database bằng 1 câu UPDATE có điều kiện
+#   stock_quantity >= số lượng, không dựa vào giá trị đã đọc trước đó
+# - Nếu có sản phẩm không đủ hàng -> không trừ sản phẩm nào cả và trả về
+#   báo cáo thiếu hàng theo từng sản phẩm
+# - Hủy phiếu -> hoàn lại tồn kho bằng 1 câu UPDATE (release_stock)
+# - Cả 2 chiều đều ghi sổ kho (StockMovement) bằng 1 câu bulk_create
+# ============================================================
+
+
+class StockShortage(Exception):
+    """Không đủ tồn kho cho 1 hoặc nhiều sản phẩm"""
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__('Tồn kho không đủ: ' + ', '.join(
+            f"{s['product_name']} (cần {s['requested']}, còn {s['available']})"
+            for s in shortfalls
+        ))
+
+
+class _Rollback(Exception):
+    pass
+
+
+def aggregate_quantities(lines):
+    """Gộp số lượng theo sản phẩm từ danh sách (product_id, quantity)"""
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def shortfall_report(quantities):
+    """Báo cáo các sản phẩm không đủ hàng (1 câu SELECT)"""
+    products = Product.objects.filter(pk__in=quantities).values_list('pk', 'name', 'stock_quantity')
+    found = {pk: (name, stock) for pk, name, stock in products}
+
+    report = []
+    for product_id, requested in sorted(quantities.items()):
+        name, available = found.get(product_id, (None, 0))
+        if available < requested:
+            report.append({
+                'product': product_id,
+                'product_name': name,
+                'requested': requested,
+                'available': available,
+                'shortage': requested - available,
+            })
+    return report
+
+
+def reserve_stock(quantities, reference=''):
+    """
+    Trừ tồn kho cho {product_id: số lượng} - tất cả hoặc không gì cả.
+    Raise StockShortage (kèm báo cáo thiếu hàng) nếu có sản phẩm không đủ.
+    `reference`: chứng từ ghi vào sổ kho (ví dụ PX-12).
+    """
+    if not quantities:
+        return
+
+    # stock_quantity >= CASE id WHEN ... END thay vì chuỗi OR theo từng sản phẩm:
+    # chuỗi OR lồng sâu 1 cấp mỗi sản phẩm, vượt giới hạn độ sâu biểu thức
+    # của SQLite (1000) khi phiếu có ~1000 sản phẩm
+    requested = Case(*[When(pk=product_id, then=Value(quantity))
+                       for product_id, quantity in quantities.items()])
+    enough_stock = Q(pk__in=quantities, stock_quantity__gte=requested)
+
+    try:
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                # Khóa dòng theo thứ tự id để 2 phiếu cùng sản phẩm không deadlock
+                list(Product.objects.select_for_update().filter(
+                    pk__in=quantities
+                ).order_by('pk').values_list('pk', flat=True))
+
+            updated = Product.objects.filter(enough_stock).update(
+                stock_quantity=Case(
+                    *[When(pk=product_id, then=F('stock_quantity') - Value(quantity))
+                      for product_id, quantity in quantities.items()],
+                    default=F('stock_quantity'),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(quantities):
+                # Rollback phần đã trừ rồi mới đọc lại tồn kho để báo cáo
+                raise _Rollback
+            StockMovement.record(StockMovement.ORDER, [
+                (product_id, -quantity, reference) for product_id, quantity in quantities.items()
+            ])
+    except _Rollback:
+        raise StockShortage(shortfall_report(quantities))
+
+
+def release_stock(quantities, movements=None):
+    """
+    Hoàn lại tồn kho cho {product_id: số lượng} (khi hủy phiếu).
+    `movements`: [(product_id, số lượng, chứng từ)] ghi sổ kho theo từng phiếu.
+    """
+    Product.add_stock(quantities, kind=StockMovement.CANCEL, movements=movements)
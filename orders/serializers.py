@@ -1,6 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import ExportOrder, ExportOrderItem
+from agencies.models import Agency
 from agencies.serializers import AgencySerializer
+from products.serializers import ProductLookupField
+from .reservations import aggregate_quantities, reserve_stock
 
 # ============================================================
 # ORDER SERIALIZERS
@@ -11,6 +15,7 @@ class ExportOrderItemSerializer(serializers.ModelSerializer):
     """
     Chi tiết phiếu xuất
     """
+    product = ProductLookupField()
     product_name = serializers.CharField(source='product.name', read_only=True)
     unit_name = serializers.CharField(source='product.unit.name', read_only=True)
     total_price = serializers.DecimalField(max_digits=15, decimal_places=0, read_only=True)
@@ -28,8 +33,6 @@ class ExportOrderSerializer(serializers.ModelSerializer):
     items = ExportOrderItemSerializer(many=True, read_only=True)
     agency_name = serializers.CharField(source='agency.name', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
-    total_amount = serializers.DecimalField(max_digits=15, decimal_places=0, read_only=True)
-    total_quantity = serializers.IntegerField(read_only=True)
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
     
     class Meta:
@@ -37,10 +40,13 @@ class ExportOrderSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'agency', 'agency_name', 'order_date', 
             'status', 'status_display', 'created_by', 'created_by_name',
-            'note', 'items', 'total_amount', 'total_quantity',
+            'note', 'items', 'total_amount', 'total_quantity', 'line_count',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'created_by', 'total_amount', 'total_quantity', 'line_count',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
 
 
 class ExportOrderCreateSerializer(serializers.ModelSerializer):
@@ -53,6 +59,12 @@ class ExportOrderCreateSerializer(serializers.ModelSerializer):
         model = ExportOrder
         fields = ['agency', 'order_date', 'note', 'items']
     
+    def to_internal_value(self, data):
+        # Nạp toàn bộ sản phẩm của phiếu bằng 1 câu SELECT trước khi validate từng dòng
+        if hasattr(data, 'get'):
+            self.context['product_cache'] = ProductLookupField.build_cache(data.get('items'))
+        return super().to_internal_value(data)
+    
     def validate_items(self, value):
         """Kiểm tra phải có ít nhất 1 item và số lượng >= tồn kho"""
         if not value:
@@ -62,7 +74,7 @@ class ExportOrderCreateSerializer(serializers.ModelSerializer):
             if item.get('quantity', 0) <= 0:
                 raise serializers.ValidationError('Số lượng sản phẩm phải lớn hơn 0')
             
-            # Kiểm tra tồn kho đủ không
+            # Kiểm tra sơ bộ tồn kho (kiểm tra chính xác khi trừ kho trong database)
             product = item.get('product')
             quantity = item.get('quantity', 0)
             if product and quantity > product.stock_quantity:
@@ -90,22 +102,46 @@ class ExportOrderCreateSerializer(serializers.ModelSerializer):
         return attrs
     
     def create(self, validated_data):
+        """
+        Tạo phiếu trong 1 transaction với số câu truy vấn cố định:
+        - bulk_create toàn bộ chi tiết
+        - Giữ hàng bằng reserve_stock (raise StockShortage nếu thiếu hàng)
+        - Cộng công nợ đại lý bằng 1 câu UPDATE
+        """
         items_data = validated_data.pop('items')
-        order = ExportOrder.objects.create(**validated_data)
         
-        total_amount = 0
-        for item_data in items_data:
-            item = ExportOrderItem.objects.create(order=order, **item_data)
-            total_amount += item.total_price
-            
-            # Trừ tồn kho
-            product = item_data['product']
-            product.stock_quantity -= item_data['quantity']
-            product.save()
+        quantities = aggregate_quantities(
+            (item_data['product'].pk, item_data['quantity']) for item_data in items_data
+        )
+        total_amount = sum(item_data['quantity'] * item_data['unit_price'] for item_data in items_data)
         
-        # Cập nhật công nợ đại lý
-        agency = order.agency
-        agency.current_debt += total_amount
-        agency.save()
+        with transaction.atomic():
+            order = ExportOrder.objects.create(
+                **validated_data,
+                total_amount=total_amount,
+                total_quantity=sum(quantities.values()),
+                line_count=len(items_data),
+            )
+            ExportOrderItem.objects.bulk_create([
+                ExportOrderItem(order=order, **item_data) for item_data in items_data
+            ])
+            
+            # Trừ tồn kho - thiếu hàng thì rollback toàn bộ phiếu
+            reserve_stock(quantities, reference=f'PX-{order.pk}')
+            
+            # Cập nhật công nợ đại lý
+            Agency.adjust_debt({order.agency_id: total_amount})
         
         return order
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    """
+    Chuyển trạng thái nhiều phiếu xuất cùng lúc
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+    status = serializers.ChoiceField(choices=['confirmed', 'shipping', 'completed', 'cancelled'])
@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from agencies.models import Agency
+from config.cache import invalidate
+from reports.rollups import record_orders
+from .models import ExportOrder, ExportOrderItem
+from .reservations import release_stock
+
+# ============================================================
+# ORDER SERVICES - Chuyển trạng thái phiếu xuất theo lô
+# ============================================================
+# Giải thích:
+# - Luật chuyển trạng thái lấy từ ExportOrder.TRANSITIONS
+# - Cả lô được cập nhật bằng 1 câu UPDATE ... WHERE status IN (...)
+# - Kết quả trả về theo từng id (thành công hoặc lý do lỗi)
+# - Hủy phiếu: hoàn tồn kho và trừ công nợ cho cả lô trong cùng transaction
+# - Báo cáo doanh số/công nợ tháng được cập nhật dần (reports.rollups)
+# ============================================================
+
+NOT_FOUND = 'Không tìm thấy đơn hàng'
+
+TRANSITION_ERRORS = {
+    'confirmed': 'Chỉ có thể xác nhận đơn hàng đang chờ xử lý',
+    'shipping': 'Chỉ có thể giao đơn hàng đã xác nhận',
+    'completed': 'Không thể hoàn thành đơn hàng này',
+    'cancelled': 'Không thể hủy đơn hàng này',
+}
+
+
+def transition_orders(queryset, ids, target):
+    """
+    Chuyển các phiếu `ids` (trong phạm vi `queryset`) sang trạng thái `target`.
+    Trả về danh sách {'id', 'success', 'status', 'error'} theo thứ tự ids.
+    """
+    allowed = ExportOrder.TRANSITIONS[target]
+    ids = list(dict.fromkeys(ids))
+
+    with transaction.atomic():
+        rows = list(queryset.select_for_update(of=('self',)).order_by().filter(
+            pk__in=ids
+        ).values_list('pk', 'status', 'agency_id', 'total_amount', 'order_date'))
+        current = {row[0]: row[1] for row in rows}
+        eligible = [row for row in rows if row[1] in allowed]
+        if eligible:
+            ExportOrder.objects.filter(
+                pk__in=[row[0] for row in eligible], status__in=allowed
+            ).update(status=target, updated_at=timezone.now())
+            if target == 'cancelled':
+                _reverse_orders(eligible)
+            _update_rollups(eligible, target)
+            invalidate('dashboard')
+
+    eligible = {row[0] for row in eligible}
+    results = []
+    for pk in ids:
+        if pk not in current:
+            results.append({'id': pk, 'success': False, 'status': None, 'error': NOT_FOUND})
+        elif pk in eligible:
+            results.append({'id': pk, 'success': True, 'status': target, 'error': None})
+        else:
+            results.append({
+                'id': pk, 'success': False, 'status': current[pk],
+                'error': TRANSITION_ERRORS[target],
+            })
+    return results
+
+
+def _reverse_orders(rows):
+    """Hoàn tồn kho (1 UPDATE cho mọi sản phẩm) và trừ công nợ (1 UPDATE cho mọi đại lý)"""
+    lines = list(
+        ExportOrderItem.objects.filter(order_id__in=[row[0] for row in rows])
+        .values('order', 'product').annotate(quantity=Sum('quantity'))
+        .values_list('order', 'product', 'quantity').order_by()
+    )
+    quantities = {}
+    for _, product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    release_stock(quantities, movements=[
+        (product_id, quantity, f'PX-{order_id}') for order_id, product_id, quantity in lines
+    ])
+
+    debts = {}
+    for _, _, agency_id, total_amount, _ in rows:
+        debts[agency_id] = debts.get(agency_id, 0) - total_amount
+    Agency.adjust_debt(debts)
+
+
+def _update_rollups(rows, target):
+    """Cộng/trừ báo cáo tháng cho các phiếu vào/ra trạng thái hoàn thành"""
+    if target == 'completed':
+        record_orders([(row[2], row[4], row[3]) for row in rows])
+    else:
+        record_orders([(row[2], row[4], row[3]) for row in rows if row[1] == 'completed'], sign=-1)
@@ -0,0 +1,121 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from config.benchmark import seed_data
+from products.models import Product, StockMovement
+from .models import ExportOrder
+from .serializers import ExportOrderCreateSerializer
+
+# ============================================================
+# KIỂM THỬ TẠO PHIẾU XUẤT
+# ============================================================
+# Giải thích:
+# - Số câu truy vấn khi tạo phiếu không phụ thuộc số dòng chi tiết
+#   (bulk_create chi tiết + sổ kho, trừ tồn kho / cộng công nợ bằng 1 câu UPDATE)
+# - Không xuất quá tồn kho: thiếu hàng -> 400, không trừ tồn kho, không tạo phiếu
+# - Công nợ đại lý tăng đúng bằng tổng tiền phiếu
+# ============================================================
+
+# Số câu truy vấn cố định khi tạo 1 phiếu xuất (xem bench_order_create)
+ORDER_CREATE_QUERIES = 19
+
+
+class ExportOrderCreateTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_data(products=500, stock=100, price=10000)
+        cls.user = data['user']
+        cls.agency = data['agencies'][0]
+        cls.products = data['products']
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def payload(self, lines, quantity=1, unit_price=10000):
+        return {
+            'agency': self.agency.pk,
+            'order_date': str(date.today()),
+            'items': [
+                {'product': product.pk, 'quantity': quantity, 'unit_price': unit_price}
+                for product in self.products[:lines]
+            ],
+        }
+    
+    def create_order(self, payload):
+        serializer = ExportOrderCreateSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(created_by=self.user)
+    
+    def test_query_count_does_not_depend_on_line_count(self):
+        """Phiếu 1, 10, 250 và 500 dòng đều chạy cùng số câu truy vấn"""
+        for lines in [1, 10, 250, 500]:
+            with self.subTest(lines=lines):
+                payload = self.payload(lines)
+                with self.assertNumQueries(ORDER_CREATE_QUERIES):
+                    order = self.create_order(payload)
+                self.assertEqual(order.items.count(), lines)
+                self.assertEqual(
+                    StockMovement.objects.filter(reference=f'PX-{order.pk}').count(), lines
+                )
+    
+    def test_stock_is_decremented_per_product(self):
+        """Dòng trùng sản phẩm được cộng dồn, tồn kho trừ đúng tổng số lượng"""
+        payload = self.payload(2, quantity=30)
+        payload['items'].append(dict(payload['items'][0], quantity=70))
+        
+        self.create_order(payload)
+        
+        first, second = Product.objects.filter(
+            pk__in=[self.products[0].pk, self.products[1].pk]
+        ).order_by('pk')
+        self.assertEqual(first.stock_quantity, 0)
+        self.assertEqual(second.stock_quantity, 70)
+    
+    def test_oversell_is_rejected_without_changes(self):
+        """
+        Tổng số lượng 1 sản phẩm vượt tồn kho (từng dòng vẫn qua kiểm tra sơ bộ)
+        -> 400 kèm báo cáo thiếu hàng, không trừ tồn kho sản phẩm nào
+        """
+        payload = self.payload(3, quantity=50)
+        payload['items'][1]['quantity'] = 60
+        payload['items'].append(dict(payload['items'][1]))
+        
+        response = self.client.post('/api/orders/', payload, format='json')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['shortfalls'], [{
+            'product': self.products[1].pk,
+            'product_name': self.products[1].name,
+            'requested': 120,
+            'available': 100,
+            'shortage': 20,
+        }])
+        self.assertFalse(ExportOrder.objects.exists())
+        self.assertFalse(StockMovement.objects.filter(kind=StockMovement.ORDER).exists())
+        self.assertEqual(
+            set(Product.objects.filter(
+                pk__in=[product.pk for product in self.products[:3]]
+            ).values_list('stock_quantity', flat=True)),
+            {100},
+        )
+        self.agency.refresh_from_db()
+        self.assertEqual(self.agency.current_debt, 0)
+    
+    def test_whole_stock_can_be_exported(self):
+        """Xuất đúng bằng tồn kho vẫn hợp lệ (stock_quantity >= số lượng)"""
+        response = self.client.post('/api/orders/', self.payload(1, quantity=100), format='json')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 0)
+    
+    def test_agency_debt_is_incremented_by_order_total(self):
+        """Mỗi phiếu cộng tổng tiền vào công nợ đại lý"""
+        self.create_order(self.payload(3, quantity=2, unit_price=15000))
+        self.create_order(self.payload(1, quantity=1, unit_price=5000))
+        
+        self.agency.refresh_from_db()
+        self.assertEqual(self.agency.current_debt, 3 * 2 * 15000 + 5000)
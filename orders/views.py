@@ -1,38 +1,82 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
+from django.http import Http404
+from datetime import date
+from decimal import Decimal
 
 from accounts.views import IsAdmin, IsStaff
+from config.exports import ExportMixin
+from idempotency.mixins import IdempotentCreateMixin
+from search import index as search_index
 from .models import ExportOrder, ExportOrderItem
-from .serializers import ExportOrderSerializer, ExportOrderCreateSerializer
+from .serializers import (
+    ExportOrderSerializer, ExportOrderCreateSerializer, BulkTransitionSerializer
+)
+from .reservations import StockShortage
+from .services import NOT_FOUND, transition_orders
 
 # ============================================================
 # ORDER VIEWS
 # ============================================================
 
 
-class ExportOrderViewSet(viewsets.ModelViewSet):
+def parse_decimal(value):
+    """Chuỗi -> Decimal hữu hạn, raise ValueError nếu không hợp lệ"""
+    try:
+        number = Decimal(value)
+    except ArithmeticError:
+        raise ValueError(value)
+    if not number.is_finite():
+        raise ValueError(value)
+    return number
+
+
+class ExportOrderViewSet(ExportMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     API Quản lý phiếu xuất hàng
     - Admin/Staff: Full quyền
     - Agency: Chỉ xem đơn hàng của mình
+    - Tạo phiếu hỗ trợ header Idempotency-Key
+    - Xuất file: GET export/?format=csv|xlsx (cùng bộ lọc với danh sách)
     """
     queryset = ExportOrder.objects.all().select_related(
         'agency', 'created_by'
-    ).prefetch_related('items__product')
+    ).prefetch_related('items__product__unit')
     permission_classes = [IsAuthenticated]
+    export_name = 'phieu-xuat'
+    export_columns = [
+        ('Mã phiếu', 'id'),
+        ('Ngày lập', 'order_date'),
+        ('Mã đại lý', 'agency_id'),
+        ('Đại lý', 'agency__name'),
+        ('Trạng thái', 'status', dict(ExportOrder.STATUS_CHOICES).get),
+        ('Số dòng', 'line_count'),
+        ('Tổng số lượng', 'total_quantity'),
+        ('Tổng tiền', 'total_amount'),
+        ('Người lập', 'created_by__username'),
+        ('Ghi chú', 'note'),
+    ]
     
     def get_serializer_class(self):
         if self.action == 'create':
             return ExportOrderCreateSerializer
         return ExportOrderSerializer
     
+    def _query_param(self, name, parse):
+        """Query param đã chuyển kiểu (None nếu không có), sai định dạng -> 400"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return parse(value)
+        except ValueError:
+            raise ValidationError({name: f'Giá trị không hợp lệ: {value}'})
+    
     def get_queryset(self):
-        from django.db.models import Q
-        from datetime import datetime, timedelta
-        
         user = self.request.user
         queryset = self.queryset
         
@@ -46,22 +90,31 @@ class ExportOrderViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(status=status_filter)
         
         # Filter theo đại lý
-        agency = self.request.query_params.get('agency')
-        if agency:
+        agency = self._query_param('agency', int)
+        if agency is not None:
             queryset = queryset.filter(agency_id=agency)
         
-        # Filter theo khoảng ngày
-        from_date = self.request.query_params.get('from_date')
+        # Filter theo khoảng ngày (YYYY-MM-DD)
+        from_date = self._query_param('from_date', date.fromisoformat)
         if from_date:
             queryset = queryset.filter(order_date__gte=from_date)
         
-        to_date = self.request.query_params.get('to_date')
+        to_date = self._query_param('to_date', date.fromisoformat)
         if to_date:
             queryset = queryset.filter(order_date__lte=to_date)
         
+        # Filter theo giá trị đơn hàng (cột total_amount có index)
+        min_total = self._query_param('min_total', parse_decimal)
+        if min_total is not None:
+            queryset = queryset.filter(total_amount__gte=min_total)
+        
+        max_total = self._query_param('max_total', parse_decimal)
+        if max_total is not None:
+            queryset = queryset.filter(total_amount__lte=max_total)
+        
         # Filter theo người tạo
-        created_by = self.request.query_params.get('created_by')
-        if created_by:
+        created_by = self._query_param('created_by', int)
+        if created_by is not None:
             queryset = queryset.filter(created_by_id=created_by)
         
         # Search theo ghi chú
@@ -69,92 +122,130 @@ class ExportOrderViewSet(viewsets.ModelViewSet):
         if search:
             queryset = queryset.filter(Q(note__icontains=search) | Q(agency__name__icontains=search))
         
-        # Sort
-        sort_by = self.request.query_params.get('sort_by', '-order_date')
-        if sort_by in ['order_date', '-order_date', 'created_at', '-created_at']:
+        # Tìm kiếm toàn văn (không phân biệt dấu) theo ghi chú + tên đại lý
+        q = self.request.query_params.get('q')
+        if q:
+            queryset = search_index.filter_queryset(queryset, 'order', q)
+        
+        # Sort (khi tìm kiếm ?q= mặc định xếp theo độ liên quan)
+        sort_by = self.request.query_params.get('sort_by', None if q else '-order_date')
+        if sort_by in ['order_date', '-order_date', 'created_at', '-created_at',
+                       'total_amount', '-total_amount', 'total_quantity', '-total_quantity']:
             queryset = queryset.order_by(sort_by)
         
         return queryset
     
+    def create_response(self, request, *args, **kwargs):
+        try:
+            return super().create_response(request, *args, **kwargs)
+        except StockShortage as e:
+            return Response(
+                {'error': 'Tồn kho không đủ để xuất phiếu', 'shortfalls': e.shortfalls},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
+    def _transition(self, pk, target, message):
+        """Chuyển trạng thái 1 phiếu bằng UPDATE có điều kiện (không save cả dòng)"""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        result = transition_orders(self.get_queryset(), [pk], target)[0]
+        if result['error'] == NOT_FOUND:
+            raise Http404
+        if not result['success']:
+            return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': message})
+    
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         """Xác nhận đơn hàng"""
-        order = self.get_object()
-        if order.status != 'pending':
-            return Response(
-                {'error': 'Chỉ có thể xác nhận đơn hàng đang chờ xử lý'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        order.status = 'confirmed'
-        order.save()
-        return Response({'message': 'Đã xác nhận đơn hàng'})
+        return self._transition(pk, 'confirmed', 'Đã xác nhận đơn hàng')
     
     @action(detail=True, methods=['post'])
     def ship(self, request, pk=None):
         """Chuyển sang đang giao"""
-        order = self.get_object()
-        if order.status != 'confirmed':
-            return Response(
-                {'error': 'Chỉ có thể giao đơn hàng đã xác nhận'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        order.status = 'shipping'
-        order.save()
-        return Response({'message': 'Đơn hàng đang được giao'})
+        return self._transition(pk, 'shipping', 'Đơn hàng đang được giao')
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """Hoàn thành đơn hàng"""
-        order = self.get_object()
-        if order.status not in ['confirmed', 'shipping']:
-            return Response(
-                {'error': 'Không thể hoàn thành đơn hàng này'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        order.status = 'completed'
-        order.save()
-        return Response({'message': 'Đơn hàng đã hoàn thành'})
+        return self._transition(pk, 'completed', 'Đơn hàng đã hoàn thành')
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsStaff])
+    def bulk_transition(self, request):
+        """Chuyển trạng thái nhiều đơn hàng trong 1 request"""
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = transition_orders(
+            self.get_queryset(),
+            serializer.validated_data['ids'],
+            serializer.validated_data['status'],
+        )
+        return Response({
+            'status': serializer.validated_data['status'],
+            'updated': sum(1 for r in results if r['success']),
+            'failed': sum(1 for r in results if not r['success']),
+            'results': results,
+        })
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
-        """Hủy đơn hàng"""
-        order = self.get_object()
-        if order.status not in ['pending', 'confirmed']:
-            return Response(
-                {'error': 'Không thể hủy đơn hàng này'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Hoàn lại tồn kho và công nợ
-        for item in order.items.all():
-            item.product.stock_quantity += item.quantity
-            item.product.save()
-        
-        order.agency.current_debt -= order.total_amount
-        order.agency.save()
-        
-        order.status = 'cancelled'
-        order.save()
-        return Response({'message': 'Đã hủy đơn hàng'})
+        """Hủy đơn hàng (hoàn lại tồn kho và công nợ)"""
+        return self._transition(pk, 'cancelled', 'Đã hủy đơn hàng')
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Thống kê đơn hàng"""
-        total = ExportOrder.objects.count()
-        pending = ExportOrder.objects.filter(status='pending').count()
-        completed = ExportOrder.objects.filter(status='completed').count()
-        cancelled = ExportOrder.objects.filter(status='cancelled').count()
+        """
+        Thống kê đơn hàng: số phiếu và doanh số theo trạng thái (1 câu truy vấn)
+        - ?from_date=&to_date=: Khoảng ngày lập phiếu
+        - ?agency=: Theo đại lý
+        """
+        queryset = ExportOrder.objects.all()
+        
+        # Agency chỉ thống kê đơn của mình
+        if request.user.role == 'agency':
+            queryset = queryset.filter(agency__user=request.user)
+        
+        agency = request.query_params.get('agency')
+        if agency:
+            queryset = queryset.filter(agency_id=agency)
+        
+        from_date = request.query_params.get('from_date')
+        if from_date:
+            queryset = queryset.filter(order_date__gte=from_date)
+        
+        to_date = request.query_params.get('to_date')
+        if to_date:
+            queryset = queryset.filter(order_date__lte=to_date)
+        
+        aggregates = {'total': Count('id')}
+        for code, _ in ExportOrder.STATUS_CHOICES:
+            aggregates[code] = Count('id', filter=Q(status=code))
+            aggregates[f'{code}_revenue'] = Sum('total_amount', filter=Q(status=code))
+        data = queryset.aggregate(**aggregates)
         
-        total_revenue = ExportOrder.objects.filter(
-            status='completed'
-        ).aggregate(total=Sum('items__quantity') * Sum('items__unit_price'))
+        by_status = {
+            code: {
+                'display': display,
+                'count': data[code],
+                'revenue': float(data[f'{code}_revenue'] or 0),
+            }
+            for code, display in ExportOrder.STATUS_CHOICES
+        }
         
         return Response({
-            'total': total,
-            'pending': pending,
-            'completed': completed,
-            'cancelled': cancelled,
+            'total': data['total'],
+            'pending': data['pending'],
+            'confirmed': data['confirmed'],
+            'shipping': data['shipping'],
+            'completed': data['completed'],
+            'cancelled': data['cancelled'],
+            # Doanh thu tính trên các đơn đã hoàn thành
+            'total_revenue': by_status['completed']['revenue'],
+            'by_status': by_status,
         })
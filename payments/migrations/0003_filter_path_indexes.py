@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('payments', '0002_list_ordering_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['agency', 'payment_date'], name='payment_agency_date_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from agencies.models import Agency
 
@@ -45,16 +45,25 @@ class Payment(models.Model):
         verbose_name = 'Phiếu thu tiền'
         verbose_name_plural = 'Danh sách phiếu thu tiền'
         ordering = ['-payment_date', '-created_at']
+        indexes = [
+            # Phục vụ phân trang keyset theo thứ tự mặc định
+            models.Index(fields=['payment_date', 'created_at'], name='payment_date_created_idx'),
+            # Phiếu thu của đại lý trong khoảng ngày (báo cáo công nợ)
+            models.Index(fields=['agency', 'payment_date'], name='payment_agency_date_idx'),
+        ]
     
     def __str__(self):
         return f"PT-{self.id} - {self.agency.name} - {self.amount:,.0f} VNĐ"
     
     def save(self, *args, **kwargs):
-        """Khi lưu phiếu thu -> Cập nhật công nợ đại lý"""
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+        """Khi lưu phiếu thu -> Cập nhật công nợ đại lý và báo cáo công nợ tháng"""
+        from reports.rollups import record_payment
         
-        if is_new:
-            # Trừ công nợ khi tạo phiếu thu mới
-            self.agency.current_debt -= self.amount
-            self.agency.save()
+        is_new = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            if is_new:
+                # Trừ công nợ khi tạo phiếu thu mới (UPDATE bằng F(), không ghi đè cả dòng đại lý)
+                Agency.adjust_debt({self.agency_id: -self.amount})
+                record_payment(self.agency_id, self.payment_date, self.amount)
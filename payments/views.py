@@ -3,6 +3,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from accounts.views import IsAdmin, IsStaff
+from config.exports import ExportMixin
+from idempotency.mixins import IdempotentCreateMixin
 from .models import Payment
 from .serializers import PaymentSerializer, PaymentCreateSerializer
 
@@ -11,14 +13,26 @@ from .serializers import PaymentSerializer, PaymentCreateSerializer
 # ============================================================
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ExportMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     API Quản lý phiếu thu tiền
     - Admin/Staff: Full quyền
     - Agency: Chỉ xem phiếu thu của mình
+    - Tạo phiếu hỗ trợ header Idempotency-Key
+    - Xuất file: GET export/?format=csv|xlsx (cùng bộ lọc với danh sách)
     """
     queryset = Payment.objects.all().select_related('agency', 'received_by')
     permission_classes = [IsAuthenticated]
+    export_name = 'phieu-thu'
+    export_columns = [
+        ('Mã phiếu', 'id'),
+        ('Ngày thu', 'payment_date'),
+        ('Mã đại lý', 'agency_id'),
+        ('Đại lý', 'agency__name'),
+        ('Số tiền', 'amount'),
+        ('Người thu', 'received_by__username'),
+        ('Ghi chú', 'note'),
+    ]
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -38,6 +52,15 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if agency:
             queryset = queryset.filter(agency_id=agency)
         
+        # Filter theo khoảng ngày thu
+        from_date = self.request.query_params.get('from_date')
+        if from_date:
+            queryset = queryset.filter(payment_date__gte=from_date)
+        
+        to_date = self.request.query_params.get('to_date')
+        if to_date:
+            queryset = queryset.filter(payment_date__lte=to_date)
+        
         return queryset
     
     def perform_create(self, serializer):
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Unit, Product, GoodsReceipt, GoodsReceiptItem
+from .models import (
+    Unit, Product, GoodsReceipt, GoodsReceiptItem, StockMovement, StockSnapshot,
+    LowStockAlert, LowStockEvent
+)
 
 
 @admin.register(Unit)
@@ -24,3 +27,49 @@ class GoodsReceiptAdmin(admin.ModelAdmin):
     list_display = ['id', 'receipt_date', 'created_by', 'total_amount']
     list_filter = ['receipt_date']
     inlines = [GoodsReceiptItemInline]
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['id', 'movement_date', 'product', 'kind', 'quantity', 'reference', 'created_at']
+    list_filter = ['kind', 'movement_date']
+    search_fields = ['product__name', 'reference']
+    
+    # Sổ kho chỉ được ghi bởi nghiệp vụ, không thêm / sửa tay
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['id', 'snapshot_date', 'product', 'quantity']
+    list_filter = ['snapshot_date']
+
+
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    list_display = ['product', 'stock_quantity', 'threshold', 'since']
+    search_fields = ['product__name']
+    
+    # Bảng cảnh báo do products.alerts đồng bộ, không sửa tay
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LowStockEvent)
+class LowStockEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_at', 'product', 'kind', 'stock_quantity', 'threshold']
+    list_filter = ['kind']
+    search_fields = ['product__name']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
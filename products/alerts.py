@@ -0,0 +1,150 @@
+from django.db import transaction
+from django.utils import timezone
+
+from config.cache import invalidate
+from .models import Product, LowStockAlert, LowStockEvent
+
+# ============================================================
+# LOW STOCK ALERTS - Tập sản phẩm dưới ngưỡng tồn kho
+# ============================================================
+# Giải thích:
+# - Ngưỡng lấy từ Regulation (ưu tiên từ trên xuống):
+#     LOW_STOCK_THRESHOLD_PRODUCT_<id> : riêng 1 sản phẩm
+#     LOW_STOCK_THRESHOLD_UNIT_<id>    : các sản phẩm của 1 đơn vị tính
+#     LOW_STOCK_THRESHOLD              : ngưỡng chung (mặc định 10)
+# - Sản phẩm đang kinh doanh có tồn < ngưỡng hoặc hết hàng (<= 0) nằm trong
+#   bảng LowStockAlert; bảng được đồng bộ mỗi khi ghi sổ kho (StockMovement.record)
+#   hoặc lưu sản phẩm, đổi quy định ngưỡng thì đồng bộ lại toàn bộ
+# - Danh sách sắp hết hàng / bộ đếm chỉ đọc bảng nhỏ này (có index), không quét Product
+# - Mỗi lần vào / ra khỏi tập ghi 1 dòng LowStockEvent
+# ============================================================
+
+CODE = 'LOW_STOCK_THRESHOLD'
+UNIT_PREFIX = f'{CODE}_UNIT_'
+PRODUCT_PREFIX = f'{CODE}_PRODUCT_'
+DEFAULT_THRESHOLD = 10
+CHUNK_SIZE = 2000
+
+
+def is_threshold_code(code):
+    """Mã quy định có ảnh hưởng đến ngưỡng tồn kho"""
+    return code == CODE or code.startswith(f'{CODE}_')
+
+
+class Thresholds:
+    """Ngưỡng tồn kho theo sản phẩm > theo đơn vị > ngưỡng chung (1 câu SELECT)"""
+
+    def __init__(self):
+        from reports.models import Regulation
+
+        self.default = DEFAULT_THRESHOLD
+        self.units = {}
+        self.products = {}
+        rows = Regulation.objects.filter(code__startswith=CODE, is_active=True).values_list('code', 'value')
+        for code, value in rows:
+            try:
+                value = int(value)
+            except ValueError:
+                continue
+            if value < 0:
+                continue
+            if code == CODE:
+                self.default = value
+            elif code.startswith(UNIT_PREFIX) and code[len(UNIT_PREFIX):].isdigit():
+                self.units[int(code[len(UNIT_PREFIX):])] = value
+            elif code.startswith(PRODUCT_PREFIX) and code[len(PRODUCT_PREFIX):].isdigit():
+                self.products[int(code[len(PRODUCT_PREFIX):])] = value
+
+    def get(self, product_id, unit_id):
+        if product_id in self.products:
+            return self.products[product_id]
+        return self.units.get(unit_id, self.default)
+
+
+def refresh_alerts(product_ids=None):
+    """
+    Đồng bộ bảng cảnh báo cho các sản phẩm `product_ids` (None = toàn bộ danh mục).
+    Trả về (số sản phẩm mới dưới ngưỡng, số sản phẩm đã đủ hàng).
+    """
+    if product_ids is not None and not product_ids:
+        return 0, 0
+
+    thresholds = Thresholds()
+    now = timezone.now()
+    entered = left = 0
+    with transaction.atomic():
+        for rows in _batches(product_ids):
+            batch_entered, batch_left = _sync(rows, thresholds, now)
+            entered += batch_entered
+            left += batch_left
+
+    if product_ids is None:
+        # Đồng bộ toàn bộ (đổi ngưỡng) -> bộ đếm trên dashboard thay đổi
+        invalidate('dashboard')
+    return entered, left
+
+
+def _batches(product_ids):
+    """Các lô [(id, unit_id, tồn kho, đang kinh doanh)] tối đa CHUNK_SIZE sản phẩm"""
+    products = Product.objects.order_by('pk').values_list('pk', 'unit_id', 'stock_quantity', 'is_active')
+    if product_ids is not None:
+        product_ids = sorted(product_ids)
+        for start in range(0, len(product_ids), CHUNK_SIZE):
+            yield list(products.filter(pk__in=product_ids[start:start + CHUNK_SIZE]))
+        return
+
+    chunk = []
+    for row in products.iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    yield chunk
+
+
+def _sync(rows, thresholds, now):
+    """Đồng bộ 1 lô [(id, unit_id, tồn kho, đang kinh doanh)], trả về (số vào, số ra)"""
+    if not rows:
+        return 0, 0
+
+    current = {}
+    wanted = set()
+    for pk, unit_id, stock, is_active in rows:
+        threshold = thresholds.get(pk, unit_id)
+        current[pk] = (stock, threshold)
+        if is_active and (stock <= 0 or stock < threshold):
+            wanted.add(pk)
+
+    existing = {
+        pk: (stock, threshold)
+        for pk, stock, threshold in LowStockAlert.objects.filter(pk__in=current).values_list(
+            'product_id', 'stock_quantity', 'threshold'
+        )
+    }
+    entered = sorted(wanted - existing.keys())
+    left = sorted(existing.keys() - wanted)
+    changed = [pk for pk in wanted & existing.keys() if existing[pk] != current[pk]]
+
+    if entered:
+        LowStockAlert.objects.bulk_create([
+            LowStockAlert(product_id=pk, stock_quantity=current[pk][0], threshold=current[pk][1], since=now)
+            for pk in entered
+        ])
+    if left:
+        LowStockAlert.objects.filter(pk__in=left).delete()
+    if changed:
+        LowStockAlert.objects.bulk_update([
+            LowStockAlert(product_id=pk, stock_quantity=current[pk][0], threshold=current[pk][1])
+            for pk in changed
+        ], ['stock_quantity', 'threshold'])
+
+    events = [(pk, LowStockEvent.CRITICAL) for pk in entered] + [(pk, LowStockEvent.RECOVERED) for pk in left]
+    if events:
+        LowStockEvent.objects.bulk_create([
+            LowStockEvent(
+                product_id=pk, kind=kind, stock_quantity=current[pk][0],
+                threshold=current[pk][1], created_at=now,
+            )
+            for pk, kind in events
+        ])
+    return len(entered), len(left)
@@ -0,0 +1,218 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from config.cache import invalidate
+from .alerts import refresh_alerts
+from .models import Product, StockMovement
+
+# ============================================================
+# CATALOG - Cập nhật giá / trạng thái / tồn kho hàng loạt
+# ============================================================
+# Giải thích:
+# - Danh sách {id, price, is_active, stock_quantity}: kiểm tra tất cả dòng
+#   trong 1 lượt (1 câu SELECT), dòng lỗi được báo lại, các dòng hợp lệ được
+#   ghi bằng 1 câu UPDATE + CASE cho mỗi lô sản phẩm; chỉ sản phẩm thực sự
+#   thay đổi mới được ghi (và cập nhật updated_at)
+# - Tồn kho đổi qua Product.add_stock (phần chênh lệch) để sổ kho luôn khớp
+# - Quy tắc (vd +5% giá cho đơn vị "thùng") là 1 câu UPDATE trên tập lọc
+# ============================================================
+
+MAX_ITEMS = 10000
+BATCH_SIZE = 1000
+PATCH_FIELDS = ('price', 'is_active', 'stock_quantity')
+PRICE_DIGITS = 15
+BULK_REFERENCE = 'Cập nhật hàng loạt'
+
+
+def _parse_price(value):
+    if isinstance(value, bool):
+        raise ValueError('Giá sản phẩm không hợp lệ')
+    try:
+        price = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError('Giá sản phẩm không hợp lệ')
+    if not price.is_finite() or price != price.to_integral_value():
+        raise ValueError('Giá sản phẩm phải là số nguyên')
+    if price <= 0:
+        raise ValueError('Giá sản phẩm phải lớn hơn 0')
+    if len(str(int(price))) > PRICE_DIGITS:
+        raise ValueError(f'Giá sản phẩm tối đa {PRICE_DIGITS} chữ số')
+    return price.quantize(Decimal(1))
+
+
+def _parse_active(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError('is_active phải là true/false')
+
+
+def _parse_stock(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('Số lượng tồn kho phải là số nguyên')
+    try:
+        stock = int(value)
+    except ValueError:
+        raise ValueError('Số lượng tồn kho phải là số nguyên')
+    if stock < 0:
+        raise ValueError('Số lượng tồn kho không được âm')
+    return stock
+
+
+PARSERS = {'price': _parse_price, 'is_active': _parse_active, 'stock_quantity': _parse_stock}
+
+
+def validate_patches(items):
+    """
+    Kiểm tra danh sách patch, trả về ({id: {field: giá trị}}, lỗi).
+    Lỗi: [{'index', 'id', 'errors': {field: thông báo}}].
+    """
+    patches = {}
+    errors = []
+    parsed = []
+    ids = set()
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': position, 'id': None, 'errors': {'non_field_errors': 'Mỗi dòng phải là object'}})
+            continue
+        product_id = item.get('id')
+        row_errors = {}
+        if isinstance(product_id, bool) or not isinstance(product_id, int):
+            row_errors['id'] = 'id sản phẩm phải là số nguyên'
+        elif product_id in ids:
+            row_errors['id'] = 'Sản phẩm xuất hiện nhiều lần'
+        else:
+            ids.add(product_id)
+
+        values = {}
+        for field in PATCH_FIELDS:
+            if field not in item:
+                continue
+            try:
+                values[field] = PARSERS[field](item[field])
+            except ValueError as exc:
+                row_errors[field] = str(exc)
+        if not values and not row_errors:
+            row_errors['non_field_errors'] = f'Cần ít nhất 1 trong: {", ".join(PATCH_FIELDS)}'
+        parsed.append((position, product_id, values, row_errors))
+
+    existing = set(Product.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    for position, product_id, values, row_errors in parsed:
+        if 'id' not in row_errors and product_id not in existing:
+            row_errors['id'] = 'Không tìm thấy sản phẩm'
+        if row_errors:
+            errors.append({'index': position, 'id': product_id, 'errors': row_errors})
+        else:
+            patches[product_id] = values
+    errors.sort(key=lambda error: error['index'])
+    return patches, errors
+
+
+def _case(field, values):
+    """CASE WHEN id IN (...) THEN giá trị ... ELSE cột hiện tại (gom các id cùng giá trị)"""
+    by_value = {}
+    for product_id, value in values.items():
+        by_value.setdefault(value, []).append(product_id)
+    return Case(
+        *[When(pk__in=product_ids, then=Value(value)) for value, product_ids in by_value.items()],
+        default=F(field),
+        output_field=Product._meta.get_field(field),
+    )
+
+
+def apply_patches(patches):
+    """
+    Ghi các patch đã kiểm tra ({id: {field: giá trị}}).
+    Trả về (số sản phẩm thay đổi, số sản phẩm không đổi).
+    """
+    product_ids = sorted(patches)
+    changed = {field: {} for field in PATCH_FIELDS}
+
+    with transaction.atomic():
+        current = Product.objects.filter(pk__in=product_ids)
+        if connection.features.has_select_for_update:
+            current = current.select_for_update().order_by('pk')
+        for product_id, price, is_active, stock in current.values_list(
+            'pk', 'price', 'is_active', 'stock_quantity'
+        ):
+            values = patches[product_id]
+            if 'price' in values and values['price'] != price:
+                changed['price'][product_id] = values['price']
+            if 'is_active' in values and values['is_active'] != is_active:
+                changed['is_active'][product_id] = values['is_active']
+            if 'stock_quantity' in values and values['stock_quantity'] != stock:
+                changed['stock_quantity'][product_id] = values['stock_quantity'] - stock
+
+        fields = {field: changed[field] for field in ('price', 'is_active') if changed[field]}
+        updated_ids = sorted(set().union(*fields.values()))
+        now = timezone.now()
+        for start in range(0, len(updated_ids), BATCH_SIZE):
+            batch = set(updated_ids[start:start + BATCH_SIZE])
+            Product.objects.filter(pk__in=batch).update(
+                updated_at=now,
+                **{
+                    field: _case(field, {pk: value for pk, value in values.items() if pk in batch})
+                    for field, values in fields.items()
+                },
+            )
+
+        # Ngừng / mở lại kinh doanh -> ra / vào danh sách tồn kho thấp
+        refresh_alerts(changed['is_active'])
+
+        # Tồn kho: cộng phần chênh lệch + ghi sổ kho (add_stock tự bỏ cache dashboard)
+        deltas = changed['stock_quantity']
+        stock_ids = sorted(deltas)
+        for start in range(0, len(stock_ids), BATCH_SIZE):
+            Product.add_stock(
+                {pk: deltas[pk] for pk in stock_ids[start:start + BATCH_SIZE]},
+                kind=StockMovement.ADJUSTMENT, reference=BULK_REFERENCE,
+            )
+
+    if updated_ids:
+        invalidate('dashboard')
+    changed_count = len(set(updated_ids) | set(deltas))
+    return changed_count, len(product_ids) - changed_count
+
+
+def apply_rule(products, price_percent=None, price_delta=None, is_active=None):
+    """
+    Áp dụng quy tắc cho queryset sản phẩm `products` bằng 1 câu UPDATE.
+    Giá mới làm tròn đến đồng; sản phẩm có giá mới <= 0 bị bỏ qua.
+    Trả về (số sản phẩm khớp bộ lọc, số sản phẩm đã cập nhật, danh sách id bị bỏ qua).
+    """
+    updates = {}
+    if price_percent is not None:
+        factor = (Decimal(100) + Decimal(str(price_percent))) / Decimal(100)
+        updates['price'] = Round(F('price') * Value(factor))
+    elif price_delta is not None:
+        updates['price'] = F('price') + Value(Decimal(price_delta))
+    if is_active is not None:
+        updates['is_active'] = Value(is_active)
+
+    # Sản phẩm đã đúng giá trị mới thì không ghi (không đổi updated_at)
+    unchanged = Q()
+    if 'price' in updates:
+        products = products.alias(new_price=updates['price'])
+        unchanged &= Q(new_price=F('price'))
+    if is_active is not None:
+        unchanged &= Q(is_active=is_active)
+
+    skipped = []
+    with transaction.atomic():
+        matched = products.count()
+        if 'price' in updates:
+            skipped = list(products.filter(new_price__lte=0).values_list('pk', flat=True))
+            products = products.filter(new_price__gt=0)
+        products = products.exclude(unchanged)
+        toggled = list(products.values_list('pk', flat=True)) if is_active is not None else []
+        updated = products.update(updated_at=timezone.now(), **updates)
+        refresh_alerts(toggled)
+
+    if updated:
+        invalidate('dashboard')
+    return matched, updated, skipped
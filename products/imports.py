@@ -0,0 +1,378 @@
+"""
+Nhập dữ liệu từ file CSV (phiếu nhập kho, danh mục sản phẩm) dạng stream
+
+- File được đọc từng dòng (csv.reader), xử lý theo lô CHUNK_SIZE dòng ->
+  bộ nhớ không tăng theo kích thước file (file 1 triệu dòng vẫn chạy được)
+- Sản phẩm (theo id hoặc tên) và đơn vị tính (theo tên) được tra trong bảng
+  nạp 1 lần lúc bắt đầu, không SELECT theo từng dòng
+- Mỗi lô ghi bằng bulk_create / bulk_update trong 1 transaction riêng;
+  dòng lỗi bị bỏ qua và được báo lại kèm số dòng, không làm hỏng cả file
+"""
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from config.cache import invalidate
+from search import index as search_index
+from .alerts import refresh_alerts
+from .models import Unit, Product, StockMovement
+from .receipts import create_receipts
+
+CHUNK_SIZE = 2000
+MAX_ERRORS = 1000
+
+RECEIPT_COLUMNS = ['receipt_date', 'product', 'quantity', 'unit_price']
+PRODUCT_COLUMNS = ['name']
+PRODUCT_FIELDS = ['name', 'unit', 'price', 'description', 'is_active']
+
+
+class ImportFileError(ValueError):
+    """File không đọc được hoặc thiếu cột bắt buộc (không xử lý dòng nào)"""
+
+
+# ============================================================
+# ĐỌC FILE / KIỂU DỮ LIỆU
+# ============================================================
+
+
+def open_text(binary_file):
+    """Bọc file nhị phân (file upload) thành file text UTF-8 (bỏ BOM nếu có)"""
+    return io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+
+
+def _read_rows(text_file, required, report):
+    """Sinh (số dòng, {cột: giá trị}) - tên cột viết thường, bỏ khoảng trắng"""
+    reader = csv.reader(text_file)
+    try:
+        header = [column.strip().lower() for column in next(reader)]
+    except StopIteration:
+        raise ImportFileError('File rỗng')
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f'Không đọc được file CSV (UTF-8): {exc}')
+
+    missing = [column for column in required if column not in header]
+    if missing:
+        raise ImportFileError(f'Thiếu cột: {", ".join(missing)}')
+
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # Lỗi định dạng giữa file: dừng đọc, giữ kết quả các lô đã ghi
+            _error(report, reader.line_num + 1, f'Không đọc được phần còn lại của file: {exc}')
+            return
+        if not any(value.strip() for value in values):
+            continue
+        values += [''] * (len(header) - len(values))
+        yield reader.line_num, {
+            column: value.strip() for column, value in zip(header, values)
+        }
+
+
+def _error(report, line, message):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_ERRORS:
+        report['errors'].append({'line': line, 'error': message})
+
+
+def _parse_date(value):
+    """YYYY-MM-DD hoặc DD/MM/YYYY"""
+    for pattern in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(value, pattern).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Ngày không hợp lệ: "{value}" (YYYY-MM-DD hoặc DD/MM/YYYY)')
+
+
+def _parse_number(value, name):
+    """Số nguyên không âm, cho phép dấu phẩy / khoảng trắng ngăn cách hàng nghìn"""
+    try:
+        number = Decimal(value.replace(',', '').replace(' ', ''))
+    except InvalidOperation:
+        raise ValueError(f'{name} không hợp lệ: "{value}"')
+    if number != number.to_integral_value():
+        raise ValueError(f'{name} phải là số nguyên: "{value}"')
+    return number
+
+
+def _parse_bool(value):
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes', 'x', 'có'):
+        return True
+    if lowered in ('0', 'false', 'no', 'không'):
+        return False
+    raise ValueError(f'is_active không hợp lệ: "{value}"')
+
+
+def _key(name):
+    return ' '.join(name.split()).casefold()
+
+
+# ============================================================
+# BẢNG TRA CỨU (nạp 1 lần)
+# ============================================================
+
+
+class ProductLookup:
+    """id / tên sản phẩm -> id (tên trùng nhau thì phải dùng id)"""
+    AMBIGUOUS = object()
+
+    def __init__(self):
+        self.ids = set()
+        self.names = {}
+        rows = Product.objects.order_by().values_list('pk', 'name')
+        for pk, name in rows.iterator(chunk_size=CHUNK_SIZE):
+            self.add(pk, name)
+
+    def add(self, pk, name):
+        self.ids.add(pk)
+        key = _key(name)
+        self.names[key] = self.AMBIGUOUS if self.names.get(key, pk) != pk else pk
+
+    def by_name(self, name):
+        """id của sản phẩm tên `name`, None nếu chưa có"""
+        pk = self.names.get(_key(name))
+        if pk is self.AMBIGUOUS:
+            raise ValueError(f'Có nhiều sản phẩm tên "{name}", hãy dùng id')
+        return pk
+
+    def resolve(self, value):
+        """Cột product: id hoặc tên sản phẩm"""
+        if value.isdigit() and int(value) in self.ids:
+            return int(value)
+        pk = self.by_name(value)
+        if pk is None:
+            raise ValueError(f'Không tìm thấy sản phẩm "{value}"')
+        return pk
+
+
+def _unit_lookup():
+    """Tên đơn vị (không phân biệt hoa thường) / id -> id"""
+    units = {}
+    for pk, name in Unit.objects.values_list('pk', 'name'):
+        units[_key(name)] = pk
+        units[str(pk)] = pk
+    return units
+
+
+# ============================================================
+# PHIẾU NHẬP KHO
+# ============================================================
+# Cột: receipt_date, product (id hoặc tên), quantity, unit_price,
+#      receipt (mã nhóm - tùy chọn), note (tùy chọn)
+# Các dòng liền nhau cùng (receipt, receipt_date) thuộc 1 phiếu; phiếu quá
+# CHUNK_SIZE dòng được tách thành nhiều phiếu để giới hạn bộ nhớ.
+# ============================================================
+
+
+def import_receipts(text_file, user):
+    """Nhập phiếu nhập kho từ file CSV, trả về báo cáo kết quả"""
+    report = {'rows': 0, 'receipts': 0, 'lines': 0, 'error_count': 0, 'errors': []}
+    rows = _read_rows(text_file, RECEIPT_COLUMNS, report)
+    products = ProductLookup()
+
+    pending = []     # các phiếu chờ ghi của lô hiện tại
+    pending_lines = 0
+    current = None   # phiếu đang gom
+    current_key = None
+
+    def flush():
+        nonlocal pending, pending_lines
+        receipts = [receipt for receipt in pending if receipt['items']]
+        if receipts:
+            try:
+                create_receipts([
+                    {key: value for key, value in receipt.items() if key != 'lines'}
+                    for receipt in receipts
+                ])
+            except DatabaseError as exc:
+                first, last = receipts[0]['lines'][0], receipts[-1]['lines'][-1]
+                _error(report, first, f'Không ghi được lô dòng {first}-{last}: {exc}')
+            else:
+                report['receipts'] += len(receipts)
+                report['lines'] += sum(len(receipt['items']) for receipt in receipts)
+        pending = []
+        pending_lines = 0
+
+    for line, row in rows:
+        report['rows'] += 1
+        key = (row.get('receipt', ''), row['receipt_date'])
+        if current is None or key != current_key or len(current['lines']) >= CHUNK_SIZE:
+            if pending_lines >= CHUNK_SIZE:
+                flush()
+            current_key = key
+            current = {'receipt_date': None, 'note': None, 'created_by': user, 'items': [], 'lines': []}
+            pending.append(current)
+        current['lines'].append(line)
+        pending_lines += 1
+
+        try:
+            receipt_date = _parse_date(row['receipt_date'])
+            item = {
+                'product_id': products.resolve(row['product']),
+                'quantity': int(_parse_number(row['quantity'], 'quantity')),
+                'unit_price': _parse_number(row['unit_price'], 'unit_price'),
+            }
+            if item['quantity'] <= 0:
+                raise ValueError('Số lượng sản phẩm phải lớn hơn 0')
+            if item['unit_price'] <= 0:
+                raise ValueError('Giá sản phẩm phải lớn hơn 0')
+        except ValueError as exc:
+            _error(report, line, str(exc))
+            continue
+
+        current['receipt_date'] = receipt_date
+        current['note'] = current['note'] or row.get('note') or None
+        current['items'].append(item)
+
+    flush()
+    return report
+
+
+# ============================================================
+# DANH MỤC SẢN PHẨM
+# ============================================================
+# Cột: name (bắt buộc), id, unit, price, description, is_active, stock_quantity
+# - Có id -> cập nhật sản phẩm đó; không có id -> cập nhật sản phẩm cùng tên,
+#   chưa có thì tạo mới (cần name, unit, price)
+# - Khi cập nhật chỉ ghi các ô có giá trị (ô trống = giữ nguyên); tồn kho của sản phẩm đã có
+#   không đổi qua file này (nhập kho bằng phiếu nhập), stock_quantity chỉ dùng
+#   làm tồn đầu cho sản phẩm mới (ghi sổ kho)
+# ============================================================
+
+
+def import_products(text_file):
+    """Tạo / cập nhật sản phẩm từ file CSV, trả về báo cáo kết quả"""
+    report = {'rows': 0, 'created': 0, 'updated': 0, 'error_count': 0, 'errors': []}
+    rows = _read_rows(text_file, PRODUCT_COLUMNS, report)
+    products = ProductLookup()
+    units = _unit_lookup()
+
+    chunk = []
+    for line, row in rows:
+        report['rows'] += 1
+        chunk.append((line, row))
+        if len(chunk) >= CHUNK_SIZE:
+            _write_products(chunk, products, units, report)
+            chunk = []
+    _write_products(chunk, products, units, report)
+
+    if report['created'] or report['updated']:
+        invalidate('dashboard')
+    return report
+
+
+def _product_values(row, units):
+    """Các field có trong dòng (đã kiểm tra), giống ProductSerializer"""
+    values = {}
+    for field in PRODUCT_FIELDS:
+        # Ô trống = không đổi (trừ tên)
+        if field not in row or (field != 'name' and not row[field]):
+            continue
+        value = row[field]
+        if field == 'name':
+            if not value:
+                raise ValueError('Tên sản phẩm không được để trống')
+        elif field == 'unit':
+            if _key(value) not in units:
+                raise ValueError(f'Không tìm thấy đơn vị tính "{value}"')
+            field, value = 'unit_id', units[_key(value)]
+        elif field == 'price':
+            value = _parse_number(value, 'price')
+            if value <= 0:
+                raise ValueError('Giá sản phẩm phải lớn hơn 0')
+        elif field == 'is_active':
+            value = _parse_bool(value)
+        values[field] = value
+    return values
+
+
+def _write_products(chunk, products, units, report):
+    creates = []
+    updates = {}
+    seen = set()
+    for line, row in chunk:
+        try:
+            values = _product_values(row, units)
+            if row.get('id'):
+                if not row['id'].isdigit() or int(row['id']) not in products.ids:
+                    raise ValueError(f'Không tìm thấy sản phẩm id={row["id"]}')
+                pk = int(row['id'])
+            else:
+                pk = products.by_name(values['name'])
+            key = pk if pk is not None else _key(values['name'])
+            if key in seen:
+                raise ValueError('Sản phẩm xuất hiện nhiều lần trong cùng 1 lô')
+            seen.add(key)
+
+            if pk is not None:
+                updates[pk] = values
+                continue
+
+            missing = [field for field in ('unit', 'price') if not row.get(field)]
+            if missing:
+                raise ValueError(f'Sản phẩm mới cần cột: {", ".join(missing)}')
+            stock = int(_parse_number(row.get('stock_quantity') or '0', 'stock_quantity'))
+            if stock < 0:
+                raise ValueError('Số lượng tồn kho không được âm')
+            values.setdefault('is_active', True)
+            creates.append((line, Product(stock_quantity=stock, **values)))
+        except ValueError as exc:
+            _error(report, line, str(exc))
+
+    if not creates and not updates:
+        return
+    lines = [line for line, _ in chunk]
+    try:
+        with transaction.atomic():
+            created = Product.objects.bulk_create([product for _, product in creates])
+            StockMovement.record(StockMovement.ADJUSTMENT, [
+                (product.pk, product.stock_quantity, 'Nhập danh mục')
+                for product in created if product.stock_quantity
+            ])
+            _update_products(updates)
+            # Sản phẩm mới / đổi đơn vị / đổi trạng thái -> đồng bộ cảnh báo tồn kho thấp
+            refresh_alerts([product.pk for product in created] + [
+                pk for pk, values in updates.items() if 'unit_id' in values or 'is_active' in values
+            ])
+    except DatabaseError as exc:
+        _error(report, lines[0], f'Không ghi được lô dòng {lines[0]}-{lines[-1]}: {exc}')
+        return
+
+    for product in created:
+        products.add(product.pk, product.name)
+    for pk, values in updates.items():
+        if 'name' in values:
+            products.add(pk, values['name'])
+    report['created'] += len(created)
+    report['updated'] += len(updates)
+
+    # bulk_create / bulk_update không gửi signal -> tự cập nhật chỉ mục tìm kiếm
+    changed = [product.pk for product in created] + [
+        pk for pk, values in updates.items() if 'name' in values or 'description' in values
+    ]
+    search_index.index_documents('product', (
+        (pk, search_index.product_text(name, description))
+        for pk, name, description in Product.objects.filter(pk__in=changed).values_list(
+            'pk', 'name', 'description'
+        )
+    ))
+
+
+def _update_products(updates):
+    """bulk_update theo từng nhóm sản phẩm có cùng tập cột"""
+    groups = {}
+    for pk, values in updates.items():
+        groups.setdefault(tuple(sorted(values)), []).append(Product(pk=pk, **values))
+    now = timezone.now()
+    for fields, group in groups.items():
+        for product in group:
+            product.updated_at = now
+        Product.objects.bulk_update(group, [*fields, 'updated_at'], batch_size=500)
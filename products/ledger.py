@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMovement, StockSnapshot
+
+# ============================================================
+# STOCK LEDGER - Tồn kho theo ngày từ sổ kho + tồn cuối ngày
+# ============================================================
+# Giải thích:
+# - Tồn ngày D = tồn cuối ngày của lần chốt gần nhất <= D
+#   + tổng phát sinh trong sổ kho từ sau ngày chốt đến hết ngày D
+#   -> 1 câu truy vấn, mỗi sản phẩm đọc 1 dòng chốt và 1 khoảng ngắn của
+#   index (product, movement_date), không phải cộng lại toàn bộ lịch sử
+# - Chỉ chốt ngày đã qua (sổ kho luôn ghi theo ngày hiện tại nên ngày đã qua
+#   không còn thay đổi), sản phẩm không phát sinh thì không cần dòng chốt mới
+# ============================================================
+
+EPOCH = date(1, 1, 1)
+MAX_DAYS = 366
+
+
+def with_stock_at(day, products=None):
+    """Annotate `stock_on_date` = tồn kho cuối ngày `day` cho queryset sản phẩm"""
+    if products is None:
+        products = Product.objects.all()
+
+    latest = StockSnapshot.objects.filter(
+        product=OuterRef('pk'), snapshot_date__lte=day
+    ).order_by('-snapshot_date')
+    products = products.order_by().annotate(
+        snapshot_date=Coalesce(Subquery(latest.values('snapshot_date')[:1]), Value(EPOCH)),
+        snapshot_quantity=Coalesce(Subquery(latest.values('quantity')[:1]), Value(0)),
+    )
+    changes = StockMovement.objects.filter(
+        product=OuterRef('pk'),
+        movement_date__gt=OuterRef('snapshot_date'),
+        movement_date__lte=day,
+    ).order_by().values('product').annotate(total=Sum('quantity')).values('total')
+    return products.annotate(
+        changed=Coalesce(Subquery(changes, output_field=IntegerField()), Value(0)),
+    ).annotate(stock_on_date=F('snapshot_quantity') + F('changed'))
+
+
+def stock_at(day, products=None):
+    """{product_id: tồn kho cuối ngày `day`} (1 câu truy vấn)"""
+    return dict(with_stock_at(day, products).values_list('pk', 'stock_on_date'))
+
+
+def movements_between(start, end, product_id=None):
+    """Các dòng sổ kho từ ngày `start` đến hết ngày `end`"""
+    movements = StockMovement.objects.filter(movement_date__gte=start, movement_date__lte=end)
+    if product_id is not None:
+        movements = movements.filter(product_id=product_id)
+    return movements
+
+
+def take_snapshot(day):
+    """
+    Chốt tồn cuối ngày `day` (phải là ngày đã qua) cho các sản phẩm có phát
+    sinh kể từ lần chốt trước. Trả về số dòng đã ghi.
+    """
+    if day >= timezone.localdate():
+        raise ValueError('Chỉ chốt tồn kho cho ngày đã qua')
+
+    rows = with_stock_at(day).exclude(changed=0).values_list('pk', 'stock_on_date')
+    snapshots = [StockSnapshot(product_id=pk, snapshot_date=day, quantity=quantity) for pk, quantity in rows]
+    StockSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True,
+        unique_fields=['product', 'snapshot_date'], update_fields=['quantity'],
+    )
+    return len(snapshots)
+
+
+def take_snapshots(start, end):
+    """Chốt tồn kho từng ngày từ `start` đến `end`, trả về {ngày: số dòng}"""
+    written = {}
+    day = start
+    while day <= end:
+        written[day] = take_snapshot(day)
+        day += timedelta(days=1)
+    return written
+
+
+def drift(products=None):
+    """
+    Sản phẩm có tồn kho hiện tại khác tồn tính từ sổ kho.
+    Trả về {product_id: (stock_quantity, tồn theo sổ kho)}.
+    """
+    today = timezone.localdate()
+    rows = with_stock_at(today, products).exclude(
+        stock_quantity=F('stock_on_date')
+    ).values_list('pk', 'stock_quantity', 'stock_on_date')
+    return {pk: (stock, ledger) for pk, stock, ledger in rows}
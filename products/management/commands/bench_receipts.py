@@ -0,0 +1,130 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from config.benchmark import scratch_database, seed_data
+from products import ledger
+from products.models import Product, GoodsReceipt, GoodsReceiptItem, StockMovement
+from products.serializers import GoodsReceiptCreateSerializer, GoodsReceiptBulkSerializer
+
+# ============================================================
+# BENCHMARK NHẬP KHO THEO LÔ
+# ============================================================
+# Chạy: python manage.py bench_receipts --products 1000 --receipts 50 --lines 200
+# - Đếm số câu truy vấn khi tạo 1 phiếu với số dòng khác nhau (phải không đổi)
+# - So sánh số dòng/giây: ghi từng dòng (cách cũ) và nhập theo lô
+# - Kiểm tra tồn kho đã cộng đúng và khớp với sổ kho
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Đo tốc độ nhập kho theo lô (số dòng chi tiết / giây)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--receipts', type=int, default=50, help='Số phiếu mỗi lần nhập')
+        parser.add_argument('--lines', type=int, default=200, help='Số dòng mỗi phiếu')
+    
+    def handle(self, *args, **options):
+        product_count = options['products']
+        receipt_count = options['receipts']
+        line_count = min(options['lines'], product_count)
+        
+        with scratch_database():
+            # Tồn kho lớn: không sản phẩm nào vào / ra danh sách tồn kho thấp trong lúc đo
+            data = seed_data(products=product_count, stock=10**6)
+            user = data['user']
+            products = data['products']
+            
+            def receipt_payload(offset):
+                return {
+                    'receipt_date': str(date.today()),
+                    'note': 'bench',
+                    'items': [
+                        {
+                            'product': products[(offset + i) % product_count].pk,
+                            'quantity': 1 + i % 5,
+                            'unit_price': 10000,
+                        }
+                        for i in range(line_count)
+                    ],
+                }
+            
+            # 1. Số câu truy vấn của 1 phiếu theo số dòng
+            # (giữ dưới giới hạn tham số của 1 câu INSERT để bulk_create không tách lô)
+            counts = {}
+            for size in sorted({1, 10, min(line_count, 100)}):
+                payload = receipt_payload(0)
+                payload['items'] = payload['items'][:size]
+                with CaptureQueriesContext(connection) as ctx:
+                    serializer = GoodsReceiptCreateSerializer(data=payload)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save(created_by=user)
+                counts[size] = len(ctx.captured_queries)
+                self.stdout.write(f'1 phiếu {size:>6} dòng: {counts[size]} câu truy vấn')
+            
+            payloads = [receipt_payload(n * line_count) for n in range(receipt_count)]
+            total_lines = receipt_count * line_count
+            expected = {}
+            for payload in payloads:
+                for item in payload['items']:
+                    expected[item['product']] = expected.get(item['product'], 0) + item['quantity']
+            
+            # 2. Cách cũ: mỗi dòng 1 INSERT + 1 UPDATE tồn kho
+            before = dict(Product.objects.values_list('pk', 'stock_quantity'))
+            started = time.perf_counter()
+            with transaction.atomic():
+                for payload in payloads:
+                    receipt = GoodsReceipt.objects.create(
+                        receipt_date=payload['receipt_date'], note=payload['note'], created_by=user
+                    )
+                    for item in payload['items']:
+                        GoodsReceiptItem.objects.create(
+                            receipt=receipt, product_id=item['product'],
+                            quantity=item['quantity'], unit_price=item['unit_price'],
+                        )
+                        Product.objects.filter(pk=item['product']).update(
+                            stock_quantity=F('stock_quantity') + item['quantity']
+                        )
+                        StockMovement.record(StockMovement.RECEIPT, [
+                            (item['product'], item['quantity'], f'PN-{receipt.pk}')
+                        ])
+            naive = time.perf_counter() - started
+            self.stdout.write(
+                f'Từng dòng : {total_lines} dòng trong {naive:.2f}s '
+                f'({total_lines / naive:,.0f} dòng/s)'
+            )
+            self._check(before, expected)
+            
+            # 3. Nhập theo lô qua API serializer (gồm cả validate)
+            before = dict(Product.objects.values_list('pk', 'stock_quantity'))
+            connection.queries_log.clear()
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                serializer = GoodsReceiptBulkSerializer(data={'receipts': payloads})
+                serializer.is_valid(raise_exception=True)
+                serializer.save(created_by=user)
+            bulk = time.perf_counter() - started
+            self.stdout.write(
+                f'Theo lô   : {total_lines} dòng trong {bulk:.2f}s '
+                f'({total_lines / bulk:,.0f} dòng/s, {len(ctx.captured_queries)} câu truy vấn, '
+                f'nhanh hơn {naive / bulk:.1f} lần)'
+            )
+            self._check(before, expected)
+            
+            if ledger.drift():
+                raise CommandError('Tồn kho không khớp với sổ kho')
+        
+        if len(set(counts.values())) > 1:
+            raise CommandError('Số câu truy vấn thay đổi theo số dòng chi tiết')
+        self.stdout.write(self.style.SUCCESS('OK - tồn kho khớp sổ kho, số câu truy vấn không đổi'))
+    
+    def _check(self, before, expected):
+        after = dict(Product.objects.values_list('pk', 'stock_quantity'))
+        wrong = [pk for pk, quantity in expected.items() if after[pk] - before[pk] != quantity]
+        if wrong:
+            raise CommandError(f'Tồn kho cộng sai ở {len(wrong)} sản phẩm')
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.ledger import drift
+from products.models import StockMovement
+
+# ============================================================
+# ĐỐI SOÁT TỒN KHO VỚI SỔ KHO
+# ============================================================
+# Chạy: python manage.py check_stock_ledger [--fix]
+# So sánh Product.stock_quantity với tồn tính từ sổ kho (tồn chốt + phát sinh).
+# Có chỗ lệch -> báo lỗi; --fix ghi dòng điều chỉnh để sổ kho khớp tồn hiện tại.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'So sánh tồn kho hiện tại của sản phẩm với tồn tính từ sổ kho'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Ghi dòng điều chỉnh cho phần lệch')
+    
+    def handle(self, *args, **options):
+        mismatches = drift()
+        for product_id, (stock, ledger) in sorted(mismatches.items())[:50]:
+            self.stdout.write(self.style.WARNING(
+                f'Sản phẩm {product_id}: tồn hiện tại {stock}, theo sổ kho {ledger} (lệch {stock - ledger:+d})'
+            ))
+        
+        if mismatches and options['fix']:
+            StockMovement.record(StockMovement.ADJUSTMENT, [
+                (product_id, stock - ledger, 'Đối soát') for product_id, (stock, ledger) in mismatches.items()
+            ])
+            self.stdout.write(f'-> đã ghi {len(mismatches)} dòng điều chỉnh')
+        elif mismatches:
+            raise CommandError(f'{len(mismatches)} sản phẩm bị lệch')
+        self.stdout.write(self.style.SUCCESS('OK'))
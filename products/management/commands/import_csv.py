@@ -0,0 +1,55 @@
+import time
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products import imports
+
+# ============================================================
+# NHẬP FILE CSV (phiếu nhập kho / danh mục sản phẩm)
+# ============================================================
+# Chạy: python manage.py import_csv receipts phieu_nhap.csv --user admin
+#       python manage.py import_csv products bang_gia.csv
+# File được đọc dạng stream và ghi theo lô, dòng lỗi được liệt kê
+# cuối cùng (tối đa --show-errors dòng).
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Nhập phiếu nhập kho hoặc danh mục sản phẩm từ file CSV (UTF-8)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['receipts', 'products'])
+        parser.add_argument('path')
+        parser.add_argument('--user', help='Username người tạo phiếu nhập (bắt buộc với receipts)')
+        parser.add_argument('--show-errors', type=int, default=20)
+    
+    def handle(self, *args, **options):
+        if options['kind'] == 'receipts':
+            if not options['user']:
+                raise CommandError('Cần --user để nhập phiếu nhập kho')
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Không tìm thấy user "{options["user"]}"')
+            run = partial(imports.import_receipts, user=user)
+        else:
+            run = imports.import_products
+        
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as text_file:
+                report = run(text_file)
+        except OSError as exc:
+            raise CommandError(f'Không mở được file: {exc}')
+        except imports.ImportFileError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        
+        errors = report.pop('errors')
+        for line_error in errors[:options['show_errors']]:
+            self.stdout.write(self.style.WARNING(f'Dòng {line_error["line"]}: {line_error["error"]}'))
+        summary = ', '.join(f'{key}={value}' for key, value in report.items())
+        rate = report['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f'{summary} trong {elapsed:.2f}s ({rate:,.0f} dòng/s)'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.alerts import refresh_alerts
+from products.models import LowStockAlert
+
+# ============================================================
+# ĐỒNG BỘ LẠI DANH SÁCH TỒN KHO THẤP (LowStockAlert)
+# ============================================================
+# Chạy: python manage.py refresh_stock_alerts
+# Bảng cảnh báo tự cập nhật khi ghi sổ kho / lưu sản phẩm / đổi quy định;
+# dùng lệnh này sau khi sửa tồn kho trực tiếp trong database.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Tính lại danh sách sản phẩm dưới ngưỡng tồn kho theo quy định'
+    
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        entered, left = refresh_alerts()
+        elapsed = time.perf_counter() - started
+        
+        counts = LowStockAlert.counts()
+        self.stdout.write(f'Mới dưới ngưỡng: {entered}, đã đủ hàng: {left}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Hết hàng: {counts["out_of_stock"]}, sắp hết hàng: {counts["low_stock"]} ({elapsed:.2f}s)'
+        ))
@@ -0,0 +1,43 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from products.ledger import take_snapshots
+
+# ============================================================
+# CHỐT TỒN KHO CUỐI NGÀY (StockSnapshot)
+# ============================================================
+# Chạy hằng ngày (cron): python manage.py snapshot_stock
+# Mặc định chốt ngày hôm qua; --from/--to để chốt bù nhiều ngày.
+# Chỉ ghi dòng cho sản phẩm có phát sinh kể từ lần chốt trước.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Chốt tồn kho cuối ngày theo sản phẩm từ sổ kho'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', help='Ngày đầu (YYYY-MM-DD), mặc định hôm qua')
+        parser.add_argument('--to', dest='end', help='Ngày cuối (YYYY-MM-DD), mặc định = --from')
+    
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else yesterday
+            end = date.fromisoformat(options['end']) if options['end'] else start
+        except ValueError:
+            raise CommandError('Ngày phải có dạng YYYY-MM-DD')
+        if start > end:
+            raise CommandError('--from phải trước hoặc bằng --to')
+        if end > yesterday:
+            raise CommandError('Chỉ chốt tồn kho cho ngày đã qua')
+        
+        started = time.perf_counter()
+        written = take_snapshots(start, end)
+        elapsed = time.perf_counter() - started
+        
+        for day, rows in written.items():
+            self.stdout.write(f'{day.isoformat()}: {rows} sản phẩm')
+        self.stdout.write(self.style.SUCCESS(f'Đã chốt {len(written)} ngày trong {elapsed:.2f}s'))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def opening_balances(apps, schema_editor):
+    """Ghi tồn kho hiện có vào sổ kho làm số dư đầu (1 câu bulk_create)"""
+    Product = apps.get_model('products', 'Product')
+    StockMovement = apps.get_model('products', 'StockMovement')
+    today = timezone.localdate()
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=pk, kind='adjustment', quantity=stock,
+            movement_date=today, reference='Tồn đầu',
+        )
+        for pk, stock in Product.objects.exclude(stock_quantity=0).values_list('pk', 'stock_quantity')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Nhập kho'), ('order', 'Xuất kho'), ('cancel', 'Hủy phiếu xuất'), ('adjustment', 'Điều chỉnh')], max_length=20, verbose_name='Loại')),
+                ('quantity', models.IntegerField(verbose_name='Số lượng (+ nhập / - xuất)')),
+                ('movement_date', models.DateField(verbose_name='Ngày ghi sổ')),
+                ('reference', models.CharField(blank=True, default='', max_length=50, verbose_name='Chứng từ')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product', verbose_name='Sản phẩm')),
+            ],
+            options={
+                'verbose_name': 'Sổ kho',
+                'verbose_name_plural': 'Sổ kho',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['product', 'movement_date'], name='stock_move_product_date_idx'), models.Index(fields=['movement_date'], name='stock_move_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(verbose_name='Ngày chốt')),
+                ('quantity', models.IntegerField(verbose_name='Tồn cuối ngày')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product', verbose_name='Sản phẩm')),
+            ],
+            options={
+                'verbose_name': 'Tồn kho cuối ngày',
+                'verbose_name_plural': 'Tồn kho cuối ngày',
+                'ordering': ['-snapshot_date'],
+                'unique_together': {('product', 'snapshot_date')},
+            },
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
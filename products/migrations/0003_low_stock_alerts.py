@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def initial_alerts(apps, schema_editor):
+    """Đưa các sản phẩm đang dưới ngưỡng (theo quy định hiện có) vào bảng cảnh báo"""
+    Product = apps.get_model('products', 'Product')
+    Regulation = apps.get_model('reports', 'Regulation')
+    LowStockAlert = apps.get_model('products', 'LowStockAlert')
+
+    default, units, products = 10, {}, {}
+    for code, value in Regulation.objects.filter(
+        code__startswith='LOW_STOCK_THRESHOLD', is_active=True
+    ).values_list('code', 'value'):
+        if not value.isdigit():
+            continue
+        suffix = code.rsplit('_', 1)[-1]
+        if code == 'LOW_STOCK_THRESHOLD':
+            default = int(value)
+        elif code.startswith('LOW_STOCK_THRESHOLD_UNIT_') and suffix.isdigit():
+            units[int(suffix)] = int(value)
+        elif code.startswith('LOW_STOCK_THRESHOLD_PRODUCT_') and suffix.isdigit():
+            products[int(suffix)] = int(value)
+
+    now = timezone.now()
+    alerts = []
+    for pk, unit_id, stock in Product.objects.filter(is_active=True).values_list('pk', 'unit_id', 'stock_quantity'):
+        threshold = products.get(pk, units.get(unit_id, default))
+        if stock <= 0 or stock < threshold:
+            alerts.append(LowStockAlert(product_id=pk, stock_quantity=stock, threshold=threshold, since=now))
+    LowStockAlert.objects.bulk_create(alerts, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_stock_ledger'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock_alert', serialize=False, to='products.product', verbose_name='Sản phẩm')),
+                ('stock_quantity', models.IntegerField(verbose_name='Tồn kho')),
+                ('threshold', models.IntegerField(verbose_name='Ngưỡng')),
+                ('since', models.DateTimeField(verbose_name='Dưới ngưỡng từ')),
+            ],
+            options={
+                'verbose_name': 'Cảnh báo tồn kho thấp',
+                'verbose_name_plural': 'Cảnh báo tồn kho thấp',
+                'ordering': ['stock_quantity', 'product'],
+                'indexes': [models.Index(fields=['stock_quantity'], name='low_stock_quantity_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LowStockEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('critical', 'Dưới ngưỡng'), ('recovered', 'Đã đủ hàng')], max_length=20, verbose_name='Loại')),
+                ('stock_quantity', models.IntegerField(verbose_name='Tồn kho')),
+                ('threshold', models.IntegerField(verbose_name='Ngưỡng')),
+                ('created_at', models.DateTimeField(verbose_name='Thời điểm')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_events', to='products.product', verbose_name='Sản phẩm')),
+            ],
+            options={
+                'verbose_name': 'Lịch sử tồn kho thấp',
+                'verbose_name_plural': 'Lịch sử tồn kho thấp',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='low_stock_event_product_idx'), models.Index(fields=['created_at'], name='low_stock_event_date_idx')],
+            },
+        ),
+        migrations.RunPython(initial_alerts, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, When, F, Value
 from django.conf import settings
+from django.utils import timezone
+
+from config.cache import invalidate
 
 # ============================================================
 # PRODUCT MODELS - Quản lý sản phẩm và đơn vị tính
 # ============================================================
+# Giải thích:
+# - Mọi thay đổi tồn kho được ghi vào sổ kho StockMovement (chỉ thêm, không sửa):
+#   cập nhật hàng loạt (add_stock, giữ hàng khi xuất phiếu) ghi bằng bulk_create,
+#   sửa trực tiếp Product.stock_quantity qua save() ghi phần chênh lệch
+# - StockSnapshot lưu tồn cuối ngày theo sản phẩm (products.ledger)
+# - LowStockAlert là tập sản phẩm đang dưới ngưỡng tồn kho (theo Regulation),
+#   cập nhật cùng lúc với sổ kho; LowStockEvent ghi lần vào / ra khỏi tập đó
+# ============================================================
 
 
 class Unit(models.Model):
@@ -58,6 +70,57 @@ class Product(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.price:,.0f} VNĐ/{self.unit.name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Tồn kho lúc đọc lên, để save() ghi sổ kho phần chênh lệch
+        instance._loaded_stock = instance.__dict__.get('stock_quantity')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        previous = 0 if self._state.adding else getattr(self, '_loaded_stock', None)
+        tracked = previous is not None and (update_fields is None or 'stock_quantity' in update_fields)
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if tracked and self.stock_quantity != previous:
+                StockMovement.record(StockMovement.ADJUSTMENT, [(self.pk, self.stock_quantity - previous, '')])
+            else:
+                # Tồn kho không đổi nhưng trạng thái / đơn vị có thể đổi -> ngưỡng khác
+                from .alerts import refresh_alerts
+                refresh_alerts([self.pk])
+        self._loaded_stock = self.stock_quantity
+    
+    @classmethod
+    def add_stock(cls, quantities, kind='adjustment', reference='', movements=None):
+        """
+        Cộng tồn kho cho {product_id: số lượng} bằng 1 câu UPDATE (số âm để trừ)
+        và ghi sổ kho. `movements`: [(product_id, số lượng, chứng từ)] nếu cần ghi
+        chi tiết theo từng chứng từ, mặc định 1 dòng / sản phẩm với `reference`.
+        """
+        if not quantities:
+            return 0
+        # Gom sản phẩm cùng số lượng vào 1 nhánh WHEN (nhập kho thường lặp lại vài số lượng)
+        by_quantity = {}
+        for product_id, quantity in quantities.items():
+            by_quantity.setdefault(quantity, []).append(product_id)
+        with transaction.atomic():
+            updated = cls.objects.filter(pk__in=quantities).update(
+                stock_quantity=Case(
+                    *[When(pk__in=product_ids, then=F('stock_quantity') + Value(quantity))
+                      for quantity, product_ids in by_quantity.items()],
+                    default=F('stock_quantity'),
+                ),
+                updated_at=timezone.now(),
+            )
+            if movements is None:
+                movements = [(product_id, quantity, reference) for product_id, quantity in quantities.items()]
+            StockMovement.record(kind, movements)
+        # update() không gửi signal -> tự bỏ cache dashboard
+        invalidate('dashboard')
+        return updated
 
 
 class GoodsReceipt(models.Model):
@@ -121,3 +184,158 @@ class GoodsReceiptItem(models.Model):
     @property
     def total_price(self):
         return self.quantity * self.unit_price
+
+
+class StockMovement(models.Model):
+    """
+    Sổ kho - mỗi dòng là 1 lần tăng/giảm tồn kho của 1 sản phẩm (chỉ thêm, không sửa)
+    """
+    RECEIPT = 'receipt'
+    ORDER = 'order'
+    CANCEL = 'cancel'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = (
+        (RECEIPT, 'Nhập kho'),
+        (ORDER, 'Xuất kho'),
+        (CANCEL, 'Hủy phiếu xuất'),
+        (ADJUSTMENT, 'Điều chỉnh'),
+    )
+    # Số dòng mỗi câu INSERT của record(): 6 cột x 5000 = 30000 tham số,
+    # dưới giới hạn 32766 tham số / câu lệnh của SQLite
+    BATCH_SIZE = 5000
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_movements',
+        verbose_name='Sản phẩm'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Loại')
+    quantity = models.IntegerField(verbose_name='Số lượng (+ nhập / - xuất)')
+    movement_date = models.DateField(verbose_name='Ngày ghi sổ')
+    reference = models.CharField(max_length=50, blank=True, default='', verbose_name='Chứng từ')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Sổ kho'
+        verbose_name_plural = 'Sổ kho'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['product', 'movement_date'], name='stock_move_product_date_idx'),
+            models.Index(fields=['movement_date'], name='stock_move_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity:+d} ({self.get_kind_display()} {self.reference})"
+    
+    @classmethod
+    def record(cls, kind, movements):
+        """
+        Ghi [(product_id, số lượng, chứng từ)] vào sổ kho bằng bulk_create theo lô BATCH_SIZE
+        và cập nhật cảnh báo tồn kho thấp của các sản phẩm đó.
+        """
+        from .alerts import refresh_alerts
+        
+        today = timezone.localdate()
+        created = cls.objects.bulk_create([
+            cls(product_id=product_id, kind=kind, quantity=quantity, reference=reference, movement_date=today)
+            for product_id, quantity, reference in movements if quantity
+        ], batch_size=cls.BATCH_SIZE)
+        refresh_alerts({movement.product_id for movement in created})
+        return created
+
+
+class StockSnapshot(models.Model):
+    """
+    Tồn kho cuối ngày của sản phẩm (chỉ lưu ngày có thay đổi so với lần chốt trước)
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_snapshots',
+        verbose_name='Sản phẩm'
+    )
+    snapshot_date = models.DateField(verbose_name='Ngày chốt')
+    quantity = models.IntegerField(verbose_name='Tồn cuối ngày')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Tồn kho cuối ngày'
+        verbose_name_plural = 'Tồn kho cuối ngày'
+        unique_together = ['product', 'snapshot_date']
+        ordering = ['-snapshot_date']
+    
+    def __str__(self):
+        return f"{self.product_id} - {self.snapshot_date}: {self.quantity}"
+
+
+class LowStockAlert(models.Model):
+    """
+    Sản phẩm đang dưới ngưỡng tồn kho (bảng cảnh báo, products.alerts cập nhật)
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='low_stock_alert',
+        verbose_name='Sản phẩm'
+    )
+    stock_quantity = models.IntegerField(verbose_name='Tồn kho')
+    threshold = models.IntegerField(verbose_name='Ngưỡng')
+    since = models.DateTimeField(verbose_name='Dưới ngưỡng từ')
+    
+    class Meta:
+        verbose_name = 'Cảnh báo tồn kho thấp'
+        verbose_name_plural = 'Cảnh báo tồn kho thấp'
+        ordering = ['stock_quantity', 'product']
+        indexes = [
+            models.Index(fields=['stock_quantity'], name='low_stock_quantity_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.stock_quantity} < {self.threshold}"
+    
+    @classmethod
+    def counts(cls):
+        """Số sản phẩm hết hàng / sắp hết hàng (1 câu truy vấn trên bảng cảnh báo)"""
+        return cls.objects.aggregate(
+            out_of_stock=models.Count('pk', filter=models.Q(stock_quantity__lte=0)),
+            low_stock=models.Count('pk', filter=models.Q(stock_quantity__gt=0)),
+        )
+
+
+class LowStockEvent(models.Model):
+    """
+    Lịch sử sản phẩm vào / ra khỏi danh sách tồn kho thấp
+    """
+    CRITICAL = 'critical'
+    RECOVERED = 'recovered'
+    KIND_CHOICES = (
+        (CRITICAL, 'Dưới ngưỡng'),
+        (RECOVERED, 'Đã đủ hàng'),
+    )
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='low_stock_events',
+        verbose_name='Sản phẩm'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Loại')
+    stock_quantity = models.IntegerField(verbose_name='Tồn kho')
+    threshold = models.IntegerField(verbose_name='Ngưỡng')
+    created_at = models.DateTimeField(verbose_name='Thời điểm')
+    
+    class Meta:
+        verbose_name = 'Lịch sử tồn kho thấp'
+        verbose_name_plural = 'Lịch sử tồn kho thấp'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='low_stock_event_product_idx'),
+            models.Index(fields=['created_at'], name='low_stock_event_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} {self.get_kind_display()} ({self.stock_quantity}/{self.threshold})"
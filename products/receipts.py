@@ -0,0 +1,71 @@
+from django.db import connection, transaction
+
+from .models import Product, GoodsReceipt, GoodsReceiptItem, StockMovement
+
+# ============================================================
+# GOODS RECEIPTS - Tạo phiếu nhập kho theo lô
+# ============================================================
+# Giải thích:
+# - Phiếu nhập và chi tiết được ghi bằng bulk_create, tồn kho được cộng bằng
+#   UPDATE F() + CASE (Product.add_stock) theo từng lô sản phẩm, tất cả trong
+#   1 transaction -> số câu truy vấn không tăng theo số dòng chi tiết
+# - Khóa các dòng sản phẩm theo thứ tự id trước khi cộng (giống reserve_stock)
+#   để không deadlock với phiếu xuất đang giữ hàng cùng sản phẩm
+# ============================================================
+
+BATCH_SIZE = 500
+
+
+def create_receipts(receipts):
+    """
+    Tạo nhiều phiếu nhập cùng lúc.
+    `receipts`: danh sách {'receipt_date', 'note', 'created_by', 'items': [...]}
+    mỗi dòng chi tiết {'product' (hoặc 'product_id'), 'quantity', 'unit_price'}
+    Trả về danh sách GoodsReceipt theo đúng thứ tự.
+    """
+    headers = [
+        GoodsReceipt(**{field: value for field, value in data.items() if field != 'items'})
+        for data in receipts
+    ]
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            created = GoodsReceipt.objects.bulk_create(headers)
+        else:
+            # Database không trả id sau bulk_create -> lưu từng phiếu (chi tiết vẫn ghi theo lô)
+            for header in headers:
+                header.save()
+            created = headers
+
+        items = []
+        quantities = {}
+        movements = {}
+        for receipt, data in zip(created, receipts):
+            for item_data in data['items']:
+                items.append(GoodsReceiptItem(receipt=receipt, **item_data))
+                product_id = item_data['product'].pk if 'product' in item_data else item_data['product_id']
+                quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+                by_receipt = movements.setdefault(product_id, {})
+                by_receipt[receipt.pk] = by_receipt.get(receipt.pk, 0) + item_data['quantity']
+        GoodsReceiptItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+
+        product_ids = sorted(quantities)
+        if connection.features.has_select_for_update:
+            list(Product.objects.select_for_update().filter(
+                pk__in=product_ids
+            ).order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            batch = product_ids[start:start + BATCH_SIZE]
+            Product.add_stock(
+                {product_id: quantities[product_id] for product_id in batch},
+                kind=StockMovement.RECEIPT,
+                movements=[
+                    (product_id, quantity, f'PN-{receipt_id}')
+                    for product_id in batch
+                    for receipt_id, quantity in movements[product_id].items()
+                ],
+            )
+
+    return created
+
@@ -1,11 +1,47 @@
 from rest_framework import serializers
-from .models import Unit, Product, GoodsReceipt, GoodsReceiptItem
+from .models import Unit, Product, GoodsReceipt, GoodsReceiptItem, LowStockEvent
+from .receipts import create_receipts
 
 # ============================================================
 # PRODUCT SERIALIZERS
 # ============================================================
 
 
+class ProductLookupField(serializers.PrimaryKeyRelatedField):
+    """
+    Chọn sản phẩm theo id.
+    Nếu serializer cha đã nạp sẵn sản phẩm vào context['product_cache']
+    thì tra trong đó, tránh 1 câu SELECT cho mỗi dòng chi tiết.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Product.objects.all())
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        cache = self.context.get('product_cache')
+        if cache is None:
+            return super().to_internal_value(data)
+        
+        try:
+            product = cache.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+    
+    @staticmethod
+    def build_cache(items):
+        """Nạp tất cả sản phẩm của danh sách dòng chi tiết bằng 1 câu SELECT"""
+        ids = set()
+        for item in items if isinstance(items, list) else []:
+            try:
+                ids.add(int(item.get('product')))
+            except (AttributeError, TypeError, ValueError):
+                continue
+        return Product.objects.select_related('unit').in_bulk(ids)
+
+
 class UnitSerializer(serializers.ModelSerializer):
     class Meta:
         model = Unit
@@ -45,10 +81,84 @@ class ProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Số lượng tồn kho không được âm')
         return value
 
+
+class LowStockEventSerializer(serializers.ModelSerializer):
+    """Lịch sử vào / ra danh sách tồn kho thấp"""
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    
+    class Meta:
+        model = LowStockEvent
+        fields = ['id', 'product', 'product_name', 'kind', 'kind_display',
+                  'stock_quantity', 'threshold', 'created_at']
+
+
+class ProductRuleFilterSerializer(serializers.Serializer):
+    """Bộ lọc sản phẩm của quy tắc cập nhật hàng loạt (bỏ trống = toàn bộ danh mục)"""
+    unit = serializers.CharField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    is_active = serializers.BooleanField(required=False)
+    min_price = serializers.DecimalField(max_digits=15, decimal_places=0, required=False)
+    max_price = serializers.DecimalField(max_digits=15, decimal_places=0, required=False)
+    
+    def validate_unit(self, value):
+        """Đơn vị theo id hoặc tên (không phân biệt hoa thường)"""
+        unit = Unit.objects.filter(pk=value).first() if value.isdigit() else None
+        unit = unit or Unit.objects.filter(name__iexact=value.strip()).first()
+        if unit is None:
+            raise serializers.ValidationError(f'Không tìm thấy đơn vị tính "{value}"')
+        return unit
+
+
+class ProductRuleSerializer(serializers.Serializer):
+    """
+    Quy tắc cập nhật hàng loạt, vd +5% giá cho đơn vị "thùng":
+    {"filter": {"unit": "thùng"}, "price_percent": 5}
+    """
+    filter = ProductRuleFilterSerializer(required=False)
+    price_percent = serializers.DecimalField(
+        max_digits=6, decimal_places=2, required=False, min_value=-99, max_value=1000
+    )
+    price_delta = serializers.IntegerField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    
+    def validate(self, attrs):
+        if 'price_percent' in attrs and 'price_delta' in attrs:
+            raise serializers.ValidationError('Chỉ dùng 1 trong price_percent / price_delta')
+        if not any(field in attrs for field in ('price_percent', 'price_delta', 'is_active')):
+            raise serializers.ValidationError('Cần ít nhất 1 trong: price_percent, price_delta, is_active')
+        return attrs
+    
+    def get_products(self):
+        """Queryset sản phẩm khớp bộ lọc"""
+        conditions = self.validated_data.get('filter', {})
+        products = Product.objects.all()
+        if 'unit' in conditions:
+            products = products.filter(unit=conditions['unit'])
+        if 'ids' in conditions:
+            products = products.filter(pk__in=conditions['ids'])
+        if 'is_active' in conditions:
+            products = products.filter(is_active=conditions['is_active'])
+        if 'min_price' in conditions:
+            products = products.filter(price__gte=conditions['min_price'])
+        if 'max_price' in conditions:
+            products = products.filter(price__lte=conditions['max_price'])
+        return products
+    
+    def get_changes(self):
+        """Tham số cho catalog.apply_rule"""
+        return {
+            field: self.validated_data[field]
+            for field in ('price_percent', 'price_delta', 'is_active')
+            if field in self.validated_data
+        }
+
+
 class GoodsReceiptItemSerializer(serializers.ModelSerializer):
     """
     Chi tiết phiếu nhập
     """
+    product = ProductLookupField()
     product_name = serializers.CharField(source='product.name', read_only=True)
     total_price = serializers.DecimalField(max_digits=15, decimal_places=0, read_only=True)
     
@@ -82,6 +192,12 @@ class GoodsReceiptCreateSerializer(serializers.ModelSerializer):
         model = GoodsReceipt
         fields = ['receipt_date', 'note', 'items']
     
+    def to_internal_value(self, data):
+        # Nạp sản phẩm của phiếu bằng 1 câu SELECT (phiếu trong lô đã có cache của serializer cha)
+        if hasattr(data, 'get') and 'product_cache' not in self.context:
+            self.context['product_cache'] = ProductLookupField.build_cache(data.get('items'))
+        return super().to_internal_value(data)
+    
     def validate_items(self, value):
         """Kiểm tra phải có ít nhất 1 item"""
         if not value:
@@ -97,15 +213,35 @@ class GoodsReceiptCreateSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        receipt = GoodsReceipt.objects.create(**validated_data)
-        
-        for item_data in items_data:
-            GoodsReceiptItem.objects.create(receipt=receipt, **item_data)
-            # Cập nhật tồn kho
-            product = item_data['product']
-            product.stock_quantity += item_data['quantity']
-            product.save()
-        
-        return receipt
+        # Ghi chi tiết theo lô, cộng tồn kho bằng UPDATE theo tập sản phẩm và ghi sổ kho
+        return create_receipts([validated_data])[0]
+
 
+class GoodsReceiptBulkSerializer(serializers.Serializer):
+    """
+    Tạo nhiều phiếu nhập trong 1 request (1 transaction)
+    """
+    MAX_LINES = 20000
+    
+    receipts = GoodsReceiptCreateSerializer(many=True, allow_empty=False)
+    
+    def to_internal_value(self, data):
+        # Nạp sản phẩm của tất cả phiếu bằng 1 câu SELECT (các phiếu con dùng chung cache)
+        receipts = data.get('receipts') if hasattr(data, 'get') else None
+        if isinstance(receipts, list):
+            items = []
+            for receipt in receipts:
+                if hasattr(receipt, 'get') and isinstance(receipt.get('items'), list):
+                    items.extend(receipt['items'])
+            if len(items) > self.MAX_LINES:
+                raise serializers.ValidationError({
+                    'receipts': f'Tối đa {self.MAX_LINES} dòng chi tiết mỗi lần nhập'
+                })
+            self.context['product_cache'] = ProductLookupField.build_cache(items)
+        return super().to_internal_value(data)
+    
+    def create(self, validated_data):
+        created_by = validated_data.get('created_by')
+        return create_receipts([
+            dict(receipt, created_by=created_by) for receipt in validated_data['receipts']
+        ])
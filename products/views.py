@@ -1,13 +1,20 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 
+from datetime import date, timedelta
+from functools import partial
+
 from accounts.views import IsAdmin, IsStaff
-from .models import Unit, Product, GoodsReceipt, GoodsReceiptItem
+from search import index as search_index
+from . import catalog, imports, ledger
+from .models import Unit, Product, GoodsReceipt, GoodsReceiptItem, LowStockAlert, LowStockEvent
 from .serializers import (
-    UnitSerializer, ProductSerializer,
-    GoodsReceiptSerializer, GoodsReceiptCreateSerializer
+    UnitSerializer, ProductSerializer, ProductRuleSerializer,
+    GoodsReceiptSerializer, GoodsReceiptCreateSerializer, GoodsReceiptBulkSerializer,
+    LowStockEventSerializer
 )
 
 # ============================================================
@@ -15,6 +22,18 @@ from .serializers import (
 # ============================================================
 
 
+def import_response(request, run):
+    """Đọc file CSV upload (field `file`) bằng `run(text_file)`, trả về báo cáo nhập"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Thiếu file CSV (field "file")'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        report = run(imports.open_text(upload.file))
+    except imports.ImportFileError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report)
+
+
 class UnitViewSet(viewsets.ModelViewSet):
     """API Quản lý đơn vị tính"""
     queryset = Unit.objects.all()
@@ -46,6 +65,11 @@ class ProductViewSet(viewsets.ModelViewSet):
         if search:
             queryset = queryset.filter(name__icontains=search)
         
+        # Tìm kiếm toàn văn (không phân biệt dấu) theo tên + mô tả
+        q = self.request.query_params.get('q')
+        if q:
+            queryset = search_index.filter_queryset(queryset, 'product', q)
+        
         # Filter theo khoảng giá
         min_price = self.request.query_params.get('min_price')
         if min_price:
@@ -55,8 +79,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
         
-        # Sort
-        sort_by = self.request.query_params.get('sort_by', 'name')
+        # Sort (khi tìm kiếm ?q= mặc định xếp theo độ liên quan)
+        sort_by = self.request.query_params.get('sort_by', None if q else 'name')
         if sort_by in ['name', 'price', '-price', 'stock_quantity', '-stock_quantity']:
             queryset = queryset.order_by(sort_by)
         
@@ -64,25 +88,143 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        """Danh sách sản phẩm sắp hết hàng (tồn < 10)"""
-        products = Product.objects.filter(stock_quantity__lt=10, is_active=True)
+        """Danh sách sản phẩm sắp hết hàng (dưới ngưỡng theo quy định - đọc từ bảng cảnh báo)"""
+        products = Product.objects.filter(low_stock_alert__isnull=False).select_related('unit')
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def low_stock_events(self, request):
+        """Lịch sử sản phẩm vào / ra danh sách tồn kho thấp (?product=&kind=critical|recovered)"""
+        events = LowStockEvent.objects.select_related('product')
+        product = request.query_params.get('product')
+        if product:
+            events = events.filter(product_id=product)
+        kind = request.query_params.get('kind')
+        if kind:
+            events = events.filter(kind=kind)
+        
+        page = self.paginate_queryset(events)
+        return self.get_paginated_response(LowStockEventSerializer(page, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def stock_at(self, request):
+        """Tồn kho cuối ngày ?date=YYYY-MM-DD (nhận cùng bộ lọc với danh sách)"""
+        try:
+            day = date.fromisoformat(request.query_params['date'])
+        except (KeyError, ValueError):
+            return Response({'error': 'date phải có dạng YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = ledger.with_stock_at(day, self.get_queryset()).values_list('id', 'name', 'stock_on_date')
+        return Response({
+            'date': day.isoformat(),
+            'data': [
+                {'product_id': pk, 'product_name': name, 'quantity': quantity}
+                for pk, name, quantity in rows
+            ],
+        })
+    
+    @action(detail=True, methods=['get'])
+    def movements(self, request, pk=None):
+        """Sổ kho của sản phẩm ?from=&to= (YYYY-MM-DD, mặc định 30 ngày gần nhất) kèm tồn đầu / cuối"""
+        product = self.get_object()
+        params = request.query_params
+        try:
+            end = date.fromisoformat(params['to']) if params.get('to') else date.today()
+            start = date.fromisoformat(params['from']) if params.get('from') else end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'from/to phải có dạng YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'from phải trước hoặc bằng to'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= ledger.MAX_DAYS:
+            return Response({'error': f'Tối đa {ledger.MAX_DAYS} ngày mỗi lần'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        opening = ledger.stock_at(start - timedelta(days=1), Product.objects.filter(pk=product.pk)).get(product.pk, 0)
+        movements = []
+        closing = opening
+        for movement in ledger.movements_between(start, end, product.pk):
+            closing += movement.quantity
+            movements.append({
+                'id': movement.id,
+                'date': movement.movement_date.isoformat(),
+                'kind': movement.kind,
+                'kind_display': movement.get_kind_display(),
+                'quantity': movement.quantity,
+                'balance': closing,
+                'reference': movement.reference,
+                'created_at': movement.created_at,
+            })
+        
+        return Response({
+            'product_id': product.pk,
+            'product_name': product.name,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'opening': opening,
+            'closing': closing,
+            'movements': movements,
+        })
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsStaff],
+            parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """Tạo / cập nhật danh mục sản phẩm từ file CSV (POST multipart, field `file`)"""
+        return import_response(request, imports.import_products)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsStaff])
+    def bulk_update(self, request):
+        """
+        Cập nhật giá / trạng thái / tồn kho hàng loạt
+        - {"items": [{"id", "price", "is_active", "stock_quantity"}, ...]}
+        - {"rule": {"filter": {"unit": "thùng"}, "price_percent": 5}}
+        """
+        items = request.data.get('items')
+        rule = request.data.get('rule')
+        if (items is None) == (rule is None):
+            return Response({'error': 'Cần 1 trong 2: "items" hoặc "rule"'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if rule is not None:
+            serializer = ProductRuleSerializer(data=rule)
+            serializer.is_valid(raise_exception=True)
+            matched, updated, skipped = catalog.apply_rule(serializer.get_products(), **serializer.get_changes())
+            errors = [{'id': pk, 'errors': {'price': 'Giá mới phải lớn hơn 0'}} for pk in skipped]
+            return Response({
+                'matched': matched,
+                'updated': updated,
+                'unchanged': matched - updated - len(skipped),
+                'error_count': len(errors),
+                'errors': errors,
+            })
+        
+        if not isinstance(items, list) or not items:
+            return Response({'error': '"items" phải là danh sách không rỗng'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > catalog.MAX_ITEMS:
+            return Response({'error': f'Tối đa {catalog.MAX_ITEMS} dòng mỗi lần'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        patches, errors = catalog.validate_patches(items)
+        updated, unchanged = catalog.apply_patches(patches)
+        return Response({
+            'matched': len(patches),
+            'updated': updated,
+            'unchanged': unchanged,
+            'error_count': len(errors),
+            'errors': errors,
+        })
+    
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Thống kê sản phẩm"""
         total = Product.objects.count()
         active = Product.objects.filter(is_active=True).count()
-        out_of_stock = Product.objects.filter(stock_quantity=0).count()
-        low_stock = Product.objects.filter(stock_quantity__lt=10, stock_quantity__gt=0).count()
+        # Hết hàng / sắp hết hàng: sản phẩm đang kinh doanh dưới ngưỡng tồn kho
+        alerts = LowStockAlert.counts()
         
         return Response({
             'total': total,
             'active': active,
             'inactive': total - active,
-            'out_of_stock': out_of_stock,
-            'low_stock': low_stock,
+            'out_of_stock': alerts['out_of_stock'],
+            'low_stock': alerts['low_stock'],
         })
 
 
@@ -98,3 +240,35 @@ class GoodsReceiptViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        """Nhập phiếu nhập kho từ file CSV (POST multipart, field `file`)"""
+        return import_response(request, partial(imports.import_receipts, user=request.user))
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Tạo nhiều phiếu nhập cùng lúc
+        POST /api/products/receipts/bulk/  {"receipts": [{receipt_date, note, items}, ...]}
+        """
+        serializer = GoodsReceiptBulkSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        receipts = serializer.save(created_by=request.user)
+        
+        data = []
+        lines = 0
+        for receipt, receipt_data in zip(receipts, serializer.validated_data['receipts']):
+            items = receipt_data['items']
+            lines += len(items)
+            data.append({
+                'id': receipt.id,
+                'receipt_date': receipt.receipt_date,
+                'line_count': len(items),
+                'total_amount': sum(item['quantity'] * item['unit_price'] for item in items),
+            })
+        return Response({
+            'created': len(receipts),
+            'lines': lines,
+            'receipts': data,
+        }, status=status.HTTP_201_CREATED)
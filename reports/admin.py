@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Regulation, RevenueReport, DebtReport
+from .models import Regulation, RevenueReport, DebtReport, ReportJob
 
 
 @admin.register(Regulation)
@@ -21,3 +21,10 @@ class DebtReportAdmin(admin.ModelAdmin):
     list_display = ['agency', 'month', 'year', 'opening_debt', 'incurred', 'paid', 'closing_debt']
     list_filter = ['year', 'month']
     search_fields = ['agency__name']
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['dedup_key', 'started_at', 'finished_at', 'worker', 'heartbeat_at']
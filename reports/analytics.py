@@ -0,0 +1,289 @@
+import json
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from orders.models import ExportOrderItem
+from .periods import is_closed, month_filter, months_between
+
+# ============================================================
+# ANALYTICS - Phân tích doanh thu tháng đã chốt bằng mảng NumPy
+# ============================================================
+# Giải thích:
+# - Chi tiết phiếu xuất hoàn thành của 1 tháng đã chốt không còn thay đổi,
+#   nên được lưu 1 lần thành các cột NumPy (.npy) trong ANALYTICS_DIR/YYYY-MM/
+#   và đọc lại bằng memory-map (không phải nạp cả file vào RAM)
+# - Xếp hạng, tỷ lệ doanh thu (như RevenueReport.ratio) và pivot được tính
+#   bằng group-by vector hóa (sắp xếp + cộng theo đoạn) trên int64, không
+#   dùng Decimal từng dòng như qua ORM
+# - Dữ liệu tháng thay đổi -> xóa file của tháng đó (invalidate_months), lần
+#   sau build lại: hoàn thành/hủy phiếu (rollups.record_orders), lưu/xóa phiếu
+#   xuất hoặc chi tiết phiếu (reports.signals, gồm sửa qua API PATCH và admin)
+# - Chỉ dùng cho số liệu chỉ đọc: xếp hạng (rankings), pivot (cube), dashboard
+#   đọc tháng đã chốt từ đây (build khi cần), tháng đang mở vẫn qua ORM.
+#   Tạo báo cáo / đối soát (generation, rollups) luôn đọc database
+# ============================================================
+
+COLUMNS = {
+    'order': 'int64',
+    'agency': 'int32',
+    'product': 'int32',
+    'day': 'int8',
+    'quantity': 'int32',
+    'unit_price': 'int64',
+}
+CHUNK_SIZE = 50000
+
+
+def data_dir():
+    return Path(getattr(settings, 'ANALYTICS_DIR', Path(settings.BASE_DIR) / 'analytics_data'))
+
+
+def month_dir(year, month):
+    return data_dir() / f'{year:04d}-{month:02d}'
+
+
+def is_built(year, month):
+    return (month_dir(year, month) / 'meta.json').exists()
+
+
+# ============================================================
+# LƯU / ĐỌC CỘT THEO THÁNG
+# ============================================================
+
+
+def write_month(year, month, columns):
+    """Ghi các cột của tháng ra file .npy (ghi vào thư mục tạm rồi đổi tên)"""
+    target = month_dir(year, month)
+    # Tên thư mục tạm riêng cho mỗi lần ghi: 2 request cùng build 1 tháng không ghi đè nhau
+    tmp = target.with_name(f'{target.name}.{uuid.uuid4().hex}.tmp')
+    tmp.mkdir(parents=True)
+
+    rows = 0
+    for name, dtype in COLUMNS.items():
+        array = np.asarray(columns[name], dtype=dtype)
+        rows = len(array)
+        np.save(tmp / f'{name}.npy', array)
+    (tmp / 'meta.json').write_text(json.dumps({'year': year, 'month': month, 'rows': rows, 'built_at': time.time()}))
+
+    shutil.rmtree(target, ignore_errors=True)
+    try:
+        tmp.rename(target)
+    except OSError:
+        # Lần build khác vừa ghi xong tháng này trước
+        shutil.rmtree(tmp, ignore_errors=True)
+    return rows
+
+
+def build_month(year, month, chunk_size=CHUNK_SIZE):
+    """Đọc chi tiết phiếu hoàn thành của tháng đã chốt từ database và lưu thành cột NumPy"""
+    if not is_closed(year, month):
+        raise ValueError(f'Tháng {month}/{year} chưa chốt')
+    rows = ExportOrderItem.objects.filter(
+        **month_filter('order__order_date', year, month), order__status='completed'
+    ).order_by().values_list(
+        'order_id', 'order__agency_id', 'product_id', 'order__order_date', 'quantity', 'unit_price'
+    )
+
+    chunks = {name: [] for name in COLUMNS}
+    buffer = []
+
+    def flush():
+        if not buffer:
+            return
+        order, agency, product, order_date, quantity, unit_price = zip(*buffer)
+        chunks['order'].append(np.array(order, dtype=COLUMNS['order']))
+        chunks['agency'].append(np.array(agency, dtype=COLUMNS['agency']))
+        chunks['product'].append(np.array(product, dtype=COLUMNS['product']))
+        chunks['day'].append(np.array([d.day for d in order_date], dtype=COLUMNS['day']))
+        chunks['quantity'].append(np.array(quantity, dtype=COLUMNS['quantity']))
+        chunks['unit_price'].append(np.array([int(p) for p in unit_price], dtype=COLUMNS['unit_price']))
+        buffer.clear()
+
+    for row in rows.iterator(chunk_size=chunk_size):
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            flush()
+    flush()
+
+    columns = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=COLUMNS[name])
+        for name, parts in chunks.items()
+    }
+    return write_month(year, month, columns)
+
+
+def load_month(year, month, mmap=True):
+    """{cột: mảng} của tháng (memory-map), build nếu chưa có"""
+    if not is_built(year, month):
+        build_month(year, month)
+    folder = month_dir(year, month)
+    return {
+        name: np.load(folder / f'{name}.npy', mmap_mode='r' if mmap else None)
+        for name in COLUMNS
+    }
+
+
+def load_range(start, end):
+    """Ghép các cột của các tháng từ `start` đến `end`, thêm cột 'period' (year*100+month)"""
+    parts = []
+    for year, month in months_between(start, end):
+        columns = load_month(year, month)
+        columns['period'] = np.full(len(columns['order']), year * 100 + month, dtype='int32')
+        parts.append(columns)
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([part[name] for part in parts]) for name in [*COLUMNS, 'period']}
+
+
+def invalidate_months(periods):
+    """
+    Xóa file của các tháng có dữ liệu thay đổi: xóa ngay và xóa lại khi transaction
+    commit (request khác có thể đã build lại từ dữ liệu cũ trong lúc chưa commit)
+    """
+    periods = set(periods)
+
+    def discard():
+        for year, month in periods:
+            shutil.rmtree(month_dir(year, month), ignore_errors=True)
+
+    discard()
+    transaction.on_commit(discard)
+
+
+# ============================================================
+# GROUP-BY VECTOR HÓA
+# ============================================================
+
+
+def amounts(facts):
+    """Thành tiền từng dòng (int64)"""
+    return facts['quantity'].astype('int64') * facts['unit_price']
+
+
+def group_sum(keys, values):
+    """(các key khác nhau, tổng values theo key) - sắp xếp rồi cộng theo đoạn"""
+    if len(keys) == 0:
+        return np.empty(0, dtype=keys.dtype), np.empty(0, dtype=values.dtype)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return sorted_keys[starts], np.add.reduceat(values[order], starts)
+
+
+def group_count_distinct(keys, members):
+    """(các key khác nhau, số `members` khác nhau theo key) - ví dụ số phiếu theo đại lý"""
+    combined, uniques = combine_keys(keys, members)
+    pairs = np.unique(combined)
+    codes, counts = np.unique(pairs // len(uniques[1]), return_counts=True)
+    return uniques[0][codes], counts
+
+
+def combine_keys(*columns):
+    """
+    Ghép nhiều cột số nguyên thành 1 key int64: mỗi cột được đổi sang mã liên tiếp
+    0..n-1 rồi ghép theo cơ số hỗn hợp. Trả về (key, [giá trị khác nhau của từng cột]).
+    """
+    key = np.zeros(len(columns[0]), dtype='int64')
+    uniques = []
+    for column in columns:
+        values, codes = np.unique(column, return_inverse=True)
+        key = key * max(len(values), 1) + codes
+        uniques.append(values)
+    return key, uniques
+
+
+def split_keys(key, uniques):
+    """Tách key từ combine_keys thành giá trị ban đầu của từng cột"""
+    columns = []
+    for values in reversed(uniques):
+        radix = max(len(values), 1)
+        columns.append(values[key % radix])
+        key = key // radix
+    return list(reversed(columns))
+
+
+def revenue_by_agency(facts):
+    """{agency_id: doanh thu}"""
+    agencies, totals = group_sum(facts['agency'], amounts(facts))
+    return dict(zip(agencies.tolist(), totals.tolist()))
+
+
+def revenue_shares(facts):
+    """
+    Tỷ lệ doanh thu từng đại lý (%) làm tròn 2 chữ số như RevenueReport.ratio.
+    Trả về {agency_id: (doanh thu, số phiếu, tỷ lệ)}.
+    """
+    agencies, totals = group_sum(facts['agency'], amounts(facts))
+    _, order_counts = group_count_distinct(facts['agency'], facts['order'])
+    grand_total = int(totals.sum())
+    ratios = np.round(totals * 100 / grand_total, 2) if grand_total else np.zeros(len(totals))
+    return {
+        agency: (int(total), int(count), float(ratio))
+        for agency, total, count, ratio in zip(agencies.tolist(), totals, order_counts, ratios)
+    }
+
+
+def ranking(facts, by='agency', measure='revenue', top=10, ascending=False):
+    """
+    Xếp hạng đại lý / sản phẩm theo doanh thu hoặc số lượng.
+    Trả về [(id, giá trị), ...] tối đa `top` phần tử (None = tất cả).
+    """
+    values = amounts(facts) if measure == 'revenue' else facts['quantity'].astype('int64')
+    keys, totals = group_sum(facts[by], values)
+    order = np.argsort(totals, kind='stable')
+    if not ascending:
+        order = order[::-1]
+    order = order[:top]
+    return list(zip(keys[order].tolist(), totals[order].tolist()))
+
+
+def competition_rank(values, ascending=False):
+    """
+    Hạng như RANK() của SQL (bằng nhau cùng hạng, hạng sau bị nhảy),
+    giá trị NaN (không có số liệu) xếp cuối
+    """
+    keys = np.asarray(values, dtype='float64')
+    if not ascending:
+        keys = -keys
+    keys = np.where(np.isnan(keys), np.inf, keys)
+    return np.searchsorted(np.sort(keys), keys, side='left') + 1
+
+
+def pivot(facts, dimensions, measure='revenue', lookups=None):
+    """
+    Pivot theo các chiều (cột trong facts: agency, product, day, period hoặc
+    chiều suy ra từ agency qua `lookups`, ví dụ {'district': mảng agency_id -> district_id}).
+    Trả về {(giá trị chiều 1, ...): tổng}.
+    """
+    lookups = lookups or {}
+    columns = [lookups[dim][facts['agency']] if dim in lookups else facts[dim] for dim in dimensions]
+    key, uniques = combine_keys(*columns)
+
+    if measure == 'order_count':
+        keys, totals = group_count_distinct(key, facts['order'])
+    else:
+        values = amounts(facts) if measure == 'revenue' else facts['quantity'].astype('int64')
+        keys, totals = group_sum(key, values)
+
+    parts = split_keys(keys, uniques)
+    return {
+        tuple(int(part[i]) for part in parts): int(totals[i])
+        for i in range(len(keys))
+    }
+
+
+def agency_lookup(field):
+    """Mảng agency_id -> `field`_id (district / agency_type) để dùng trong pivot"""
+    from agencies.models import Agency
+
+    rows = list(Agency.objects.values_list('pk', f'{field}_id'))
+    lookup = np.zeros(max((pk for pk, _ in rows), default=0) + 1, dtype='int32')
+    for pk, value in rows:
+        lookup[pk] = value
+    return lookup
@@ -4,3 +4,6 @@ class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
     verbose_name = 'Quy định và báo cáo'
+    
+    def ready(self):
+        from . import signals  # noqa: F401 - đăng ký signal bỏ cache dashboard
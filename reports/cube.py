@@ -0,0 +1,265 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, DecimalField
+from django.db.models.functions import TruncMonth
+
+from agencies.models import Agency, AgencyType, District
+from orders.models import ExportOrderItem
+from products.models import Product
+from . import analytics
+from .models import RevenueCube, RevenueCubeMonth
+from .periods import is_closed, month_filter, months_between, next_month, range_filter
+
+# ============================================================
+# REVENUE CUBE - Pivot doanh thu theo quận / loại đại lý / đại lý / sản phẩm / tháng
+# ============================================================
+# Giải thích:
+# - Tối đa 3 chiều, 1 chỉ số (doanh thu, số lượng, số phiếu), chỉ tính
+#   phiếu xuất hoàn thành
+# - Tháng chưa tổng hợp: 1 câu GROUP BY trên ExportOrderItem join phiếu,
+#   đại lý, sản phẩm
+# - Tháng đã chốt và đã tổng hợp (RevenueCubeMonth): đọc RevenueCube thay vì
+#   quét lại chi tiết phiếu
+# - Tháng đã chốt chưa tổng hợp: analytics.pivot trên file NumPy của tháng;
+#   các phần được cộng lại trong bộ nhớ
+# - Quận / loại đại lý lấy theo thông tin hiện tại của đại lý
+# ============================================================
+
+MAX_DIMENSIONS = 3
+
+# chiều -> (cột id, cột tên) khi đọc ExportOrderItem / RevenueCube
+DIMENSIONS = {
+    'district': {
+        'items': ('order__agency__district', 'order__agency__district__name'),
+        'cube': ('agency__district', 'agency__district__name'),
+    },
+    'agency_type': {
+        'items': ('order__agency__agency_type', 'order__agency__agency_type__name'),
+        'cube': ('agency__agency_type', 'agency__agency_type__name'),
+    },
+    'agency': {
+        'items': ('order__agency', 'order__agency__name'),
+        'cube': ('agency', 'agency__name'),
+    },
+    'product': {
+        'items': ('product', 'product__name'),
+        'cube': ('product', 'product__name'),
+    },
+    'month': None,
+}
+
+# chiều -> model lấy tên khi pivot bằng analytics
+MODELS = {
+    'district': District,
+    'agency_type': AgencyType,
+    'agency': Agency,
+    'product': Product,
+}
+
+MEASURES = ['revenue', 'quantity', 'order_count']
+
+MONEY = DecimalField(max_digits=15, decimal_places=0)
+
+
+def built_months(start, end):
+    """Các tháng trong khoảng đã tổng hợp vào RevenueCube"""
+    months = set(months_between(start, end))
+    built = RevenueCubeMonth.objects.filter(
+        year__gte=start[0], year__lte=end[0]
+    ).values_list('year', 'month')
+    return sorted(period for period in built if period in months)
+
+
+# ============================================================
+# PIVOT
+# ============================================================
+
+
+def pivot(dimensions, measure, start, end, use_cube=True):
+    """
+    Pivot doanh thu các tháng từ `start` đến `end` (start/end = (year, month)).
+    Trả về danh sách dict: {<chiều>_id, <chiều>: tên, ..., 'value'} sắp giảm dần theo value.
+    use_cube=False: bỏ qua RevenueCube và file phân tích, luôn đọc chi tiết phiếu.
+    """
+    cube_months = built_months(start, end) if use_cube else []
+    remaining = [period for period in months_between(start, end) if period not in set(cube_months)]
+    analytics_months = [period for period in remaining if use_cube and is_closed(*period)]
+    raw_months = [period for period in remaining if period not in set(analytics_months)]
+
+    cells = {}
+    if raw_months:
+        _merge(cells, dimensions, _raw_rows(dimensions, measure, raw_months))
+    if cube_months:
+        _merge(cells, dimensions, _cube_rows(dimensions, measure, cube_months))
+    if analytics_months:
+        _merge(cells, dimensions, _analytics_rows(dimensions, measure, analytics_months))
+
+    rows = list(cells.values())
+    rows.sort(key=lambda row: row['value'], reverse=True)
+    return rows
+
+
+def _contiguous(months):
+    """Gộp danh sách tháng (đã sắp xếp) thành các khoảng liên tiếp [(start, end)]"""
+    spans = []
+    for period in months:
+        if spans and next_month(*spans[-1][1]) == period:
+            spans[-1][1] = period
+        else:
+            spans.append([period, period])
+    return spans
+
+
+def _raw_rows(dimensions, measure, months):
+    period_filter = Q()
+    for start, end in _contiguous(months):
+        period_filter |= Q(**range_filter('order__order_date', start, end))
+
+    fields, names = [], {}
+    for dim in dimensions:
+        if dim == 'month':
+            continue
+        id_field, name_field = DIMENSIONS[dim]['items']
+        fields += [id_field, name_field]
+        names[dim] = (id_field, name_field)
+
+    queryset = ExportOrderItem.objects.filter(period_filter, order__status='completed')
+    if 'month' in dimensions:
+        queryset = queryset.annotate(period=TruncMonth('order__order_date'))
+        fields.append('period')
+
+    value = {
+        'revenue': Sum(F('quantity') * F('unit_price'), output_field=MONEY),
+        'quantity': Sum('quantity'),
+        'order_count': Count('order', distinct=True),
+    }[measure]
+    rows = queryset.values(*fields).annotate(value=value).order_by()
+
+    for row in rows:
+        yield _cell(row, names, row.get('period'), row['value'])
+
+
+def _cube_rows(dimensions, measure, months):
+    period_filter = Q()
+    for year, month in months:
+        period_filter |= Q(year=year, month=month)
+
+    fields, names = [], {}
+    for dim in dimensions:
+        if dim == 'month':
+            continue
+        id_field, name_field = DIMENSIONS[dim]['cube']
+        fields += [id_field, name_field]
+        names[dim] = (id_field, name_field)
+    if 'month' in dimensions:
+        fields += ['year', 'month']
+
+    # Có chiều sản phẩm -> đọc ô theo sản phẩm, ngược lại đọc ô tổng của đại lý
+    queryset = RevenueCube.objects.filter(period_filter, product__isnull='product' not in dimensions)
+    rows = queryset.values(*fields).annotate(value=Sum(measure)).order_by()
+
+    for row in rows:
+        period = date(row['year'], row['month'], 1) if 'month' in dimensions else None
+        yield _cell(row, names, period, row['value'])
+
+
+def _analytics_rows(dimensions, measure, months):
+    columns = ['period' if dim == 'month' else dim for dim in dimensions]
+    lookups = {
+        dim: analytics.agency_lookup(dim)
+        for dim in dimensions if dim in ('district', 'agency_type')
+    }
+    totals = {}
+    for start, end in _contiguous(months):
+        facts = analytics.load_range(tuple(start), tuple(end))
+        for key, value in analytics.pivot(facts, columns, measure, lookups).items():
+            totals[key] = totals.get(key, 0) + value
+
+    names = {dim: (f'{dim}_id', dim) for dim in dimensions if dim != 'month'}
+    labels = {
+        dim: dict(MODELS[dim].objects.filter(
+            pk__in={key[i] for key in totals}
+        ).values_list('pk', 'name'))
+        for i, dim in enumerate(dimensions) if dim != 'month'
+    }
+    for key, value in totals.items():
+        row, period = {}, None
+        for dim, part in zip(dimensions, key):
+            if dim == 'month':
+                period = date(part // 100, part % 100, 1)
+            else:
+                row[f'{dim}_id'] = part
+                row[dim] = labels[dim].get(part)
+        yield _cell(row, names, period, value)
+
+
+def _cell(row, names, period, value):
+    cell = {}
+    for dim, (id_field, name_field) in names.items():
+        cell[f'{dim}_id'] = row[id_field]
+        cell[dim] = row[name_field]
+    if period is not None:
+        period = period.date() if hasattr(period, 'date') else period
+        cell['month'] = f'{period.year:04d}-{period.month:02d}'
+    cell['value'] = value or 0
+    return cell
+
+
+def _merge(cells, dimensions, rows):
+    for row in rows:
+        key = tuple(row.get(f'{dim}_id', row.get(dim)) for dim in dimensions)
+        if key in cells:
+            cells[key]['value'] += row['value']
+        else:
+            cells[key] = row
+
+
+# ============================================================
+# TỔNG HỢP THÁNG ĐÃ CHỐT
+# ============================================================
+
+
+def build_month(year, month):
+    """Tổng hợp lại RevenueCube của 1 tháng (2 câu GROUP BY + bulk_create)"""
+    items = ExportOrderItem.objects.filter(
+        **month_filter('order__order_date', year, month), order__status='completed'
+    )
+    revenue = Sum(F('quantity') * F('unit_price'), output_field=MONEY)
+    by_product = items.values('order__agency', 'product').annotate(
+        revenue=revenue, quantity=Sum('quantity'), order_count=Count('order', distinct=True)
+    ).order_by()
+    by_agency = items.values('order__agency').annotate(
+        revenue=revenue, quantity=Sum('quantity'), order_count=Count('order', distinct=True)
+    ).order_by()
+
+    cells = [
+        RevenueCube(
+            year=year, month=month, agency_id=row['order__agency'], product_id=row.get('product'),
+            revenue=row['revenue'] or 0, quantity=row['quantity'] or 0, order_count=row['order_count'],
+        )
+        for rows in (by_product, by_agency) for row in rows
+    ]
+
+    with transaction.atomic():
+        RevenueCube.objects.filter(year=year, month=month).delete()
+        RevenueCube.objects.bulk_create(cells)
+        RevenueCubeMonth.objects.update_or_create(year=year, month=month)
+    return len(cells)
+
+
+def build_range(start, end, progress=None):
+    """Tổng hợp các tháng đã chốt trong khoảng, trả về {(year, month): số ô}"""
+    months = [period for period in months_between(start, end) if is_closed(*period)]
+    built = {}
+    for index, (year, month) in enumerate(months, start=1):
+        built[(year, month)] = build_month(year, month)
+        if progress:
+            progress(index * 100 / len(months))
+    return built
+
+
+def invalidate_months(periods):
+    """Bỏ đánh dấu các tháng có dữ liệu thay đổi (truy vấn sẽ đọc chi tiết phiếu)"""
+    for year, month in set(periods):
+        RevenueCubeMonth.objects.filter(year=year, month=month).delete()
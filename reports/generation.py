@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from agencies.models import Agency
+from orders.models import ExportOrder
+from payments.models import Payment
+from .models import RevenueReport, DebtReport
+from .periods import range_filter, months_between
+from .rollups import opening_debt_by_agency, earlier_than, later_than, revenue_ratio
+
+# ============================================================
+# REPORT GENERATION - Tạo báo cáo doanh số / công nợ theo tháng
+# ============================================================
+# Giải thích:
+# - Mỗi loại số liệu lấy bằng 1 câu GROUP BY theo (đại lý, tháng) cho cả
+#   khoảng tháng (phiếu xuất hoàn thành, phiếu thu), nợ đầu kỳ của tháng đầu
+#   tiên lấy từ báo cáo gần nhất trước đó, ghép lại trong bộ nhớ
+# - Luôn đọc từ database (không dùng file phân tích NumPy): báo cáo được lưu
+#   lại và dùng để đối soát nên phải lấy từ dữ liệu gốc
+# - Nợ đầu/cuối các tháng tính bằng tổng dồn trong 1 vòng lặp theo thứ tự tháng
+# - Xóa báo cáo cũ và bulk_create báo cáo mới trong 1 transaction
+# - Số câu SELECT/DELETE không phụ thuộc số đại lý hay số tháng, số câu INSERT
+#   chỉ tăng theo số lô của bulk_create (giới hạn tham số của database)
+# ============================================================
+
+MAX_MONTHS = 120
+
+
+def active_agency_ids():
+    return list(Agency.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+
+
+def revenue_by_agency(start, end):
+    """{(agency_id, year, month): (số phiếu, doanh thu)} của các phiếu hoàn thành"""
+    rows = ExportOrder.objects.filter(
+        **range_filter('order_date', start, end), status='completed'
+    ).values('agency', period=TruncMonth('order_date')).annotate(
+        order_count=Count('id'), revenue=Sum('total_amount')
+    ).order_by()
+    return {
+        (row['agency'], row['period'].year, row['period'].month): (row['order_count'], row['revenue'] or 0)
+        for row in rows
+    }
+
+
+def paid_by_agency(start, end):
+    """{(agency_id, year, month): tổng tiền thu}"""
+    rows = Payment.objects.filter(
+        **range_filter('payment_date', start, end)
+    ).values('agency', period=TruncMonth('payment_date')).annotate(paid=Sum('amount')).order_by()
+    return {
+        (row['agency'], row['period'].year, row['period'].month): row['paid'] or 0
+        for row in rows
+    }
+
+
+def build_range(start, end, agency_ids=None):
+    """
+    Tính (chưa lưu) báo cáo doanh số, công nợ các tháng từ `start` đến `end`
+    và tổng doanh thu từng tháng. Mặc định cho các đại lý đang hoạt động.
+    Trả về (revenue_reports, debt_reports, {(year, month): tổng doanh thu}).
+    """
+    months = months_between(start, end)
+    if agency_ids is None:
+        agency_ids = active_agency_ids()
+    revenue = revenue_by_agency(start, end)
+    paid = paid_by_agency(start, end)
+    opening = opening_debt_by_agency(*start, Agency.objects.filter(pk__in=agency_ids))
+
+    totals = {period: 0 for period in months}
+    for (_, year, month), (_, amount) in revenue.items():
+        totals[(year, month)] += amount
+
+    revenue_reports, debt_reports = [], []
+    for agency_id in agency_ids:
+        balance = opening.get(agency_id, 0)
+        for year, month in months:
+            order_count, amount = revenue.get((agency_id, year, month), (0, 0))
+            agency_paid = paid.get((agency_id, year, month), 0)
+            total = totals[(year, month)]
+            revenue_reports.append(RevenueReport(
+                agency_id=agency_id, month=month, year=year,
+                order_count=order_count, total_revenue=amount,
+                ratio=revenue_ratio(amount, total),
+            ))
+            debt_reports.append(DebtReport(
+                agency_id=agency_id, month=month, year=year,
+                opening_debt=balance, incurred=amount, paid=agency_paid,
+                closing_debt=balance + amount - agency_paid,
+            ))
+            balance += amount - agency_paid
+    return revenue_reports, debt_reports, totals
+
+
+def build_month(year, month, agency_ids=None):
+    """Như build_range cho 1 tháng, trả về tổng doanh thu của tháng"""
+    revenue_reports, debt_reports, totals = build_range((year, month), (year, month), agency_ids)
+    return revenue_reports, debt_reports, totals[(year, month)]
+
+
+def generate_range(start, end, revenue_report=True, debt_report=True, progress=None):
+    """
+    Tạo lại báo cáo doanh số và/hoặc công nợ các tháng từ `start` đến `end`
+    (start/end = (year, month)) cho các đại lý đang hoạt động.
+    `progress(%)` (nếu có) được gọi sau mỗi bước.
+    Trả về {(year, month): tổng doanh thu}.
+    """
+    start, end = tuple(map(int, start)), tuple(map(int, end))
+    revenue_reports, debt_reports, totals = build_range(start, end)
+    if progress:
+        progress(50)
+    in_range = ~earlier_than(*start) & ~later_than(*end)
+
+    with transaction.atomic():
+        if revenue_report:
+            RevenueReport.objects.filter(in_range).delete()
+            RevenueReport.objects.bulk_create(revenue_reports)
+        if debt_report:
+            DebtReport.objects.filter(in_range).delete()
+            DebtReport.objects.bulk_create(debt_reports)
+
+    return totals
+
+
+def generate_month(year, month, revenue_report=True, debt_report=True):
+    """Tạo lại báo cáo của 1 tháng, trả về tổng doanh thu tháng"""
+    year, month = int(year), int(month)
+    totals = generate_range((year, month), (year, month), revenue_report, debt_report)
+    return totals[(year, month)]
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ReportJob
+from .periods import months_between, parse_month
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# REPORT JOBS - Chạy tác vụ báo cáo nền trong process (không cần broker)
+# ============================================================
+# Giải thích:
+# - submit() ghi 1 dòng ReportJob (status=queued) và trả về ngay,
+#   tác vụ được đưa vào thread pool sau khi transaction commit
+# - Request giống nhau (cùng kind + params) khi đã có tác vụ đang chờ/chạy
+#   -> dùng chung tác vụ đó (unique constraint có điều kiện trên dedup_key)
+# - Handler nhận (params, progress) và trả về kết quả dạng JSON;
+#   progress(%) ghi tiến độ xuống database để client hỏi lại
+# - REPORT_JOB_WORKERS = 0 -> chạy luôn trong request (dùng khi debug)
+# - Tác vụ đang chạy ghi worker (host:pid:token của process) và heartbeat_at;
+#   mỗi process có thread gửi tín hiệu (HEARTBEAT_INTERVAL) cho các tác vụ của mình
+# - recover(): tác vụ đang chạy không có tín hiệu quá REPORT_JOB_TIMEOUT
+#   (process đã chết) -> lỗi; nhiều process (gunicorn) không đánh dấu lỗi tác vụ
+#   còn sống của nhau. Thread tín hiệu gọi recover() định kỳ; khi khởi động chạy
+#   python manage.py recover_report_jobs (chạy luôn các tác vụ còn "đang chờ")
+# - Ghi kết quả chỉ khi tác vụ vẫn "đang chạy" bởi process này, không ghi đè
+#   tác vụ đã bị recover() đánh dấu lỗi
+# - Tác vụ: generate_reports, reconcile, build_cube, export (file CSV/XLSX
+#   ghi vào REPORT_EXPORT_DIR, tải qua /api/reports/jobs/<id>/download/)
+# ============================================================
+
+HANDLERS = {}
+
+HEARTBEAT_INTERVAL = 30  # giây
+
+# Định danh process (pid có thể bị dùng lại sau khi process chết -> thêm token)
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+_executor = None
+_executor_lock = threading.Lock()
+_running = set()
+_heartbeat = None
+
+
+def handler(kind):
+    """Đăng ký hàm xử lý cho 1 loại tác vụ"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def dedup_key(kind, params):
+    payload = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def submit(kind, params=None, user=None):
+    """
+    Tạo tác vụ mới hoặc dùng lại tác vụ đang chờ/chạy có cùng kind + params.
+    Trả về (job, created).
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f'Loại tác vụ không hợp lệ: {kind}')
+    params = params or {}
+    key = dedup_key(kind, params)
+
+    job = None
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    kind=kind, params=params, dedup_key=key,
+                    created_by=user if user and user.is_authenticated else None,
+                )
+            transaction.on_commit(lambda job_id=job.pk: _dispatch(job_id))
+            return job, True
+        except IntegrityError:
+            pass
+
+        job = ReportJob.objects.filter(dedup_key=key, status__in=ReportJob.ACTIVE_STATUSES).first()
+        if job is None:
+            continue
+        if not job.is_stale:
+            return job, False
+        # Tác vụ cũ bị treo -> đánh dấu lỗi rồi tạo lại
+        ReportJob.objects.filter(pk=job.pk, status=job.status).update(
+            status='failed', error='Quá thời gian chờ', finished_at=timezone.now()
+        )
+    return job, False
+
+
+def run(job_id):
+    """Chạy 1 tác vụ đang chờ (bỏ qua nếu tác vụ đã được chạy ở nơi khác)"""
+    now = timezone.now()
+    claimed = ReportJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=now, heartbeat_at=now, worker=WORKER_ID
+    )
+    if not claimed:
+        return
+    job = ReportJob.objects.get(pk=job_id)
+    # Chỉ ghi khi tác vụ vẫn do process này chạy
+    owned = ReportJob.objects.filter(pk=job_id, status='running', worker=WORKER_ID)
+
+    def progress(percent):
+        owned.update(progress=max(0, min(100, int(percent))), heartbeat_at=timezone.now())
+
+    with _executor_lock:
+        _running.add(job_id)
+    try:
+        result = HANDLERS[job.kind](job.params, progress)
+    except Exception as e:
+        logger.exception('Tác vụ báo cáo %s (%s) lỗi', job_id, job.kind)
+        finished = owned.update(status='failed', error=str(e) or repr(e), finished_at=timezone.now())
+    else:
+        finished = owned.update(status='succeeded', progress=100, result=result, finished_at=timezone.now())
+    finally:
+        with _executor_lock:
+            _running.discard(job_id)
+    if not finished:
+        logger.warning('Tác vụ báo cáo %s đã bị đánh dấu lỗi trước khi chạy xong, bỏ kết quả', job_id)
+
+
+def recover():
+    """
+    Đánh dấu lỗi các tác vụ "đang chạy" không có tín hiệu quá REPORT_JOB_TIMEOUT
+    (process xử lý đã dừng). Tác vụ của process còn sống không bị ảnh hưởng.
+    Trả về số tác vụ bị đánh dấu lỗi.
+    """
+    stale_before = ReportJob.stale_before()
+    failed = ReportJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=stale_before) | Q(heartbeat_at__isnull=True, started_at__lt=stale_before)
+    ).update(
+        status='failed', error='Mất tín hiệu từ process xử lý (server dừng khi tác vụ đang chạy)',
+        finished_at=timezone.now()
+    )
+    if failed:
+        logger.warning('Khôi phục tác vụ báo cáo: %s tác vụ mất tín hiệu bị đánh dấu lỗi', failed)
+    return failed
+
+
+def heartbeat():
+    """Gửi tín hiệu cho các tác vụ process này đang chạy, đánh dấu lỗi tác vụ mất tín hiệu"""
+    with _executor_lock:
+        running = list(_running)
+    if running:
+        ReportJob.objects.filter(pk__in=running, status='running', worker=WORKER_ID).update(
+            heartbeat_at=timezone.now()
+        )
+    recover()
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        try:
+            heartbeat()
+        except Exception:
+            logger.exception('Không gửi được tín hiệu tác vụ báo cáo')
+        finally:
+            connection.close()
+
+
+def _run_in_worker(job_id):
+    try:
+        run(job_id)
+    finally:
+        connection.close()
+
+
+def _dispatch(job_id):
+    workers = getattr(settings, 'REPORT_JOB_WORKERS', 2)
+    if workers <= 0:
+        run(job_id)
+        return
+
+    global _executor, _heartbeat
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-job')
+            _heartbeat = threading.Thread(target=_heartbeat_loop, name='report-job-heartbeat', daemon=True)
+            _heartbeat.start()
+    _executor.submit(_run_in_worker, job_id)
+
+
+# ============================================================
+# HANDLERS
+# ============================================================
+
+
+def _month_range(params):
+    start = parse_month(params['from'])
+    end = parse_month(params.get('to') or params['from'])
+    return start, end
+
+
+@handler('generate_reports')
+def generate_reports(params, progress):
+    """Tạo lại báo cáo các tháng {'from', 'to', 'revenue', 'debt'}"""
+    from .generation import generate_range
+
+    start, end = _month_range(params)
+    totals = generate_range(
+        start, end,
+        revenue_report=params.get('revenue', True),
+        debt_report=params.get('debt', True),
+        progress=progress,
+    )
+    return {
+        'months': [
+            {'year': year, 'month': month, 'total_revenue': float(total)}
+            for (year, month), total in totals.items()
+        ],
+        'total_revenue': float(sum(totals.values())),
+    }
+
+
+@handler('reconcile')
+def reconcile(params, progress):
+    """Đối soát báo cáo cập nhật dần với tính lại toàn bộ {'from', 'to', 'fix'}"""
+    from .generation import generate_month
+    from .models import RevenueReport, DebtReport
+    from .rollups import compare_with_rebuild
+
+    if params.get('from'):
+        months = months_between(*_month_range(params))
+    else:
+        months = sorted(
+            set(RevenueReport.objects.values_list('year', 'month').distinct())
+            | set(DebtReport.objects.values_list('year', 'month').distinct())
+        )
+
+    summary = []
+    for index, (year, month) in enumerate(months, start=1):
+        mismatches = compare_with_rebuild(year, month)
+        fixed = bool(mismatches) and bool(params.get('fix'))
+        if fixed:
+            generate_month(year, month)
+        summary.append({'year': year, 'month': month, 'mismatches': len(mismatches), 'fixed': fixed})
+        progress(index * 100 / len(months))
+
+    return {
+        'months': summary,
+        'mismatches': sum(m['mismatches'] for m in summary),
+    }
+
+
+@handler('build_cube')
+def build_cube(params, progress):
+    """Tổng hợp RevenueCube cho các tháng đã chốt {'from', 'to'}"""
+    from .cube import build_range
+
+    built = build_range(*_month_range(params), progress=progress)
+    return {
+        'months': [
+            {'year': year, 'month': month, 'cells': cells}
+            for (year, month), cells in built.items()
+        ],
+    }
+
+
+def export_dir():
+    path = Path(getattr(settings, 'REPORT_EXPORT_DIR', Path(settings.BASE_DIR) / 'export_files'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@handler('export')
+def export(params, progress):
+    """Xuất file CSV/XLSX của 1 danh sách {'view', 'query', 'format', 'user'}"""
+    from django.contrib.auth import get_user_model
+    from django.utils.module_loading import import_string
+    from config.exports import write_export
+
+    view_class = import_string(params['view'])
+    user = get_user_model().objects.get(pk=params['user'])
+    queryset = view_class.export_queryset(params.get('query', ''), user)
+
+    file_format = 'xlsx' if params.get('format') == 'xlsx' else 'csv'
+    filename = f'{view_class.export_name}-{date.today().isoformat()}.{file_format}'
+    stored_name = f'{uuid.uuid4().hex}.{file_format}'
+    size = write_export(
+        export_dir() / stored_name, queryset, view_class.export_columns,
+        file_format, view_class.export_name, progress=progress,
+    )
+    return {'file': stored_name, 'filename': filename, 'format': file_format, 'size': size}
@@ -0,0 +1,146 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+
+from config.benchmark import scratch_database, seed_data
+from orders.models import ExportOrder, ExportOrderItem
+from reports import analytics
+from reports.periods import month_filter, previous_month
+
+# ============================================================
+# SO SÁNH ORM VÀ NUMPY KHI PHÂN TÍCH 1 THÁNG ĐÃ CHỐT
+# ============================================================
+# Chạy: python manage.py bench_analytics --lines 10000000
+# Sinh dữ liệu giả cho tháng trước trên database tạm, đo thời gian tính
+# tỷ lệ doanh thu theo đại lý + top sản phẩm bằng ORM và bằng mảng NumPy
+# (file trong thư mục tạm của scratch_database), kết quả 2 cách phải giống nhau,
+# nếu không lệnh sẽ báo lỗi.
+# ============================================================
+
+MONEY = DecimalField(max_digits=15, decimal_places=0)
+BATCH_SIZE = 50000
+
+
+class Command(BaseCommand):
+    help = 'Đo thời gian phân tích doanh thu tháng đã chốt bằng ORM và bằng NumPy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=10_000_000, help='Số dòng chi tiết phiếu')
+        parser.add_argument('--lines-per-order', type=int, default=20)
+        parser.add_argument('--agencies', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['lines'] <= 0 or options['lines_per_order'] <= 0:
+            raise CommandError('--lines và --lines-per-order phải lớn hơn 0')
+
+        year, month = previous_month(date.today().year, date.today().month)
+        top = options['top']
+
+        with scratch_database():
+            data = seed_data(agencies=options['agencies'], products=options['products'])
+            started = time.perf_counter()
+            self._generate(data, year, month, options)
+            self.stdout.write(f"Sinh {options['lines']} dòng: {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            orm_shares, orm_top = self._orm(year, month, top)
+            orm_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            rows = analytics.build_month(year, month)
+            build_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            facts = analytics.load_month(year, month)
+            np_shares = analytics.revenue_shares(facts)
+            np_top = analytics.ranking(facts, by='product', measure='quantity', top=top)
+            np_elapsed = time.perf_counter() - started
+
+        self._compare(orm_shares, np_shares, orm_top, np_top)
+
+        self.stdout.write(f'ORM            : {orm_elapsed * 1000:.0f} ms')
+        self.stdout.write(f'Build NumPy    : {build_elapsed * 1000:.0f} ms ({rows} dòng, 1 lần / tháng)')
+        self.stdout.write(f'NumPy (memmap) : {np_elapsed * 1000:.0f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'OK - kết quả giống nhau, nhanh hơn {orm_elapsed / max(np_elapsed, 1e-9):.1f} lần'
+        ))
+
+    def _generate(self, data, year, month, options):
+        """Sinh phiếu xuất hoàn thành + chi tiết ngẫu nhiên trong tháng"""
+        rng = np.random.default_rng(options['seed'])
+        lines = options['lines']
+        order_count = -(-lines // options['lines_per_order'])
+        agency_ids = np.array([agency.pk for agency in data['agencies']])
+        product_ids = np.array([product.pk for product in data['products']])
+        last_day = (date(year + month // 12, month % 12 + 1, 1) - date(year, month, 1)).days
+        user = data['user']
+
+        for offset in range(0, order_count, BATCH_SIZE):
+            size = min(BATCH_SIZE, order_count - offset)
+            agencies = rng.choice(agency_ids, size).tolist()
+            days = rng.integers(1, last_day + 1, size).tolist()
+            ExportOrder.objects.bulk_create([
+                ExportOrder(
+                    agency_id=agency, order_date=date(year, month, day), status='completed',
+                    created_by=user, total_amount=0, total_quantity=0, line_count=0,
+                )
+                for agency, day in zip(agencies, days)
+            ])
+        order_ids = np.array(ExportOrder.objects.order_by('id').values_list('id', flat=True))
+
+        sql = (
+            f'INSERT INTO {ExportOrderItem._meta.db_table} '
+            f'(order_id, product_id, quantity, unit_price) VALUES (%s, %s, %s, %s)'
+        )
+        for offset in range(0, lines, BATCH_SIZE):
+            size = min(BATCH_SIZE, lines - offset)
+            rows = zip(
+                order_ids[np.arange(offset, offset + size) % len(order_ids)].tolist(),
+                rng.choice(product_ids, size).tolist(),
+                rng.integers(1, 100, size).tolist(),
+                (rng.integers(1, 1000, size) * 1000).tolist(),
+            )
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, list(rows))
+
+    def _orm(self, year, month, top):
+        """Tỷ lệ doanh thu theo đại lý và top sản phẩm theo số lượng qua ORM"""
+        items = ExportOrderItem.objects.filter(
+            **month_filter('order__order_date', year, month), order__status='completed'
+        )
+        rows = list(items.values('order__agency').annotate(
+            revenue=Sum(F('quantity') * F('unit_price'), output_field=MONEY),
+            order_count=Count('order', distinct=True),
+        ).order_by())
+        grand_total = sum(row['revenue'] for row in rows)
+        shares = {
+            row['order__agency']: (
+                int(row['revenue']), row['order_count'],
+                (Decimal(row['revenue']) * 100 / grand_total).quantize(Decimal('0.01')) if grand_total else 0,
+            )
+            for row in rows
+        }
+        ranking = list(items.values('product').annotate(
+            value=Sum('quantity')
+        ).order_by('-value', '-product').values_list('product', 'value')[:top])
+        return shares, ranking
+
+    def _compare(self, orm_shares, np_shares, orm_top, np_top):
+        if orm_shares.keys() != np_shares.keys():
+            raise CommandError('Danh sách đại lý khác nhau giữa ORM và NumPy')
+        for agency, (revenue, order_count, ratio) in orm_shares.items():
+            np_revenue, np_count, np_ratio = np_shares[agency]
+            if revenue != np_revenue or order_count != np_count or abs(float(ratio) - np_ratio) > 0.01:
+                raise CommandError(
+                    f'Đại lý {agency}: ORM {(revenue, order_count, ratio)} != NumPy {np_shares[agency]}'
+                )
+        if [value for _, value in orm_top] != [value for _, value in np_top]:
+            raise CommandError(f'Top sản phẩm khác nhau: ORM {orm_top} != NumPy {np_top}')
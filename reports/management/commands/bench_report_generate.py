@@ -0,0 +1,75 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from config.benchmark import scratch_database, seed_data
+from orders.models import ExportOrder
+from payments.models import Payment
+from reports.generation import generate_month
+from reports.models import RevenueReport, DebtReport
+
+# ============================================================
+# KIỂM TRA SỐ CÂU TRUY VẤN KHI TẠO BÁO CÁO THÁNG
+# ============================================================
+# Chạy: python manage.py bench_report_generate --agencies 10 100 1000 5000
+# Số câu SELECT/DELETE phải giống nhau với mọi số đại lý (INSERT chỉ
+# tăng theo số lô bulk_create), nếu không lệnh sẽ báo lỗi.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Đếm số câu truy vấn và thời gian tạo báo cáo tháng với số đại lý khác nhau'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--agencies', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--orders-per-agency', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        today = date.today()
+
+        counts = {}
+        for size in options['agencies']:
+            with scratch_database():
+                data = seed_data(agencies=size)
+                user = data['user']
+
+                orders, payments = [], []
+                for agency in data['agencies']:
+                    for _ in range(options['orders_per_agency']):
+                        amount = rng.randint(1, 100) * 10000
+                        orders.append(ExportOrder(
+                            agency=agency, order_date=today, status='completed',
+                            created_by=user, total_amount=amount, total_quantity=1, line_count=1,
+                        ))
+                    payments.append(Payment(
+                        agency=agency, payment_date=today, received_by=user,
+                        amount=rng.randint(1, 50) * 10000,
+                    ))
+                ExportOrder.objects.bulk_create(orders)
+                Payment.objects.bulk_create(payments)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    generate_month(today.year, today.month)
+                    elapsed = time.perf_counter() - started
+
+                if RevenueReport.objects.count() != size or DebtReport.objects.count() != size:
+                    raise CommandError(f'{size} đại lý: số dòng báo cáo không khớp')
+
+            statements = [q['sql'].split(None, 1)[0].upper() for q in ctx.captured_queries]
+            inserts = statements.count('INSERT')
+            counts[size] = len(statements) - inserts
+            self.stdout.write(
+                f'{size:>7} đại lý: {counts[size]} câu SELECT/DELETE + {inserts} lô INSERT, '
+                f'{elapsed * 1000:.0f} ms'
+            )
+
+        if len(set(counts.values())) > 1:
+            raise CommandError('Số câu truy vấn thay đổi theo số đại lý')
+        self.stdout.write(self.style.SUCCESS('OK - số câu truy vấn không đổi'))
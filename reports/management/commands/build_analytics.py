@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports import analytics
+from reports.periods import is_closed, months_between, parse_month
+
+# ============================================================
+# LƯU CHI TIẾT PHIẾU XUẤT CÁC THÁNG ĐÃ CHỐT THÀNH CỘT NUMPY
+# ============================================================
+# Chạy: python manage.py build_analytics --from 2023-01 --to 2025-12
+# Chỉ build các tháng đã kết thúc; file nằm trong ANALYTICS_DIR/YYYY-MM/.
+# Tháng bị thay đổi sau khi build sẽ tự bị xóa file và build lại khi cần.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Lưu chi tiết phiếu xuất hoàn thành của các tháng đã chốt thành mảng NumPy'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='Tháng đầu (YYYY-MM)')
+        parser.add_argument('--to', dest='end', help='Tháng cuối (YYYY-MM), mặc định = --from')
+    
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start'])
+            end = parse_month(options['end'] or options['start'])
+        except ValueError:
+            raise CommandError('Tháng phải có dạng YYYY-MM')
+        if start > end:
+            raise CommandError('--from phải trước hoặc bằng --to')
+        
+        months = [period for period in months_between(start, end) if is_closed(*period)]
+        started = time.perf_counter()
+        total = 0
+        for year, month in months:
+            month_started = time.perf_counter()
+            rows = analytics.build_month(year, month)
+            total += rows
+            self.stdout.write(f'{month:02d}/{year}: {rows} dòng, {time.perf_counter() - month_started:.2f}s')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Đã build {len(months)} tháng ({total} dòng) trong {elapsed:.2f}s'))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.cube import build_range
+from reports.periods import parse_month
+
+# ============================================================
+# TỔNG HỢP TRƯỚC DOANH THU CÁC THÁNG ĐÃ CHỐT (RevenueCube)
+# ============================================================
+# Chạy: python manage.py build_revenue_cube --from 2023-01 --to 2025-12
+# Chỉ tổng hợp các tháng đã kết thúc; API pivot sẽ đọc bảng tổng hợp thay
+# vì quét lại chi tiết phiếu xuất của các tháng này.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Tổng hợp doanh thu theo (tháng, đại lý, sản phẩm) cho các tháng đã chốt'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='Tháng đầu (YYYY-MM)')
+        parser.add_argument('--to', dest='end', help='Tháng cuối (YYYY-MM), mặc định = --from')
+    
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start'])
+            end = parse_month(options['end'] or options['start'])
+        except ValueError:
+            raise CommandError('Tháng phải có dạng YYYY-MM')
+        if start > end:
+            raise CommandError('--from phải trước hoặc bằng --to')
+        
+        started = time.perf_counter()
+        built = build_range(start, end)
+        elapsed = time.perf_counter() - started
+        
+        for (year, month), cells in built.items():
+            self.stdout.write(f'{month:02d}/{year}: {cells} ô')
+        self.stdout.write(self.style.SUCCESS(f'Đã tổng hợp {len(built)} tháng trong {elapsed:.2f}s'))
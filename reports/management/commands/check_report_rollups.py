@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.generation import generate_month
+from reports.models import RevenueReport, DebtReport
+from reports.periods import parse_period
+from reports.rollups import compare_with_rebuild
+
+# ============================================================
+# KIỂM TRA BÁO CÁO CẬP NHẬT DẦN SO VỚI TÍNH LẠI TOÀN BỘ
+# ============================================================
+# Chạy: python manage.py check_report_rollups [--year 2025 --month 12] [--fix]
+# Mặc định kiểm tra mọi tháng đã có báo cáo (theo thứ tự thời gian).
+# Có chỗ lệch -> báo lỗi; --fix tạo lại các tháng bị lệch.
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'So sánh báo cáo doanh số/công nợ cập nhật dần với kết quả tính lại toàn bộ'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int)
+        parser.add_argument('--month', type=int)
+        parser.add_argument('--fix', action='store_true', help='Tạo lại các tháng bị lệch')
+    
+    def handle(self, *args, **options):
+        if options['year'] or options['month']:
+            try:
+                periods = [parse_period(options['year'], options['month'])]
+            except (TypeError, ValueError):
+                raise CommandError('Cần cả --year và --month hợp lệ')
+        else:
+            periods = sorted(
+                set(RevenueReport.objects.values_list('year', 'month').distinct())
+                | set(DebtReport.objects.values_list('year', 'month').distinct())
+            )
+        
+        broken = []
+        for year, month in periods:
+            mismatches = compare_with_rebuild(year, month)
+            if not mismatches:
+                self.stdout.write(f'{month:02d}/{year}: khớp')
+                continue
+            
+            broken.append((year, month))
+            self.stdout.write(self.style.WARNING(f'{month:02d}/{year}: {len(mismatches)} chỗ lệch'))
+            for m in mismatches[:20]:
+                self.stdout.write(
+                    f"  Đại lý {m['agency']} [{m['report']}] {m['field'] or 'thiếu dòng'}: "
+                    f"đang lưu {m['stored']}, tính lại {m['expected']}"
+                )
+            if options['fix']:
+                generate_month(year, month)
+                self.stdout.write(f'  -> đã tạo lại {month:02d}/{year}')
+        
+        if broken and not options['fix']:
+            raise CommandError(f'{len(broken)} tháng bị lệch')
+        self.stdout.write(self.style.SUCCESS('OK'))
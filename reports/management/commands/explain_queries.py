@@ -0,0 +1,64 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from orders.models import ExportOrder
+from payments.models import Payment
+from reports.models import RevenueReport, DebtReport
+from reports.periods import month_filter
+
+# ============================================================
+# IN KẾ HOẠCH THỰC THI (EXPLAIN) CHO CÁC TRUY VẤN NÓNG
+# ============================================================
+# Chạy: python manage.py explain_queries --year 2025 --month 12
+# Dùng để kiểm tra các truy vấn lọc/báo cáo có dùng index hay không
+# (SQLite: EXPLAIN QUERY PLAN).
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'In EXPLAIN QUERY PLAN cho các truy vấn lọc đơn hàng, phiếu thu và báo cáo'
+    
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument('--year', type=int, default=today.year)
+        parser.add_argument('--month', type=int, default=today.month)
+        parser.add_argument('--agency', type=int, default=1)
+    
+    def handle(self, *args, **options):
+        year, month, agency = options['year'], options['month'], options['agency']
+        orders_in_month = month_filter('order_date', year, month)
+        
+        queries = [
+            ('Danh sách phiếu xuất (thứ tự mặc định)',
+             ExportOrder.objects.all()[:20]),
+            ('Phiếu xuất theo đại lý + trạng thái + khoảng ngày',
+             ExportOrder.objects.filter(
+                 agency_id=agency, status='completed', **orders_in_month
+             )),
+            ('Phiếu xuất theo trạng thái + khoảng ngày',
+             ExportOrder.objects.filter(status='pending', **orders_in_month)),
+            ('Phiếu xuất theo người tạo',
+             ExportOrder.objects.filter(created_by_id=1)[:20]),
+            ('Phiếu xuất theo tổng tiền',
+             ExportOrder.objects.filter(total_amount__gte=1000000).order_by('-total_amount')[:20]),
+            ('Doanh số tháng theo đại lý (GROUP BY)',
+             ExportOrder.objects.filter(status='completed', **orders_in_month)
+             .values('agency').annotate(order_count=Count('id'), revenue=Sum('total_amount'))),
+            ('Phiếu thu của đại lý trong tháng',
+             Payment.objects.filter(agency_id=agency, **month_filter('payment_date', year, month))),
+            ('Phiếu thu trong tháng theo đại lý (GROUP BY)',
+             Payment.objects.filter(**month_filter('payment_date', year, month))
+             .values('agency').annotate(paid=Sum('amount'))),
+            ('Báo cáo doanh số theo tháng',
+             RevenueReport.objects.filter(year=year, month=month)),
+            ('Báo cáo công nợ theo tháng',
+             DebtReport.objects.filter(year=year, month=month)),
+        ]
+        
+        for title, queryset in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {title}'))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.generation import generate_range
+from reports.periods import parse_month
+
+# ============================================================
+# TẠO LẠI BÁO CÁO NHIỀU THÁNG
+# ============================================================
+# Chạy: python manage.py generate_reports --from 2024-01 --to 2025-12
+# Nợ đầu kỳ tháng đầu tiên lấy từ báo cáo gần nhất trước đó, các tháng
+# sau tính dồn trong cùng 1 lần chạy (không cần tạo lần lượt từng tháng).
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Tạo lại báo cáo doanh số và công nợ cho 1 khoảng tháng'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='Tháng đầu (YYYY-MM)')
+        parser.add_argument('--to', dest='end', help='Tháng cuối (YYYY-MM), mặc định = --from')
+    
+    def handle(self, *args, **options):
+        try:
+            start = parse_month(options['start'])
+            end = parse_month(options['end'] or options['start'])
+        except ValueError:
+            raise CommandError('Tháng phải có dạng YYYY-MM')
+        if start > end:
+            raise CommandError('--from phải trước hoặc bằng --to')
+        
+        started = time.perf_counter()
+        totals = generate_range(start, end)
+        elapsed = time.perf_counter() - started
+        
+        for (year, month), total in totals.items():
+            self.stdout.write(f'{month:02d}/{year}: doanh thu {total:,.0f}')
+        self.stdout.write(self.style.SUCCESS(f'Đã tạo lại {len(totals)} tháng trong {elapsed:.2f}s'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from reports import jobs
+from reports.models import ReportJob
+
+# ============================================================
+# KHÔI PHỤC TÁC VỤ BÁO CÁO KHI KHỞI ĐỘNG SERVER
+# ============================================================
+# Chạy: python manage.py recover_report_jobs [--skip-queued]
+# (trong script khởi động, trước khi chạy server)
+# - Tác vụ "đang chạy" không có tín hiệu quá REPORT_JOB_TIMEOUT -> lỗi
+# - Tác vụ còn "đang chờ" (process nhận tác vụ đã dừng) được chạy ngay trong
+#   lệnh này; tác vụ đã được process khác nhận thì bỏ qua
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Đánh dấu lỗi tác vụ báo cáo mất tín hiệu và chạy các tác vụ còn đang chờ'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-queued', action='store_true', help='Không chạy các tác vụ đang chờ')
+    
+    def handle(self, *args, **options):
+        failed = jobs.recover()
+        self.stdout.write(f'{failed} tác vụ mất tín hiệu bị đánh dấu lỗi')
+        if options['skip_queued']:
+            return
+        
+        queued = list(ReportJob.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True))
+        for job_id in queued:
+            jobs.run(job_id)
+            job = ReportJob.objects.get(pk=job_id)
+            self.stdout.write(f'#{job.pk} {job.kind}: {job.get_status_display()}')
+        self.stdout.write(self.style.SUCCESS(f'Đã xử lý {len(queued)} tác vụ đang chờ'))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='debtreport',
+            index=models.Index(fields=['year', 'month'], name='debt_report_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revenuereport',
+            index=models.Index(fields=['year', 'month'], name='revenue_report_period_idx'),
+        ),
+    ]
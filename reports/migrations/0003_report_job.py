@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_filter_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='Loại tác vụ')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Tham số')),
+                ('dedup_key', models.CharField(db_index=True, max_length=255, verbose_name='Khóa gộp')),
+                ('status', models.CharField(choices=[('queued', 'Đang chờ'), ('running', 'Đang chạy'), ('succeeded', 'Hoàn thành'), ('failed', 'Lỗi')], default='queued', max_length=20, verbose_name='Trạng thái')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='Tiến độ (%)')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Kết quả')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Lỗi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Bắt đầu')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Kết thúc')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Người tạo')),
+            ],
+            options={
+                'verbose_name': 'Tác vụ báo cáo',
+                'verbose_name_plural': 'Danh sách tác vụ báo cáo',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('dedup_key',), name='report_job_active_dedup')],
+            },
+        ),
+    ]
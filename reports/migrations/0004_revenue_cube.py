@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('products', '0001_initial'),
+        ('reports', '0003_report_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueCubeMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Năm')),
+                ('month', models.IntegerField(verbose_name='Tháng')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Thời điểm tổng hợp')),
+            ],
+            options={
+                'verbose_name': 'Tháng đã tổng hợp',
+                'verbose_name_plural': 'Các tháng đã tổng hợp',
+                'unique_together': {('year', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Năm')),
+                ('month', models.IntegerField(verbose_name='Tháng')),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=15, verbose_name='Doanh thu')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='Số lượng')),
+                ('order_count', models.IntegerField(default=0, verbose_name='Số phiếu xuất')),
+                ('agency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_cube', to='agencies.agency', verbose_name='Đại lý')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue_cube', to='products.product', verbose_name='Sản phẩm')),
+            ],
+            options={
+                'verbose_name': 'Ô tổng hợp doanh thu',
+                'verbose_name_plural': 'Tổng hợp doanh thu theo tháng',
+                'indexes': [models.Index(fields=['year', 'month'], name='revenue_cube_period_idx')],
+            },
+        ),
+    ]
@@ -8,6 +8,8 @@ from agencies.models import Agency
 # Giải thích:
 # - Regulation: Các quy định hệ thống (số đại lý tối đa/quận, ...)
 # - Report: Báo cáo doanh thu, công nợ theo tháng
+# - ReportJob: Tác vụ chạy nền (tạo báo cáo, đối soát, xuất file)
+# - RevenueCube: Doanh thu tổng hợp sẵn theo (tháng, đại lý, sản phẩm) cho tháng đã chốt
 # ============================================================
 
 
@@ -37,6 +39,13 @@ class Regulation(models.Model):
     def __str__(self):
         return f"{self.name}: {self.value}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mã lúc đọc lên, để signal biết quy định bị đổi mã (vd. bỏ khỏi nhóm ngưỡng tồn kho)
+        instance._loaded_code = instance.__dict__.get('code')
+        return instance
+    
     @classmethod
     def get_value(cls, code, default=None):
         """Lấy giá trị quy định theo mã"""
@@ -72,7 +81,7 @@ class RevenueReport(models.Model):
         verbose_name='Tổng doanh thu'
     )
     
-    # Tỷ lệ so với tổng
+    # Tỷ lệ so với tổng (ghi khi tạo báo cáo; API tính lại lúc đọc - reports.rollups)
     ratio = models.DecimalField(
         max_digits=5, 
         decimal_places=2, 
@@ -87,6 +96,9 @@ class RevenueReport(models.Model):
         verbose_name_plural = 'Danh sách báo cáo doanh số'
         unique_together = ['agency', 'month', 'year']
         ordering = ['-year', '-month']
+        indexes = [
+            models.Index(fields=['year', 'month'], name='revenue_report_period_idx'),
+        ]
     
     def __str__(self):
         return f"{self.agency.name} - {self.month}/{self.year}"
@@ -145,6 +157,143 @@ class DebtReport(models.Model):
         verbose_name_plural = 'Danh sách báo cáo công nợ'
         unique_together = ['agency', 'month', 'year']
         ordering = ['-year', '-month']
+        indexes = [
+            models.Index(fields=['year', 'month'], name='debt_report_period_idx'),
+        ]
     
     def __str__(self):
         return f"{self.agency.name} - {self.month}/{self.year}"
+
+
+class RevenueCube(models.Model):
+    """
+    Ô tổng hợp doanh thu tháng - theo (đại lý, sản phẩm)
+    product = NULL: tổng của đại lý trong tháng (số phiếu không bị đếm trùng)
+    """
+    year = models.IntegerField(verbose_name='Năm')
+    month = models.IntegerField(verbose_name='Tháng')
+    agency = models.ForeignKey(
+        Agency,
+        on_delete=models.CASCADE,
+        related_name='revenue_cube',
+        verbose_name='Đại lý'
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='revenue_cube',
+        verbose_name='Sản phẩm'
+    )
+    
+    revenue = models.DecimalField(max_digits=15, decimal_places=0, default=0, verbose_name='Doanh thu')
+    quantity = models.BigIntegerField(default=0, verbose_name='Số lượng')
+    order_count = models.IntegerField(default=0, verbose_name='Số phiếu xuất')
+    
+    class Meta:
+        verbose_name = 'Ô tổng hợp doanh thu'
+        verbose_name_plural = 'Tổng hợp doanh thu theo tháng'
+        indexes = [
+            models.Index(fields=['year', 'month'], name='revenue_cube_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.month}/{self.year} - {self.agency_id} - {self.product_id}"
+
+
+class RevenueCubeMonth(models.Model):
+    """
+    Đánh dấu tháng đã tổng hợp xong vào RevenueCube
+    (bị xóa khi dữ liệu tháng thay đổi -> truy vấn quay về đọc chi tiết phiếu)
+    """
+    year = models.IntegerField(verbose_name='Năm')
+    month = models.IntegerField(verbose_name='Tháng')
+    built_at = models.DateTimeField(auto_now=True, verbose_name='Thời điểm tổng hợp')
+    
+    class Meta:
+        verbose_name = 'Tháng đã tổng hợp'
+        verbose_name_plural = 'Các tháng đã tổng hợp'
+        unique_together = ['year', 'month']
+    
+    def __str__(self):
+        return f"{self.month}/{self.year}"
+
+
+class ReportJob(models.Model):
+    """
+    Tác vụ chạy nền - Tạo báo cáo, đối soát, xuất file
+    Client nhận id ngay và hỏi lại tiến độ qua /api/reports/jobs/<id>/
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Đang chờ'),
+        ('running', 'Đang chạy'),
+        ('succeeded', 'Hoàn thành'),
+        ('failed', 'Lỗi'),
+    )
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    kind = models.CharField(max_length=50, verbose_name='Loại tác vụ')
+    params = models.JSONField(default=dict, blank=True, verbose_name='Tham số')
+    # kind + params -> các request giống nhau dùng chung 1 tác vụ đang chạy
+    dedup_key = models.CharField(max_length=255, db_index=True, verbose_name='Khóa gộp')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued',
+        verbose_name='Trạng thái'
+    )
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name='Tiến độ (%)')
+    result = models.JSONField(null=True, blank=True, verbose_name='Kết quả')
+    error = models.TextField(blank=True, default='', verbose_name='Lỗi')
+    
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs',
+        verbose_name='Người tạo'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Bắt đầu')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Kết thúc')
+    # Process đang chạy tác vụ (host:pid:token) và lần cuối process đó báo còn sống
+    worker = models.CharField(max_length=100, blank=True, default='', verbose_name='Process xử lý')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='Tín hiệu cuối')
+    
+    class Meta:
+        verbose_name = 'Tác vụ báo cáo'
+        verbose_name_plural = 'Danh sách tác vụ báo cáo'
+        ordering = ['-created_at']
+        constraints = [
+            # Mỗi khóa gộp chỉ có tối đa 1 tác vụ đang chờ/đang chạy
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='report_job_active_dedup',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.get_status_display()}"
+    
+    @classmethod
+    def stale_before(cls):
+        """Mốc thời gian: không có tín hiệu từ trước mốc này -> coi như bị treo"""
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        return timezone.now() - getattr(settings, 'REPORT_JOB_TIMEOUT', timedelta(hours=1))
+    
+    @property
+    def is_stale(self):
+        """
+        Tác vụ chờ quá REPORT_JOB_TIMEOUT, hoặc đang chạy mà process xử lý không
+        gửi tín hiệu quá REPORT_JOB_TIMEOUT (ví dụ server dừng giữa chừng)
+        """
+        if self.status == 'queued':
+            return self.created_at <= self.stale_before()
+        if self.status == 'running':
+            return (self.heartbeat_at or self.started_at or self.created_at) <= self.stale_before()
+        return False
@@ -0,0 +1,70 @@
+from datetime import date
+
+# ============================================================
+# PERIODS - Tiện ích xử lý kỳ báo cáo (tháng/năm)
+# ============================================================
+# Giải thích:
+# - Lọc theo tháng dùng khoảng ngày nửa mở [ngày 1, ngày 1 tháng sau)
+#   thay cho __month/__year để database dùng được index trên cột ngày
+# ============================================================
+
+
+def month_bounds(year, month):
+    """Trả về (ngày đầu tháng, ngày đầu tháng sau)"""
+    year, month = int(year), int(month)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def is_closed(year, month):
+    """Tháng đã kết thúc (trước tháng hiện tại)"""
+    today = date.today()
+    return (year, month) < (today.year, today.month)
+
+
+def month_filter(field, year, month):
+    """Điều kiện lọc 1 tháng cho cột ngày `field`: {field__gte, field__lt}"""
+    start, end = month_bounds(year, month)
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+def previous_month(year, month):
+    """Tháng trước của (year, month)"""
+    year, month = int(year), int(month)
+    return (year, month - 1) if month > 1 else (year - 1, 12)
+
+
+def next_month(year, month):
+    """Tháng sau của (year, month)"""
+    year, month = int(year), int(month)
+    return (year, month + 1) if month < 12 else (year + 1, 1)
+
+
+def parse_period(year, month):
+    """Chuyển (year, month) từ request sang int, raise ValueError nếu không hợp lệ"""
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12 or not 1 <= year <= 9999:
+        raise ValueError('Tháng/năm không hợp lệ')
+    return year, month
+
+
+def range_filter(field, start, end):
+    """Điều kiện lọc các tháng từ `start` đến `end` (gồm cả 2 đầu), start/end = (year, month)"""
+    return {f'{field}__gte': month_bounds(*start)[0], f'{field}__lt': month_bounds(*end)[1]}
+
+
+def months_between(start, end):
+    """Danh sách (year, month) từ `start` đến `end` (gồm cả 2 đầu)"""
+    year, month = start
+    months = []
+    while (year, month) <= tuple(end):
+        months.append((year, month))
+        year, month = next_month(year, month)
+    return months
+
+
+def parse_month(value):
+    """'YYYY-MM' -> (year, month), raise ValueError nếu không hợp lệ"""
+    year, _, month = str(value).partition('-')
+    return parse_period(year, month)
@@ -0,0 +1,184 @@
+from django.db.models import (
+    DecimalField, F, FilteredRelation, FloatField, Q, Sum, Value, Window
+)
+from django.db.models.functions import Cast, Coalesce, NullIf, Rank
+
+from agencies.models import Agency
+from orders.models import ExportOrderItem
+from products.models import Product
+from . import analytics
+from .periods import is_closed, month_filter, previous_month
+
+# ============================================================
+# RANKINGS - Xếp hạng top/bottom N bằng hàm cửa sổ SQL (RANK() OVER)
+# ============================================================
+# Giải thích:
+# - Mỗi bảng xếp hạng là 1 câu truy vấn: giá trị kỳ này và kỳ trước nằm
+#   trên cùng 1 dòng, 2 hàm RANK() xếp hạng theo từng kỳ, LIMIT lấy N dòng
+# - Metric:
+#   revenue     : doanh số tháng của đại lý (RevenueReport, join theo kỳ)
+#   debt        : công nợ hiện tại, kỳ trước = nợ đầu kỳ tháng này (DebtReport)
+#   utilization : % công nợ / hạn mức nợ của loại đại lý
+#   quantity    : số lượng sản phẩm bán ra (phiếu xuất hoàn thành)
+# - Không có số liệu kỳ trước -> previous_rank = null
+# - Tháng đã chốt: revenue / quantity tính trên file phân tích NumPy
+#   (reports.analytics) thay vì quét báo cáo / chi tiết phiếu, cùng cách xếp hạng
+# ============================================================
+
+METRICS = {
+    'revenue': 'agency',
+    'debt': 'agency',
+    'utilization': 'agency',
+    'quantity': 'product',
+}
+MAX_TOP = 100
+
+MONEY = DecimalField(max_digits=15, decimal_places=0)
+
+
+def _percent(debt, max_debt):
+    """debt * 100 / max_debt (NULL nếu hạn mức = 0)"""
+    return Cast(debt, FloatField()) * Value(100.0) / NullIf(Cast(max_debt, FloatField()), Value(0.0))
+
+
+def _agency_values(metric, year, month):
+    """Đại lý đang hoạt động kèm value (kỳ này) và previous_value (kỳ trước)"""
+    agencies = Agency.objects.filter(is_active=True)
+
+    if metric == 'revenue':
+        previous_year, previous = previous_month(year, month)
+        return agencies.annotate(
+            current_report=FilteredRelation(
+                'revenue_reports', condition=Q(revenue_reports__year=year, revenue_reports__month=month)
+            ),
+            previous_report=FilteredRelation(
+                'revenue_reports',
+                condition=Q(revenue_reports__year=previous_year, revenue_reports__month=previous),
+            ),
+        ).annotate(
+            value=Coalesce(F('current_report__total_revenue'), Value(0), output_field=MONEY),
+            previous_value=F('previous_report__total_revenue'),
+        )
+
+    # Công nợ: hiện tại vs cuối tháng trước (= nợ đầu kỳ báo cáo tháng này,
+    # chưa có báo cáo tháng này -> chưa phát sinh -> bằng công nợ hiện tại)
+    agencies = agencies.annotate(
+        current_report=FilteredRelation(
+            'debt_reports', condition=Q(debt_reports__year=year, debt_reports__month=month)
+        ),
+    ).annotate(
+        opening=Coalesce(F('current_report__opening_debt'), F('current_debt'), output_field=MONEY),
+    )
+    if metric == 'debt':
+        return agencies.annotate(value=F('current_debt'), previous_value=F('opening'))
+    return agencies.annotate(
+        value=_percent('current_debt', 'agency_type__max_debt'),
+        previous_value=_percent('opening', 'agency_type__max_debt'),
+    )
+
+
+def _product_values(year, month):
+    """Sản phẩm bán ra trong kỳ này hoặc kỳ trước kèm value / previous_value (số lượng)"""
+    previous = previous_month(year, month)
+    current_period = Q(**month_filter('order__order_date', year, month))
+    previous_period = Q(**month_filter('order__order_date', *previous))
+    return ExportOrderItem.objects.filter(
+        current_period | previous_period, order__status='completed'
+    ).values('product', 'product__name').annotate(
+        value=Coalesce(Sum('quantity', filter=current_period), Value(0)),
+        previous_value=Sum('quantity', filter=previous_period),
+    )
+
+
+def compute_ranking(metric, year, month, top=10, ascending=False):
+    """
+    Top (ascending=False) / bottom (ascending=True) `top` đại lý hoặc sản phẩm của tháng.
+    Trả về danh sách {'rank', 'previous_rank', 'rank_change', '<đối tượng>_id',
+    '<đối tượng>_name', 'value', 'previous_value'} - 1 câu truy vấn.
+    """
+    entity = METRICS[metric]
+    if metric in ('revenue', 'quantity') and is_closed(year, month):
+        return _closed_month_ranking(metric, year, month, top, ascending)
+    if entity == 'agency':
+        queryset, id_field, name_field = _agency_values(metric, year, month), 'pk', 'name'
+    else:
+        queryset, id_field, name_field = _product_values(year, month), 'product', 'product__name'
+
+    def ordering(field):
+        expression = F(field)
+        return expression.asc(nulls_last=True) if ascending else expression.desc(nulls_last=True)
+
+    rows = queryset.annotate(
+        rank=Window(Rank(), order_by=ordering('value')),
+        previous_rank=Window(Rank(), order_by=ordering('previous_value')),
+    ).order_by('rank', id_field).values(
+        id_field, name_field, 'value', 'previous_value', 'rank', 'previous_rank'
+    )[:top]
+
+    data = []
+    for row in rows:
+        has_previous = row['previous_value'] is not None
+        previous_rank = row['previous_rank'] if has_previous else None
+        data.append({
+            'rank': row['rank'],
+            'previous_rank': previous_rank,
+            # > 0: tăng hạng so với kỳ trước
+            'rank_change': previous_rank - row['rank'] if has_previous else None,
+            f'{entity}_id': row[id_field],
+            f'{entity}_name': row[name_field],
+            'value': _number(row['value']),
+            'previous_value': _number(row['previous_value']),
+        })
+    return data
+
+
+def _closed_month_ranking(metric, year, month, top, ascending):
+    """Như compute_ranking cho tháng đã chốt, giá trị 2 kỳ lấy từ analytics.ranking"""
+    entity = METRICS[metric]
+    measure = 'revenue' if metric == 'revenue' else 'quantity'
+    facts = analytics.load_month(year, month)
+    previous_facts = analytics.load_month(*previous_month(year, month))
+    current = dict(analytics.ranking(facts, by=entity, measure=measure, top=None))
+    previous = dict(analytics.ranking(previous_facts, by=entity, measure=measure, top=None))
+
+    if entity == 'agency':
+        # Mọi đại lý đang hoạt động, kỳ trước không có phiếu nào -> chưa có số liệu
+        ids = list(Agency.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+        has_previous = len(previous_facts['order']) > 0
+        values = [current.get(pk, 0) for pk in ids]
+        previous_values = [previous.get(pk, 0) if has_previous else None for pk in ids]
+        model = Agency
+    else:
+        # Sản phẩm bán ra trong 1 trong 2 kỳ
+        ids = sorted(current.keys() | previous.keys())
+        values = [current.get(pk, 0) for pk in ids]
+        previous_values = [previous.get(pk) for pk in ids]
+        model = Product
+
+    ranks = analytics.competition_rank(values, ascending)
+    previous_ranks = analytics.competition_rank(
+        [value if value is not None else float('nan') for value in previous_values], ascending
+    )
+    selected = sorted(range(len(ids)), key=lambda i: (ranks[i], ids[i]))[:top]
+    names = dict(model.objects.filter(pk__in=[ids[i] for i in selected]).values_list('pk', 'name'))
+
+    data = []
+    for i in selected:
+        has_previous = previous_values[i] is not None
+        previous_rank = int(previous_ranks[i]) if has_previous else None
+        data.append({
+            'rank': int(ranks[i]),
+            'previous_rank': previous_rank,
+            'rank_change': previous_rank - int(ranks[i]) if has_previous else None,
+            f'{entity}_id': ids[i],
+            f'{entity}_name': names.get(ids[i]),
+            'value': _number(values[i]),
+            'previous_value': _number(previous_values[i]),
+        })
+    return data
+
+
+def _number(value):
+    if value is None:
+        return None
+    return round(float(value), 2)
@@ -0,0 +1,217 @@
+from decimal import Decimal
+
+from django.db.models import (
+    Case, When, F, Q, Value, Sum, Subquery, OuterRef, Window, DecimalField, FloatField, IntegerField
+)
+from django.db.models.functions import Cast, NullIf, Round
+
+from agencies.models import Agency
+from . import analytics, cube
+from .models import RevenueReport, DebtReport
+
+# ============================================================
+# ROLLUPS - Cập nhật dần báo cáo doanh số / công nợ theo tháng
+# ============================================================
+# Giải thích:
+# - Mỗi nghiệp vụ (hoàn thành/hủy phiếu xuất, tạo phiếu thu) cộng 1 lượng
+#   chênh lệch vào dòng (agency, month, year) bằng UPDATE F() + CASE,
+#   dòng chưa có thì được tạo trước (bulk_create ignore_conflicts)
+# - Nợ đầu kỳ của dòng mới = nợ cuối kỳ của báo cáo gần nhất trước đó;
+#   chênh lệch công nợ được cộng tiếp vào nợ đầu/cuối các tháng sau
+# - Chạy trong transaction của nghiệp vụ gọi nó -> báo cáo luôn khớp dữ liệu
+# - Đọc báo cáo tháng hiện tại chỉ là SELECT theo index (year, month)
+# - Tỷ lệ doanh thu phụ thuộc tổng cả tháng nên không cập nhật theo từng nghiệp vụ
+#   (sẽ phải ghi lại mọi dòng của tháng): API tính lúc đọc (month_totals,
+#   with_ratio), cột RevenueReport.ratio chỉ được ghi khi tạo lại báo cáo
+# ============================================================
+
+MONEY = DecimalField(max_digits=15, decimal_places=0)
+RATIO_PLACES = Decimal('0.01')
+
+
+def earlier_than(year, month):
+    """Điều kiện các kỳ trước (year, month)"""
+    return Q(year__lt=year) | Q(year=year, month__lt=month)
+
+
+def later_than(year, month):
+    """Điều kiện các kỳ sau (year, month)"""
+    return Q(year__gt=year) | Q(year=year, month__gt=month)
+
+
+def opening_debt_by_agency(year, month, agencies=None):
+    """
+    {agency_id: nợ cuối kỳ của báo cáo công nợ gần nhất trước tháng} (1 câu truy vấn).
+    Đại lý chưa có báo cáo nào trước đó không có trong kết quả (nợ đầu = 0).
+    """
+    if agencies is None:
+        agencies = Agency.objects.all()
+    latest = DebtReport.objects.filter(
+        earlier_than(year, month), agency=OuterRef('pk')
+    ).order_by('-year', '-month').values('closing_debt')[:1]
+    rows = agencies.order_by().annotate(opening=Subquery(latest)).values_list('pk', 'opening')
+    return {pk: opening for pk, opening in rows if opening is not None}
+
+
+def record_orders(orders, sign=1):
+    """
+    Ghi nhận phiếu xuất hoàn thành (sign=1) hoặc bỏ hoàn thành (sign=-1).
+    `orders`: danh sách (agency_id, order_date, total_amount)
+    """
+    deltas = {}
+    for agency_id, order_date, total_amount in orders:
+        delta = deltas.setdefault((agency_id, order_date.year, order_date.month), [0, 0, 0])
+        delta[0] += sign
+        delta[1] += sign * total_amount
+    apply_deltas(deltas)
+    # Tháng đã tổng hợp (RevenueCube, file phân tích) không còn đúng -> bỏ đi
+    periods = {(year, month) for _, year, month in deltas}
+    cube.invalidate_months(periods)
+    analytics.invalidate_months(periods)
+
+
+def record_payment(agency_id, payment_date, amount):
+    """Ghi nhận phiếu thu mới"""
+    apply_deltas({(agency_id, payment_date.year, payment_date.month): [0, 0, amount]})
+
+
+def apply_deltas(deltas):
+    """Cộng {(agency_id, year, month): [số phiếu, doanh thu, đã thu]} vào báo cáo"""
+    periods = {}
+    for (agency_id, year, month), delta in deltas.items():
+        if any(delta):
+            periods.setdefault((year, month), {})[agency_id] = delta
+
+    for (year, month), changes in sorted(periods.items()):
+        _ensure_rows(year, month, changes)
+        _apply_period(year, month, changes)
+
+
+def month_totals(periods):
+    """{(year, month): tổng doanh thu của tháng} (1 câu GROUP BY)"""
+    condition = Q()
+    for year, month in set(periods):
+        condition |= Q(year=year, month=month)
+    if not condition:
+        return {}
+    rows = RevenueReport.objects.filter(condition).values('year', 'month').annotate(
+        total=Sum('total_revenue')
+    ).order_by()
+    return {(row['year'], row['month']): row['total'] or 0 for row in rows}
+
+
+def revenue_ratio(revenue, total):
+    """Tỷ lệ (%) doanh thu trên tổng, làm tròn 2 chữ số"""
+    return (Decimal(revenue) * 100 / total).quantize(RATIO_PLACES) if total else Decimal(0)
+
+
+def with_ratio(reports):
+    """
+    Annotate current_ratio = tỷ lệ (%) doanh thu của đại lý trong tổng doanh thu tháng,
+    tính lúc đọc bằng hàm cửa sổ SUM() OVER (PARTITION BY year, month).
+    Chỉ dùng cho queryset lấy trọn các tháng (lọc theo tháng/năm, không phân trang).
+    """
+    month_total = Window(Sum('total_revenue'), partition_by=[F('year'), F('month')])
+    return reports.annotate(current_ratio=Round(
+        Cast('total_revenue', FloatField()) * Value(100.0)
+        / NullIf(Cast(month_total, FloatField()), Value(0.0)),
+        2,
+    ))
+
+
+def _ensure_rows(year, month, changes):
+    """Tạo dòng báo cáo còn thiếu cho các đại lý trong `changes`"""
+    RevenueReport.objects.bulk_create(
+        [RevenueReport(agency_id=agency_id, year=year, month=month) for agency_id in changes],
+        ignore_conflicts=True,
+    )
+
+    existing = set(DebtReport.objects.filter(
+        year=year, month=month, agency_id__in=changes
+    ).values_list('agency_id', flat=True))
+    missing = [agency_id for agency_id in changes if agency_id not in existing]
+    if not missing:
+        return
+
+    opening = opening_debt_by_agency(year, month, Agency.objects.filter(pk__in=missing))
+    DebtReport.objects.bulk_create([
+        DebtReport(
+            agency_id=agency_id, year=year, month=month,
+            opening_debt=opening.get(agency_id, 0), closing_debt=opening.get(agency_id, 0),
+        )
+        for agency_id in missing
+    ], ignore_conflicts=True)
+
+
+def _increment(field, values, output_field=MONEY):
+    """F(field) + CASE agency_id WHEN ... THEN giá trị ... END"""
+    return F(field) + Case(
+        *[When(agency_id=agency_id, then=Value(value)) for agency_id, value in values.items()],
+        default=Value(0),
+        output_field=output_field,
+    )
+
+
+def _apply_period(year, month, changes):
+    counts = {a: d[0] for a, d in changes.items()}
+    revenue = {a: d[1] for a, d in changes.items()}
+    paid = {a: d[2] for a, d in changes.items()}
+    net = {a: d[1] - d[2] for a, d in changes.items() if d[1] != d[2]}
+
+    if any(counts.values()) or any(revenue.values()):
+        RevenueReport.objects.filter(year=year, month=month, agency_id__in=changes).update(
+            order_count=_increment('order_count', counts, output_field=IntegerField()),
+            total_revenue=_increment('total_revenue', revenue),
+        )
+
+    DebtReport.objects.filter(year=year, month=month, agency_id__in=changes).update(
+        incurred=_increment('incurred', revenue),
+        paid=_increment('paid', paid),
+        closing_debt=_increment('closing_debt', net),
+    )
+
+    if net:
+        DebtReport.objects.filter(later_than(year, month), agency_id__in=net).update(
+            opening_debt=_increment('opening_debt', net),
+            closing_debt=_increment('closing_debt', net),
+        )
+
+
+def compare_with_rebuild(year, month):
+    """
+    So sánh báo cáo hiện có của tháng với kết quả tính lại toàn bộ.
+    Trả về danh sách {'agency', 'report', 'field', 'stored', 'expected'} các chỗ lệch.
+    """
+    from .generation import build_month, active_agency_ids
+
+    stored_revenue = {r.agency_id: r for r in RevenueReport.objects.filter(year=year, month=month)}
+    stored_debt = {r.agency_id: r for r in DebtReport.objects.filter(year=year, month=month)}
+    agency_ids = sorted(set(active_agency_ids()) | set(stored_revenue) | set(stored_debt))
+    revenue_reports, debt_reports, _ = build_month(year, month, agency_ids)
+
+    checks = [
+        ('revenue', stored_revenue, revenue_reports,
+         ['order_count', 'total_revenue'], []),
+        ('debt', stored_debt, debt_reports,
+         ['incurred', 'paid'], ['opening_debt', 'closing_debt']),
+    ]
+    mismatches = []
+    for name, stored, expected_reports, flows, balances in checks:
+        for expected in expected_reports:
+            row = stored.get(expected.agency_id)
+            if row is None:
+                # Dòng chỉ được tạo khi có phát sinh -> thiếu dòng không phát sinh là đúng
+                if any(getattr(expected, field) for field in flows):
+                    mismatches.append({
+                        'agency': expected.agency_id, 'report': name, 'field': None,
+                        'stored': None, 'expected': 'row',
+                    })
+                continue
+            for field in flows + balances:
+                stored_value, expected_value = getattr(row, field), getattr(expected, field)
+                if stored_value != expected_value:
+                    mismatches.append({
+                        'agency': expected.agency_id, 'report': name, 'field': field,
+                        'stored': stored_value, 'expected': expected_value,
+                    })
+    return mismatches
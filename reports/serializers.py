@@ -1,5 +1,7 @@
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Regulation, RevenueReport, DebtReport
+from .models import Regulation, RevenueReport, DebtReport, ReportJob
+from .rollups import month_totals, revenue_ratio
 
 # ============================================================
 # REPORT SERIALIZERS
@@ -24,11 +26,20 @@ class RevenueReportSerializer(serializers.ModelSerializer):
     Báo cáo doanh số
     """
     agency_name = serializers.CharField(source='agency.name', read_only=True)
+    ratio = serializers.SerializerMethodField()
     
     class Meta:
         model = RevenueReport
         fields = ['id', 'agency', 'agency_name', 'month', 'year', 
                   'order_count', 'total_revenue', 'ratio', 'created_at']
+    
+    def get_ratio(self, obj):
+        """Tỷ lệ theo tổng doanh thu hiện tại của tháng (1 câu truy vấn cho mỗi tháng trong trang)"""
+        totals = self.context.setdefault('month_totals', {})
+        period = (obj.year, obj.month)
+        if period not in totals:
+            totals.update(month_totals([period]))
+        return str(revenue_ratio(obj.total_revenue, totals.get(period, 0)))
 
 
 class DebtReportSerializer(serializers.ModelSerializer):
@@ -41,3 +52,29 @@ class DebtReportSerializer(serializers.ModelSerializer):
         model = DebtReport
         fields = ['id', 'agency', 'agency_name', 'month', 'year',
                   'opening_debt', 'incurred', 'paid', 'closing_debt', 'created_at']
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """
+    Tác vụ báo cáo chạy nền (kèm thời gian chờ / thời gian chạy tính bằng giây)
+    """
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+    queued_seconds = serializers.SerializerMethodField()
+    duration_seconds = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'kind', 'params', 'status', 'progress', 'result', 'error',
+                  'created_by', 'created_by_name', 'created_at', 'started_at', 'finished_at',
+                  'heartbeat_at', 'queued_seconds', 'duration_seconds']
+        read_only_fields = fields
+    
+    def get_queued_seconds(self, obj):
+        end = obj.started_at or timezone.now()
+        return round((end - obj.created_at).total_seconds(), 3)
+    
+    def get_duration_seconds(self, obj):
+        if obj.started_at is None:
+            return None
+        end = obj.finished_at or timezone.now()
+        return round((end - obj.started_at).total_seconds(), 3)
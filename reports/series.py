@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+
+from orders.models import ExportOrder
+from payments.models import Payment
+
+# ============================================================
+# SERIES - Chuỗi số liệu theo ngày / tuần / tháng cho biểu đồ dashboard
+# ============================================================
+# Giải thích:
+# - Mỗi bảng cần dùng chỉ 1 câu GROUP BY Trunc*(cột ngày)
+# - Các kỳ không có phát sinh được điền 0 trong Python
+# - Metric:
+#   revenue     : doanh thu phiếu xuất hoàn thành (theo ngày lập phiếu)
+#   order_count : số phiếu xuất hoàn thành
+#   paid        : tiền thu (theo ngày thu)
+#   debt        : công nợ phát sinh ròng = revenue - paid
+# ============================================================
+
+METRICS = ['revenue', 'order_count', 'paid', 'debt']
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+DEFAULT_SPAN = {
+    'day': timedelta(days=29),
+    'week': timedelta(weeks=11),
+    'month': timedelta(days=365),
+}
+MAX_BUCKETS = 1000
+
+
+def bucket_start(value, bucket):
+    """Ngày bắt đầu kỳ chứa `value` (tuần bắt đầu từ thứ 2)"""
+    if bucket == 'week':
+        return value - timedelta(days=value.weekday())
+    if bucket == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def bucket_starts(start, end, bucket):
+    """Danh sách ngày bắt đầu các kỳ từ `start` đến `end`"""
+    current = bucket_start(start, bucket)
+    starts = []
+    while current <= end:
+        starts.append(current)
+        if bucket == 'day':
+            current += timedelta(days=1)
+        elif bucket == 'week':
+            current += timedelta(weeks=1)
+        else:
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return starts
+
+
+def _grouped(queryset, date_field, bucket, start, end, value):
+    rows = queryset.filter(**{
+        f'{date_field}__gte': bucket_start(start, bucket), f'{date_field}__lte': end,
+    }).annotate(
+        period=BUCKETS[bucket](date_field)
+    ).values('period').annotate(value=value).order_by()
+    return {_as_date(row['period']): row['value'] or 0 for row in rows}
+
+
+def _as_date(value):
+    return value.date() if hasattr(value, 'date') else value
+
+
+def compute_series(metric, bucket, start, end, agency=None, district=None):
+    """
+    Tính chuỗi số liệu. `start`/`end` là date, kỳ đầu tiên được mở rộng về
+    đầu tuần/đầu tháng. Trả về danh sách {'period', 'value'} đã điền 0.
+    """
+    orders = ExportOrder.objects.filter(status='completed')
+    payments = Payment.objects.all()
+    if agency:
+        orders = orders.filter(agency_id=agency)
+        payments = payments.filter(agency_id=agency)
+    if district:
+        orders = orders.filter(agency__district_id=district)
+        payments = payments.filter(agency__district_id=district)
+
+    values = {}
+    if metric in ('revenue', 'debt'):
+        values = _grouped(orders, 'order_date', bucket, start, end, Sum('total_amount'))
+    elif metric == 'order_count':
+        values = _grouped(orders, 'order_date', bucket, start, end, Count('id'))
+    if metric in ('paid', 'debt'):
+        sign = -1 if metric == 'debt' else 1
+        for period, amount in _grouped(payments, 'payment_date', bucket, start, end, Sum('amount')).items():
+            values[period] = values.get(period, 0) + sign * amount
+
+    return [
+        {'period': period.isoformat(), 'value': float(values.get(period, 0))}
+        for period in bucket_starts(start, end, bucket)
+    ]
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from agencies.models import Agency, AgencyType
+from config.cache import invalidate
+from orders.models import ExportOrder, ExportOrderItem
+from payments.models import Payment
+from products.alerts import is_threshold_code, refresh_alerts
+from products.models import Product
+from . import analytics, cube
+from .models import Regulation
+
+# ============================================================
+# SIGNALS - Bỏ cache dashboard khi phiếu xuất / phiếu thu / sản phẩm / đại lý thay đổi
+# ============================================================
+# Lưu ý: update() / bulk_create không gửi signal, các chỗ cập nhật hàng loạt
+# (chuyển trạng thái phiếu, cộng tồn kho) tự gọi invalidate('dashboard').
+# Lưu / xóa phiếu xuất hoặc chi tiết phiếu (API PATCH/DELETE, admin) -> bỏ số liệu
+# tổng hợp (RevenueCube, file phân tích NumPy) của tháng bị ảnh hưởng.
+# Đổi quy định ngưỡng tồn kho (LOW_STOCK_THRESHOLD*, kể cả đổi mã sang / khỏi nhóm này)
+# -> tính lại cảnh báo tồn kho thấp khi transaction commit.
+# ============================================================
+
+
+@receiver(post_save, sender=ExportOrder)
+@receiver(post_delete, sender=ExportOrder)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Agency)
+@receiver(post_delete, sender=Agency)
+@receiver(post_save, sender=AgencyType)
+def invalidate_dashboard(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate('dashboard')
+
+
+@receiver(post_save, sender=Regulation)
+@receiver(post_delete, sender=Regulation)
+def refresh_low_stock(sender, instance, raw=False, **kwargs):
+    # Đổi ngưỡng tồn kho (mã cũ hoặc mã mới là mã ngưỡng) -> tính lại danh sách
+    # tồn kho thấp sau khi transaction commit, không giữ khóa ghi của request
+    previous = getattr(instance, '_loaded_code', None)
+    instance._loaded_code = instance.code
+    if raw:
+        return
+    if is_threshold_code(instance.code) or (previous and is_threshold_code(previous)):
+        transaction.on_commit(refresh_alerts)
+
+
+def _month(value):
+    return (value.year, value.month) if hasattr(value, 'year') else None
+
+
+def _invalidate_months(periods):
+    periods = set(periods) - {None}
+    if periods:
+        cube.invalidate_months(periods)
+        analytics.invalidate_months(periods)
+
+
+@receiver(post_save, sender=ExportOrder)
+@receiver(post_delete, sender=ExportOrder)
+def invalidate_order_months(sender, instance, raw=False, **kwargs):
+    # Chỉ phiếu hoàn thành có trong số liệu tổng hợp: trạng thái hiện tại hoặc lúc đọc lên
+    previous_date = getattr(instance, '_loaded_order_date', None)
+    previous_status = getattr(instance, '_loaded_status', None)
+    instance._loaded_order_date = instance.order_date
+    instance._loaded_status = instance.status
+    if raw:
+        return
+    periods = []
+    if instance.status == 'completed':
+        periods.append(_month(instance.order_date))
+    if previous_status == 'completed':
+        periods.append(_month(previous_date))
+    _invalidate_months(periods)
+
+
+@receiver(post_save, sender=ExportOrderItem)
+@receiver(post_delete, sender=ExportOrderItem)
+def invalidate_item_month(sender, instance, raw=False, origin=None, **kwargs):
+    # Xóa theo phiếu (cascade) -> invalidate_order_months đã xử lý
+    if raw or isinstance(origin, ExportOrder) or getattr(origin, 'model', None) is ExportOrder:
+        return
+    order_date = ExportOrder.objects.filter(
+        pk=instance.order_id, status='completed'
+    ).values_list('order_date', flat=True).first()
+    _invalidate_months([_month(order_date)] if order_date else [])
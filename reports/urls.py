@@ -7,6 +7,8 @@ router.register(r'regulations', views.RegulationViewSet, basename='regulation')
 router.register(r'revenue', views.RevenueReportViewSet, basename='revenue-report')
 router.register(r'debt', views.DebtReportViewSet, basename='debt-report')
 router.register(r'dashboard', views.DashboardViewSet, basename='dashboard')
+router.register(r'jobs', views.ReportJobViewSet, basename='report-job')
+router.register(r'cube', views.RevenueCubeViewSet, basename='revenue-cube')
 
 urlpatterns = [
     path('', include(router.urls)),
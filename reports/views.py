@@ -2,17 +2,23 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, F
-from django.db import models
-from datetime import datetime
+from django.db.models import Count, Q, Sum
+from django.http import FileResponse
+from datetime import date, datetime
 
 from accounts.views import IsAdmin, IsStaff
+from config.cache import cache_headers, get_or_compute
+from config.exports import ExportMixin
 from agencies.models import Agency
 from orders.models import ExportOrder
-from payments.models import Payment
-from .models import Regulation, RevenueReport, DebtReport
+from .models import Regulation, RevenueReport, DebtReport, ReportJob
+from . import analytics, cube, jobs, rankings, series as series_module
+from .generation import MAX_MONTHS
+from .periods import is_closed, month_filter, months_between, parse_month, parse_period, previous_month
+from .rollups import with_ratio
 from .serializers import (
-    RegulationSerializer, RevenueReportSerializer, DebtReportSerializer
+    RegulationSerializer, RevenueReportSerializer, DebtReportSerializer,
+    ReportJobSerializer
 )
 
 # ============================================================
@@ -20,6 +26,32 @@ from .serializers import (
 # ============================================================
 
 
+def job_response(job, created, message):
+    """Response 202 kèm tác vụ nền (created=False: dùng chung tác vụ đang chạy)"""
+    return Response({
+        'message': message,
+        'created': created,
+        'job': ReportJobSerializer(job).data,
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def parse_range(data):
+    """Đọc from/to (YYYY-MM) từ request -> (start, end, None) hoặc (None, None, Response lỗi)"""
+    try:
+        start = parse_month(data.get('from'))
+        end = parse_month(data.get('to') or data.get('from'))
+    except (TypeError, ValueError):
+        error = 'from/to phải có dạng YYYY-MM'
+    else:
+        if start > end:
+            error = 'from phải trước hoặc bằng to'
+        elif len(months_between(start, end)) > MAX_MONTHS:
+            error = f'Tối đa {MAX_MONTHS} tháng mỗi lần'
+        else:
+            return start, end, None
+    return None, None, Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class RegulationViewSet(viewsets.ModelViewSet):
     """
     API Quản lý quy định
@@ -39,14 +71,27 @@ class RegulationViewSet(viewsets.ModelViewSet):
         serializer.save(updated_by=self.request.user)
 
 
-class RevenueReportViewSet(viewsets.ReadOnlyModelViewSet):
-    """API Báo cáo doanh số (chỉ xem)"""
+class RevenueReportViewSet(ExportMixin, viewsets.ReadOnlyModelViewSet):
+    """API Báo cáo doanh số (chỉ xem, xuất file: export/?format=csv|xlsx)"""
     queryset = RevenueReport.objects.all().select_related('agency')
     serializer_class = RevenueReportSerializer
     permission_classes = [IsStaff]
+    export_name = 'bao-cao-doanh-so'
+    export_columns = [
+        ('Năm', 'year'),
+        ('Tháng', 'month'),
+        ('Mã đại lý', 'agency_id'),
+        ('Đại lý', 'agency__name'),
+        ('Số phiếu xuất', 'order_count'),
+        ('Tổng trị giá', 'total_revenue'),
+        ('Tỷ lệ (%)', 'current_ratio'),
+    ]
     
     def get_queryset(self):
         queryset = self.queryset
+        if self.action == 'export':
+            # Xuất trọn các tháng -> tỷ lệ tính bằng hàm cửa sổ trong cùng câu truy vấn
+            queryset = with_ratio(queryset)
         
         # Filter theo tháng/năm
         month = self.request.query_params.get('month')
@@ -61,109 +106,64 @@ class RevenueReportViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['post'])
     def generate(self, request):
-        """Tạo báo cáo doanh số và công nợ cho tháng/năm"""
-        from payments.models import Payment
-        
-        month = request.data.get('month', datetime.now().month)
-        year = request.data.get('year', datetime.now().year)
-        
-        # Xóa báo cáo cũ (nếu có)
-        RevenueReport.objects.filter(month=month, year=year).delete()
-        DebtReport.objects.filter(month=month, year=year).delete()
-        
-        # ========== BÁIO CÁO DOANH SỐ ==========
-        # Tính tổng doanh thu tháng từ các đơn hoàn thành
-        total_revenue_data = ExportOrder.objects.filter(
-            order_date__month=month,
-            order_date__year=year,
-            status='completed'
-        ).aggregate(
-            total=Sum(F('items__quantity') * F('items__unit_price'), output_field=models.DecimalField())
-        )
-        total_revenue = total_revenue_data['total'] or 0
-        
-        # Tạo báo cáo doanh số cho từng đại lý
-        for agency in Agency.objects.filter(is_active=True):
-            orders = ExportOrder.objects.filter(
-                agency=agency,
-                order_date__month=month,
-                order_date__year=year,
-                status='completed'
-            )
-            
-            order_count = orders.count()
-            
-            # Tính tổng doanh thu công ty
-            agency_revenue_data = orders.aggregate(
-                total=Sum(F('items__quantity') * F('items__unit_price'), output_field=models.DecimalField())
-            )
-            agency_revenue = agency_revenue_data['total'] or 0
-            
-            ratio = (float(agency_revenue) / float(total_revenue) * 100) if total_revenue > 0 else 0
-            
-            RevenueReport.objects.create(
-                agency=agency,
-                month=month,
-                year=year,
-                order_count=order_count,
-                total_revenue=agency_revenue,
-                ratio=ratio
+        """Tạo báo cáo doanh số và công nợ cho tháng/năm (chạy nền)"""
+        try:
+            year, month = parse_period(
+                request.data.get('year', datetime.now().year),
+                request.data.get('month', datetime.now().month),
             )
+        except (TypeError, ValueError):
+            return Response({'error': 'Tháng/năm không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # ========== BÁIO CÁO CÔNG NỢ ==========
-        for agency in Agency.objects.filter(is_active=True):
-            # Nợ đầu kỳ: lấy nợ cuối của tháng trước
-            prev_month = month - 1 if month > 1 else 12
-            prev_year = year if month > 1 else year - 1
-            prev_report = DebtReport.objects.filter(
-                agency=agency, month=prev_month, year=prev_year
-            ).first()
-            opening_debt = prev_report.closing_debt if prev_report else 0
-            
-            # Phát sinh: tổng tiền đặt hàng trong tháng
-            orders = ExportOrder.objects.filter(
-                agency=agency,
-                order_date__month=month,
-                order_date__year=year,
-                status='completed'
-            )
-            incurred_data = orders.aggregate(
-                total=Sum(F('items__quantity') * F('items__unit_price'), output_field=models.DecimalField())
-            )
-            incurred = incurred_data['total'] or 0
-            
-            # Đã thanh toán: tổng phiếu thu trong tháng
-            payments = Payment.objects.filter(
-                agency=agency,
-                payment_date__month=month,
-                payment_date__year=year
-            )
-            paid = payments.aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Nợ cuối kỳ = Nợ đầu + Phát sinh - Đã thanh toán
-            closing_debt = opening_debt + incurred - paid
-            
-            DebtReport.objects.create(
-                agency=agency,
-                month=month,
-                year=year,
-                opening_debt=opening_debt,
-                incurred=incurred,
-                paid=paid,
-                closing_debt=closing_debt
-            )
+        period = f'{year:04d}-{month:02d}'
+        job, created = jobs.submit('generate_reports', {'from': period, 'to': period}, request.user)
+        return job_response(job, created, f'Đang tạo báo cáo doanh số và công nợ tháng {month}/{year}')
+    
+    @action(detail=False, methods=['post'])
+    def generate_range(self, request):
+        """Tạo lại báo cáo doanh số và công nợ cho nhiều tháng liên tiếp (chạy nền)"""
+        start, end, error = parse_range(request.data)
+        if error:
+            return error
         
-        return Response({
-            'message': f'Đã tạo báo cáo doanh số và công nợ tháng {month}/{year}',
-            'total_revenue': float(total_revenue)
-        })
+        job, created = jobs.submit('generate_reports', {
+            'from': f'{start[0]:04d}-{start[1]:02d}', 'to': f'{end[0]:04d}-{end[1]:02d}',
+        }, request.user)
+        return job_response(
+            job, created, f'Đang tạo báo cáo từ {start[1]}/{start[0]} đến {end[1]}/{end[0]}'
+        )
+    
+    @action(detail=False, methods=['post'])
+    def reconcile(self, request):
+        """Đối soát báo cáo cập nhật dần với tính lại toàn bộ (chạy nền)"""
+        params = {'fix': bool(request.data.get('fix', False))}
+        if request.data.get('from'):
+            start, end, error = parse_range(request.data)
+            if error:
+                return error
+            params['from'] = f'{start[0]:04d}-{start[1]:02d}'
+            params['to'] = f'{end[0]:04d}-{end[1]:02d}'
+        
+        job, created = jobs.submit('reconcile', params, request.user)
+        return job_response(job, created, 'Đang đối soát báo cáo')
 
 
-class DebtReportViewSet(viewsets.ReadOnlyModelViewSet):
-    """API Báo cáo công nợ (chỉ xem)"""
+class DebtReportViewSet(ExportMixin, viewsets.ReadOnlyModelViewSet):
+    """API Báo cáo công nợ (chỉ xem, xuất file: export/?format=csv|xlsx)"""
     queryset = DebtReport.objects.all().select_related('agency')
     serializer_class = DebtReportSerializer
     permission_classes = [IsStaff]
+    export_name = 'bao-cao-cong-no'
+    export_columns = [
+        ('Năm', 'year'),
+        ('Tháng', 'month'),
+        ('Mã đại lý', 'agency_id'),
+        ('Đại lý', 'agency__name'),
+        ('Nợ đầu', 'opening_debt'),
+        ('Phát sinh', 'incurred'),
+        ('Đã trả', 'paid'),
+        ('Nợ cuối', 'closing_debt'),
+    ]
     
     def get_queryset(self):
         queryset = self.queryset
@@ -188,86 +188,108 @@ class DashboardViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'])
     def overview(self, request):
-        """Tổng quan hệ thống"""
-        from agencies.models import Agency, AgencyType, District
-        from products.models import Product, GoodsReceipt
-        from orders.models import ExportOrder
-        from payments.models import Payment
+        """Tổng quan hệ thống (cache ngắn hạn, header X-Cache / Age)"""
+        data, hit, age = get_or_compute('dashboard', self._overview, params={'view': 'overview'})
+        return cache_headers(Response(data), hit, age)
+    
+    @staticmethod
+    def _overview():
+        """Tính tổng quan: 1 câu truy vấn (đếm có điều kiện) cho mỗi bảng"""
+        from products.models import Product, LowStockAlert
+        
+        current_month = datetime.now().month
+        current_year = datetime.now().year
         
         # ===== AGENCIES =====
-        total_agencies = Agency.objects.count()
-        active_agencies = Agency.objects.filter(is_active=True).count()
-        total_debt = Agency.objects.aggregate(total=Sum('current_debt'))['total'] or 0
+        agencies = Agency.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            total_debt=Sum('current_debt'),
+        )
         
         # ===== PRODUCTS =====
-        total_products = Product.objects.count()
-        out_of_stock = Product.objects.filter(stock_quantity=0).count()
-        low_stock = Product.objects.filter(stock_quantity__lt=10, stock_quantity__gt=0).count()
-        
-        # ===== ORDERS =====
-        pending_orders = ExportOrder.objects.filter(status='pending').count()
-        confirmed_orders = ExportOrder.objects.filter(status='confirmed').count()
-        shipping_orders = ExportOrder.objects.filter(status='shipping').count()
-        completed_orders = ExportOrder.objects.filter(status='completed').count()
-        total_orders = ExportOrder.objects.count()
-        
-        # ===== REVENUE (THÁNG NÀY) =====
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        month_revenue = ExportOrder.objects.filter(
-            order_date__month=current_month,
-            order_date__year=current_year,
-            status='completed'
-        ).aggregate(
-            total=Sum(F('items__quantity') * F('items__unit_price'), output_field=models.DecimalField())
-        )['total'] or 0
+        products = Product.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+        )
+        # Hết hàng / sắp hết hàng đọc từ bảng cảnh báo (ngưỡng theo quy định)
+        products.update(LowStockAlert.counts())
         
-        return Response({
+        # ===== ORDERS + REVENUE (THÁNG NÀY) =====
+        orders = ExportOrder.objects.aggregate(
+            total=Count('id'),
+            **{
+                order_status: Count('id', filter=Q(status=order_status))
+                for order_status in ['pending', 'confirmed', 'shipping', 'completed']
+            },
+            month_revenue=Sum('total_amount', filter=Q(
+                status='completed', **month_filter('order_date', current_year, current_month)
+            )),
+        )
+        
+        return {
             'agencies': {
-                'total': total_agencies,
-                'active': active_agencies,
-                'inactive': total_agencies - active_agencies,
-                'total_debt': float(total_debt),
+                'total': agencies['total'],
+                'active': agencies['active'],
+                'inactive': agencies['total'] - agencies['active'],
+                'total_debt': float(agencies['total_debt'] or 0),
             },
             'products': {
-                'total': total_products,
-                'active': Product.objects.filter(is_active=True).count(),
-                'out_of_stock': out_of_stock,
-                'low_stock': low_stock,
+                'total': products['total'],
+                'active': products['active'],
+                'out_of_stock': products['out_of_stock'],
+                'low_stock': products['low_stock'],
             },
             'orders': {
-                'total': total_orders,
-                'pending': pending_orders,
-                'confirmed': confirmed_orders,
-                'shipping': shipping_orders,
-                'completed': completed_orders,
+                'total': orders['total'],
+                'pending': orders['pending'],
+                'confirmed': orders['confirmed'],
+                'shipping': orders['shipping'],
+                'completed': orders['completed'],
             },
             'revenue': {
                 'month': current_month,
                 'year': current_year,
-                'total': float(month_revenue),
+                'total': float(orders['month_revenue'] or 0),
             }
-        })
+        }
     
     @action(detail=False, methods=['get'])
     def revenue_by_agency(self, request):
-        """Doanh số theo đại lý (tháng hiện tại)"""
-        current_month = datetime.now().month
-        current_year = datetime.now().year
+        """Doanh số theo đại lý (?month=&year=, mặc định tháng hiện tại)"""
+        today = date.today()
+        try:
+            current_year, current_month = parse_period(
+                request.query_params.get('year', today.year), request.query_params.get('month', today.month)
+            )
+        except ValueError:
+            return Response({'error': 'Tháng/năm không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
         
-        reports = RevenueReport.objects.filter(
-            month=current_month,
-            year=current_year
-        ).select_related('agency').order_by('-total_revenue')
+        if is_closed(current_year, current_month):
+            # Tháng đã chốt: tính trên file phân tích NumPy
+            shares = analytics.revenue_shares(analytics.load_month(current_year, current_month))
+            names = dict(Agency.objects.filter(pk__in=list(shares)).values_list('pk', 'name'))
+            reports = sorted(
+                ((agency_id, names.get(agency_id), total, count, ratio)
+                 for agency_id, (total, count, ratio) in shares.items()),
+                key=lambda row: row[2], reverse=True
+            )
+        else:
+            reports = with_ratio(RevenueReport.objects.filter(
+                month=current_month,
+                year=current_year
+            )).order_by('-total_revenue').values_list(
+                'agency_id', 'agency__name', 'total_revenue', 'order_count', 'current_ratio'
+            )
         
         data = []
-        for report in reports:
+        for agency_id, agency_name, total_revenue, order_count, ratio in reports:
             data.append({
-                'agency_id': report.agency.id,
-                'agency_name': report.agency.name,
-                'total_revenue': float(report.total_revenue),
-                'order_count': report.order_count,
-                'ratio': float(report.ratio),
+                'agency_id': agency_id,
+                'agency_name': agency_name,
+                'total_revenue': float(total_revenue),
+                'order_count': order_count,
+                'ratio': float(ratio or 0),
             })
         
         return Response({
@@ -279,7 +301,9 @@ class DashboardViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def debt_by_agency(self, request):
         """Công nợ theo đại lý (sắp xếp theo nợ cao nhất)"""
-        agencies = Agency.objects.filter(is_active=True).order_by('-current_debt')[:10]
+        agencies = Agency.objects.filter(is_active=True).select_related('agency_type').only(
+            'name', 'current_debt', 'agency_type__max_debt'
+        ).order_by('-current_debt')[:10]
         
         data = []
         for agency in agencies:
@@ -294,6 +318,102 @@ class DashboardViewSet(viewsets.ViewSet):
         
         return Response(data)
     
+    @action(detail=False, methods=['get'])
+    def ranking(self, request):
+        """
+        Xếp hạng top/bottom N kèm thay đổi hạng so với tháng trước:
+        ?metric=revenue|debt|utilization|quantity&order=top|bottom&limit=10&month=&year=
+        """
+        params = request.query_params
+        metric = params.get('metric', 'revenue')
+        order = params.get('order', 'top')
+        if metric not in rankings.METRICS:
+            return Response(
+                {'error': f"metric phải là một trong: {', '.join(rankings.METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if order not in ('top', 'bottom'):
+            return Response({'error': 'order phải là top hoặc bottom'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        today = date.today()
+        try:
+            limit = int(params.get('limit', 10))
+            year, month = parse_period(params.get('year', today.year), params.get('month', today.month))
+        except ValueError:
+            return Response({'error': 'Tham số không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= rankings.MAX_TOP:
+            return Response(
+                {'error': f'limit phải từ 1 đến {rankings.MAX_TOP}'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if metric in ('debt', 'utilization'):
+            # Công nợ luôn là số hiện tại, so với cuối tháng trước
+            year, month = today.year, today.month
+        
+        key = {'view': 'ranking', 'metric': metric, 'order': order, 'limit': limit, 'year': year, 'month': month}
+        data, hit, age = get_or_compute('dashboard', lambda: rankings.compute_ranking(
+            metric, year, month, top=limit, ascending=order == 'bottom'
+        ), params=key)
+        
+        previous_year, previous = previous_month(year, month)
+        return cache_headers(Response({
+            'metric': metric,
+            'order': order,
+            'month': month,
+            'year': year,
+            'previous': {'month': previous, 'year': previous_year},
+            'data': data,
+        }), hit, age)
+    
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Chuỗi số liệu cho biểu đồ:
+        ?metric=revenue|order_count|paid|debt&bucket=day|week|month&from=&to=&agency=&district=
+        """
+        params = request.query_params
+        metric = params.get('metric', 'revenue')
+        bucket = params.get('bucket', 'day')
+        if metric not in series_module.METRICS:
+            return Response(
+                {'error': f"metric phải là một trong: {', '.join(series_module.METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if bucket not in series_module.BUCKETS:
+            return Response({'error': 'bucket phải là day, week hoặc month'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            end = date.fromisoformat(params['to']) if params.get('to') else date.today()
+            start = (date.fromisoformat(params['from']) if params.get('from')
+                     else end - series_module.DEFAULT_SPAN[bucket])
+            agency = int(params['agency']) if params.get('agency') else None
+            district = int(params['district']) if params.get('district') else None
+        except ValueError:
+            return Response({'error': 'Tham số không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if start > end:
+            return Response({'error': 'from phải trước hoặc bằng to'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(series_module.bucket_starts(start, end, bucket)) > series_module.MAX_BUCKETS:
+            return Response(
+                {'error': f'Tối đa {series_module.MAX_BUCKETS} kỳ mỗi lần'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        key = {
+            'view': 'series', 'metric': metric, 'bucket': bucket, 'from': start, 'to': end,
+            'agency': agency, 'district': district,
+        }
+        data, hit, age = get_or_compute('dashboard', lambda: series_module.compute_series(
+            metric, bucket, start, end, agency=agency, district=district
+        ), params=key)
+        
+        return cache_headers(Response({
+            'metric': metric,
+            'bucket': bucket,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'total': sum(point['value'] for point in data),
+            'series': data,
+        }), hit, age)
+    
     @action(detail=False, methods=['get'])
     def order_status_summary(self, request):
         """Tóm tắt trạng thái đơn hàng"""
@@ -321,56 +441,114 @@ class DashboardViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['post'])
     def generate(self, request):
-        """Tạo báo cáo công nợ cho tháng/năm"""
-        month = request.data.get('month', datetime.now().month)
-        year = request.data.get('year', datetime.now().year)
-        
-        # Xóa báo cáo cũ (nếu có)
-        DebtReport.objects.filter(month=month, year=year).delete()
-        
-        for agency in Agency.objects.filter(is_active=True):
-            # Tính nợ đầu kỳ (từ báo cáo tháng trước hoặc 0)
-            prev_month = month - 1 if month > 1 else 12
-            prev_year = year if month > 1 else year - 1
-            
-            try:
-                prev_report = DebtReport.objects.get(
-                    agency=agency, month=prev_month, year=prev_year
-                )
-                opening_debt = prev_report.closing_debt
-            except DebtReport.DoesNotExist:
-                opening_debt = 0
-            
-            # Tính phát sinh (tổng đơn hàng trong tháng)
-            orders = ExportOrder.objects.filter(
-                agency=agency,
-                order_date__month=month,
-                order_date__year=year,
-                status='completed'
+        """Tạo báo cáo công nợ cho tháng/năm (chạy nền)"""
+        try:
+            year, month = parse_period(
+                request.data.get('year', datetime.now().year),
+                request.data.get('month', datetime.now().month),
+            )
+        except (TypeError, ValueError):
+            return Response({'error': 'Tháng/năm không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        period = f'{year:04d}-{month:02d}'
+        job, created = jobs.submit(
+            'generate_reports', {'from': period, 'to': period, 'revenue': False}, request.user
+        )
+        return job_response(job, created, f'Đang tạo báo cáo công nợ tháng {month}/{year}')
+
+
+class RevenueCubeViewSet(viewsets.ViewSet):
+    """
+    API Pivot doanh thu (phiếu xuất hoàn thành)
+    ?dims=district,agency_type,agency,product,month (tối đa 3)&measure=revenue|quantity|order_count
+    &from=YYYY-MM&to=YYYY-MM
+    """
+    permission_classes = [IsStaff]
+    
+    def list(self, request):
+        params = request.query_params
+        dimensions = [dim for dim in params.get('dims', '').split(',') if dim]
+        measure = params.get('measure', 'revenue')
+        
+        if not dimensions or len(dimensions) > cube.MAX_DIMENSIONS or len(set(dimensions)) != len(dimensions):
+            return Response(
+                {'error': f'dims cần từ 1 đến {cube.MAX_DIMENSIONS} chiều khác nhau'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            incurred = sum(order.total_amount for order in orders)
-            
-            # Tính đã thu
-            payments = Payment.objects.filter(
-                agency=agency,
-                payment_date__month=month,
-                payment_date__year=year
+        unknown = [dim for dim in dimensions if dim not in cube.DIMENSIONS]
+        if unknown:
+            return Response(
+                {'error': f"Chiều không hợp lệ: {', '.join(unknown)} "
+                          f"(hỗ trợ: {', '.join(cube.DIMENSIONS)})"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            paid = sum(p.amount for p in payments)
-            
-            # Nợ cuối kỳ
-            closing_debt = opening_debt + incurred - paid
-            
-            DebtReport.objects.create(
-                agency=agency,
-                month=month,
-                year=year,
-                opening_debt=opening_debt,
-                incurred=incurred,
-                paid=paid,
-                closing_debt=closing_debt
+        if measure not in cube.MEASURES:
+            return Response(
+                {'error': f"measure phải là một trong: {', '.join(cube.MEASURES)}"},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
+        today = date.today()
+        data = {
+            'from': params.get('from') or f'{today.year - 1:04d}-{today.month:02d}',
+            'to': params.get('to') or f'{today.year:04d}-{today.month:02d}',
+        }
+        start, end, error = parse_range(data)
+        if error:
+            return error
+        
+        rows = cube.pivot(dimensions, measure, start, end, use_cube=params.get('use_cube') != '0')
+        # 1 phiếu có nhiều sản phẩm -> tổng số phiếu theo sản phẩm bị đếm trùng
+        counted_twice = measure == 'order_count' and 'product' in dimensions
         return Response({
-            'message': f'Đã tạo báo cáo công nợ tháng {month}/{year}'
+            'dimensions': dimensions,
+            'measure': measure,
+            'from': data['from'],
+            'to': data['to'],
+            'total': None if counted_twice else float(sum(row['value'] for row in rows)),
+            'rows': rows,
         })
+    
+    @action(detail=False, methods=['post'])
+    def build(self, request):
+        """Tổng hợp trước các tháng đã chốt vào RevenueCube (chạy nền)"""
+        start, end, error = parse_range(request.data)
+        if error:
+            return error
+        
+        job, created = jobs.submit('build_cube', {
+            'from': f'{start[0]:04d}-{start[1]:02d}', 'to': f'{end[0]:04d}-{end[1]:02d}',
+        }, request.user)
+        return job_response(job, created, f'Đang tổng hợp doanh thu từ {start[1]}/{start[0]} đến {end[1]}/{end[0]}')
+
+
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """API Tác vụ báo cáo chạy nền (xem tiến độ, kết quả)"""
+    queryset = ReportJob.objects.all().select_related('created_by')
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsStaff]
+    
+    def get_queryset(self):
+        queryset = self.queryset
+        
+        job_status = self.request.query_params.get('status')
+        kind = self.request.query_params.get('kind')
+        
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Tải file của tác vụ export đã hoàn thành"""
+        job = self.get_object()
+        if job.kind != 'export' or job.status != 'succeeded':
+            return Response({'error': 'Tác vụ không có file để tải'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        path = jobs.export_dir() / job.result['file']
+        if not path.exists():
+            return Response({'error': 'File đã bị xóa'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.result['filename'])
@@ -0,0 +1 @@
+# App tìm kiếm toàn văn (không phân biệt dấu) cho đại lý, sản phẩm, phiếu xuất
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    verbose_name = 'Tìm kiếm'
+    
+    def ready(self):
+        from . import signals  # noqa: F401 - đăng ký signal cập nhật chỉ mục
@@ -0,0 +1,175 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import F, Q
+
+# ============================================================
+# SEARCH INDEX - Chỉ mục tìm kiếm toàn văn (SQLite FTS5)
+# ============================================================
+# Giải thích:
+# - Mỗi loại tài liệu có 1 bảng FTS5 riêng, rowid = id của bản ghi
+#     agency  -> tên đại lý
+#     product -> tên + mô tả sản phẩm
+#     order   -> ghi chú phiếu xuất + tên đại lý
+# - Văn bản được chuẩn hóa: chữ thường, bỏ dấu tiếng Việt (kể cả đ -> d)
+#   nên "Dai ly Minh" tìm được "Đại lý Minh"
+# - Kết quả xếp hạng theo bm25; database khác SQLite thì dùng icontains
+# ============================================================
+
+TABLES = {
+    'agency': 'search_agency',
+    'product': 'search_product',
+    'order': 'search_order',
+}
+
+# Cột dùng khi không có FTS5 (database khác SQLite)
+FALLBACK_FIELDS = {
+    'agency': ['name'],
+    'product': ['name', 'description'],
+    'order': ['note', 'agency__name'],
+}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Chữ thường, bỏ dấu: 'Đại lý Minh' -> 'dai ly minh'"""
+    if not text:
+        return ''
+    text = text.lower().replace('đ', 'd')
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """Chuỗi MATCH cho FTS5: mỗi từ là 1 tiền tố, tất cả phải khớp"""
+    tokens = TOKEN_RE.findall(normalize(query))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+# ----- Nội dung tài liệu -----
+
+def agency_text(name):
+    return normalize(name)
+
+
+def product_text(name, description):
+    return normalize(f'{name} {description or ""}')
+
+
+def order_text(note, agency_name):
+    return normalize(f'{note or ""} {agency_name or ""}')
+
+
+# ----- Ghi chỉ mục -----
+
+def index_documents(doc_type, documents):
+    """Ghi (hoặc ghi đè) danh sách (id, nội dung đã chuẩn hóa)"""
+    if not is_available():
+        return
+    documents = list(documents)
+    if not documents:
+        return
+    table = TABLES[doc_type]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s', [(pk,) for pk, _ in documents])
+        cursor.executemany(f'INSERT INTO {table} (rowid, body) VALUES (%s, %s)', documents)
+
+
+def remove_documents(doc_type, pks):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLES[doc_type]} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def indexed_text(doc_type, pk):
+    """Nội dung đang lưu trong chỉ mục của 1 tài liệu"""
+    if not is_available():
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT body FROM {TABLES[doc_type]} WHERE rowid = %s', [pk])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def clear(doc_type):
+    if is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLES[doc_type]}')
+
+
+# ----- Tìm kiếm -----
+
+def filter_queryset(queryset, doc_type, query):
+    """
+    Lọc queryset theo từ khóa, thêm cột search_rank (bm25, nhỏ = liên quan hơn)
+    và sắp xếp theo độ liên quan.
+    Bảng FTS5 được join trong chính câu SQL (rowid = id, search.models) nên
+    các bộ lọc khác và phân trang áp dụng trên toàn bộ kết quả khớp.
+    """
+    if not is_available():
+        condition = Q()
+        for field in FALLBACK_FIELDS[doc_type]:
+            condition |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition)
+
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(search_document__match=match).annotate(
+        search_rank=F('search_document__rank')
+    ).order_by('search_rank', 'pk')
+
+
+def rebuild(doc_type, apps=None, chunk_size=2000):
+    """Xây lại toàn bộ chỉ mục của 1 loại tài liệu, trả về số tài liệu"""
+    if not is_available():
+        return 0
+    get_model = apps.get_model if apps else _get_model
+
+    if doc_type == 'agency':
+        rows = get_model('agencies', 'Agency').objects.values_list('pk', 'name')
+        documents = ((pk, agency_text(name)) for pk, name in rows.iterator(chunk_size=chunk_size))
+    elif doc_type == 'product':
+        rows = get_model('products', 'Product').objects.values_list('pk', 'name', 'description')
+        documents = (
+            (pk, product_text(name, description))
+            for pk, name, description in rows.iterator(chunk_size=chunk_size)
+        )
+    else:
+        rows = get_model('orders', 'ExportOrder').objects.values_list('pk', 'note', 'agency__name')
+        documents = (
+            (pk, order_text(note, agency_name))
+            for pk, note, agency_name in rows.iterator(chunk_size=chunk_size)
+        )
+
+    clear(doc_type)
+    count = 0
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= chunk_size:
+            _insert(doc_type, batch)
+            count += len(batch)
+            batch = []
+    _insert(doc_type, batch)
+    return count + len(batch)
+
+
+def _insert(doc_type, documents):
+    if documents:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLES[doc_type]} (rowid, body) VALUES (%s, %s)', documents
+            )
+
+
+def _get_model(app_label, model_name):
+    from django.apps import apps
+    return apps.get_model(app_label, model_name)
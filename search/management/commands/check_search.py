@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from config.benchmark import scratch_database, seed_data
+from config.pagination import KeysetPagination
+from products.models import Product, Unit
+from search import index
+
+# ============================================================
+# KIỂM TRA TÌM KIẾM TOÀN VĂN KẾT HỢP BỘ LỌC
+# ============================================================
+# Chạy: python manage.py check_search [--matches 1200] [--active 100]
+# Giải thích:
+# - Trên database tạm: `matches` sản phẩm cùng khớp từ khóa "bia",
+#   chỉ `active` sản phẩm đang kinh doanh
+# - Tìm "bia" + lọc is_active phải trả về đủ `active` sản phẩm, đi hết các
+#   trang keyset phải gặp mỗi sản phẩm đúng 1 lần, theo thứ tự độ liên quan
+# ============================================================
+
+
+class Command(BaseCommand):
+    help = 'Kiểm tra tìm kiếm ?q= trả về đủ kết quả khi kết hợp bộ lọc và phân trang'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--matches', type=int, default=1200)
+        parser.add_argument('--active', type=int, default=100)
+        parser.add_argument('--page-size', type=int, default=20)
+    
+    def handle(self, *args, **options):
+        if not index.is_available():
+            self.stdout.write('Database không hỗ trợ FTS5, tìm kiếm dùng icontains')
+            return
+        matches = options['matches']
+        active = min(options['active'], matches)
+        
+        with scratch_database():
+            seed_data(products=0)
+            unit = Unit.objects.get()
+            step = max(1, matches // max(active, 1))
+            Product.objects.bulk_create([
+                Product(
+                    name=f'Bia Hà Nội {i}', unit=unit, price=10000,
+                    is_active=i % step == 0 and i // step < active,
+                    description='bia ' * (i % 5),
+                )
+                for i in range(matches)
+            ] + [
+                Product(name=f'Nước ngọt {i}', unit=unit, price=10000) for i in range(50)
+            ])
+            index.rebuild('product')
+            expected = set(Product.objects.filter(is_active=True, name__startswith='Bia').values_list('pk', flat=True))
+            
+            errors = []
+            found = index.filter_queryset(Product.objects.all(), 'product', 'bia').count()
+            if found != matches:
+                errors.append(f'Tìm "bia": {found} kết quả, cần {matches}')
+            
+            queryset = index.filter_queryset(Product.objects.filter(is_active=True), 'product', 'bia')
+            if set(queryset.values_list('pk', flat=True)) != expected:
+                errors.append(f'Tìm "bia" + is_active: {queryset.count()} kết quả, cần {len(expected)}')
+            
+            seen, ranks = self._walk(queryset, options['page_size'])
+            if len(seen) != len(set(seen)) or set(seen) != expected:
+                errors.append(f'Phân trang: {len(seen)} dòng ({len(set(seen))} khác nhau), cần {len(expected)}')
+            if ranks != sorted(ranks):
+                errors.append('Phân trang: kết quả không theo thứ tự độ liên quan')
+        
+        for error in errors:
+            self.stdout.write(self.style.ERROR(error))
+        if errors:
+            raise CommandError(f'{len(errors)} lỗi')
+        self.stdout.write(self.style.SUCCESS(f'OK: {matches} khớp, {len(expected)} sau khi lọc'))
+    
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def _walk(self, queryset, page_size):
+        """Đi hết các trang keyset, trả về (danh sách id, danh sách search_rank)"""
+        factory = APIRequestFactory()
+        url = f'/api/products/?q=bia&page_size={page_size}'
+        seen = []
+        ranks = []
+        while url:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(queryset, Request(factory.get(url)))
+            seen.extend(product.pk for product in page)
+            ranks.extend(product.search_rank for product in page)
+            url = paginator.get_next_link()
+        return seen, ranks
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search import index
+
+
+class Command(BaseCommand):
+    help = 'Xây lại chỉ mục tìm kiếm (dùng sau khi nhập dữ liệu hàng loạt)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('doc_types', nargs='*', help='agency / product / order (mặc định: tất cả)')
+    
+    def handle(self, *args, **options):
+        doc_types = options['doc_types'] or list(index.TABLES)
+        unknown = set(doc_types) - set(index.TABLES)
+        if unknown:
+            raise CommandError(f"Loại không hợp lệ: {', '.join(sorted(unknown))}")
+        
+        if not index.is_available():
+            self.stdout.write('Database không hỗ trợ FTS5, tìm kiếm dùng icontains')
+            return
+        for doc_type in doc_types:
+            count = index.rebuild(doc_type)
+            self.stdout.write(self.style.SUCCESS(f'{doc_type}: đã đánh chỉ mục {count} bản ghi'))
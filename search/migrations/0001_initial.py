@@ -0,0 +1,38 @@
+from django.db import migrations
+
+from search import index
+
+
+def create_tables(apps, schema_editor):
+    """Tạo bảng FTS5 (chỉ SQLite) và đánh chỉ mục dữ liệu đã có"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in index.TABLES.values():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+            f"USING fts5(body, tokenize='unicode61 remove_diacritics 2')"
+        )
+    for doc_type in index.TABLES:
+        index.rebuild(doc_type, apps=apps)
+
+
+def drop_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in index.TABLES.values():
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('products', '0001_initial'),
+        ('orders', '0004_filter_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tables, drop_tables),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('orders', '0004_filter_path_indexes'),
+        ('products', '0003_low_stock_alerts'),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgencyDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('rank', models.FloatField()),
+                ('agency', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='agencies.agency')),
+                ('match', models.TextField(db_column='search_agency')),
+            ],
+            options={
+                'db_table': 'search_agency',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('rank', models.FloatField()),
+                ('order', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='orders.exportorder')),
+                ('match', models.TextField(db_column='search_order')),
+            ],
+            options={
+                'db_table': 'search_order',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductDocument',
+            fields=[
+                ('body', models.TextField()),
+                ('rank', models.FloatField()),
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='products.product')),
+                ('match', models.TextField(db_column='search_product')),
+            ],
+            options={
+                'db_table': 'search_product',
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+    ]
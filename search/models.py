@@ -0,0 +1,54 @@
+from django.db import models
+
+# ============================================================
+# SEARCH MODELS - Ánh xạ (chỉ đọc) các bảng FTS5
+# ============================================================
+# Giải thích:
+# - Bảng do migration 0001 tạo (managed = False), rowid = id của bản ghi gốc
+#   nên join được trực tiếp: ExportOrder.objects.filter(search_document__match=...)
+# - match: cột ẩn cùng tên bảng, "bảng = 'từ khóa'" tương đương MATCH
+# - rank: cột ẩn của FTS5 = bm25() (nhỏ = liên quan hơn)
+# - Ghi chỉ mục vẫn qua search.index (executemany), không qua ORM
+# ============================================================
+
+
+class SearchDocument(models.Model):
+    body = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+
+class AgencyDocument(SearchDocument):
+    agency = models.OneToOneField(
+        'agencies.Agency', on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', db_constraint=False, related_name='search_document'
+    )
+    match = models.TextField(db_column='search_agency')
+
+    class Meta(SearchDocument.Meta):
+        db_table = 'search_agency'
+
+
+class ProductDocument(SearchDocument):
+    product = models.OneToOneField(
+        'products.Product', on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', db_constraint=False, related_name='search_document'
+    )
+    match = models.TextField(db_column='search_product')
+
+    class Meta(SearchDocument.Meta):
+        db_table = 'search_product'
+
+
+class OrderDocument(SearchDocument):
+    order = models.OneToOneField(
+        'orders.ExportOrder', on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', db_constraint=False, related_name='search_document'
+    )
+    match = models.TextField(db_column='search_order')
+
+    class Meta(SearchDocument.Meta):
+        db_table = 'search_order'
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from agencies.models import Agency
+from orders.models import ExportOrder
+from products.models import Product
+from . import index
+
+# ============================================================
+# SIGNALS - Cập nhật chỉ mục tìm kiếm khi dữ liệu thay đổi
+# ============================================================
+# Lưu ý: bulk_create / update() không gửi signal,
+# dùng `python manage.py rebuild_search_index` sau khi nhập dữ liệu hàng loạt.
+# ============================================================
+
+
+@receiver(post_save, sender=Agency)
+def index_agency(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    text = index.agency_text(instance.name)
+    renamed = index.indexed_text('agency', instance.pk) not in (None, text)
+    index.index_documents('agency', [(instance.pk, text)])
+    
+    # Đổi tên đại lý -> cập nhật các phiếu xuất của đại lý đó
+    if renamed:
+        orders = ExportOrder.objects.filter(agency=instance).values_list('pk', 'note')
+        index.index_documents('order', (
+            (pk, index.order_text(note, instance.name)) for pk, note in orders.iterator()
+        ))
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index.index_documents('product', [
+        (instance.pk, index.product_text(instance.name, instance.description))
+    ])
+
+
+@receiver(post_save, sender=ExportOrder)
+def index_order(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index.index_documents('order', [
+        (instance.pk, index.order_text(instance.note, instance.agency.name))
+    ])
+
+
+@receiver(post_delete, sender=Agency)
+def unindex_agency(sender, instance, **kwargs):
+    index.remove_documents('agency', [instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    index.remove_documents('product', [instance.pk])
+
+
+@receiver(post_delete, sender=ExportOrder)
+def unindex_order(sender, instance, **kwargs):
+    index.remove_documents('order', [instance.pk])